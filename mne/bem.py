@@ -16,7 +16,7 @@ import shutil
 from copy import deepcopy
 
 import numpy as np
-from scipy import linalg
+from scipy import linalg, sparse
 
 from .io.constants import FIFF, FWD
 from .io._digitization import _dig_kind_dict, _dig_kind_rev, _dig_kind_ints
@@ -28,11 +28,11 @@ from .io.tree import dir_tree_find
 from .io.open import fiff_open
 from .surface import (read_surface, write_surface, complete_surface_info,
                       _compute_nearest, _get_ico_surface, read_tri,
-                      _fast_cross_nd_sum, _get_solids)
+                      _get_solids)
+from .parallel import parallel_func
 from .transforms import _ensure_trans, apply_trans, Transform
 from .utils import (verbose, logger, run_subprocess, get_subjects_dir, warn,
-                    _pl, _validate_type, _TempDir)
-from .fixes import einsum
+                    _pl, _validate_type, _TempDir, sizeof_fmt, _check_option)
 
 
 # ############################################################################
@@ -76,65 +76,90 @@ class ConductorModel(dict):
         return None if len(self['layers']) == 0 else self['layers'][-1]['rad']
 
 
-def _calc_beta(rk, rk_norm, rk1, rk1_norm):
+# Number of (field point, triangle) pairs processed at once
+_LIN_POT_CHUNK = 100000
+
+
+def _calc_beta(rk, rk_dot, rk_norm, rk1, rk1_dot, rk1_norm):
     """Compute coefficients for calculating the magic vector omega."""
-    rkk1 = rk1[0] - rk[0]
-    size = np.linalg.norm(rkk1)
-    rkk1 /= size
-    num = rk_norm + np.dot(rk, rkk1)
-    den = rk1_norm + np.dot(rk1, rkk1)
+    rkk1 = rk1 - rk  # the triangle edges
+    size = np.linalg.norm(rkk1, axis=1)
+    rkk1 /= size[:, np.newaxis]
+    fro_dot = (rk1_dot - rk_dot) / size  # field points along the edges
+    num = rk_norm + np.sum(rk * rkk1, axis=1) - fro_dot
+    den = rk1_norm + np.sum(rk1 * rkk1, axis=1) - fro_dot
     res = np.log(num / den) / size
     return res
 
 
 def _lin_pot_coeff(fros, tri_rr, tri_nn, tri_area):
-    """Compute the linear potential matrix element computations."""
-    omega = np.zeros((len(fros), 3))
+    """Compute the linear potential matrix element computations.
+
+    All field points ``fros`` (n_fro, 3) are handled against all triangles
+    ``tri_rr`` (n_tri, 3, 3) at once, giving omega (n_fro, n_tri, 3).
+    """
+    # The vectors from the field points to the triangle corners,
+    # v_i = r_i - fro, only enter through dot products. These are expanded
+    # so that everything depending on both comes from one matrix product
+    # with these per-triangle vectors: the corners, the (scaled) normal,
+    # and the vectors needed for the z-dots below.
+    rs = [tri_rr[:, 0], tri_rr[:, 1], tri_rr[:, 2]]
+    idx = [0, 1, 2, 0, 2]
+    tri_nn2 = np.cross(rs[1] - rs[0], rs[2] - rs[0])
+    ws = rs + [tri_nn2] + [np.cross(tri_nn, rs[idx[k + 1]] - rs[idx[k - 1]])
+                           for k in range(3)]
+    dots = np.dot(fros, np.concatenate(ws).T).reshape(len(fros), 7, -1)
+    ff = np.sum(fros * fros, axis=1)[:, np.newaxis]
+    ls, on_corner = list(), False
+    for ii, r in enumerate(rs):
+        rr = np.sum(r * r, axis=1)
+        ll = rr - 2 * dots[:, ii] + ff
+        # Field points on a triangle corner (i.e., a vertex and the triangles
+        # it belongs to) only get a rounding error as squared distance
+        on_corner = on_corner | (ll <= 100 * np.finfo(float).eps * (rr + ff))
+        ls.append(np.sqrt(np.maximum(ll, 0.)))
+
+    def vdot(ii, jj):
+        return (np.sum(rs[ii] * rs[jj], axis=1) - dots[:, ii] -
+                dots[:, jj] + ff)
 
     # we replicate a little bit of the _get_solids code here for speed
     # (we need some of the intermediate values later)
-    v1 = tri_rr[np.newaxis, 0, :] - fros
-    v2 = tri_rr[np.newaxis, 1, :] - fros
-    v3 = tri_rr[np.newaxis, 2, :] - fros
-    triples = _fast_cross_nd_sum(v1, v2, v3)
-    l1 = np.linalg.norm(v1, axis=1)
-    l2 = np.linalg.norm(v2, axis=1)
-    l3 = np.linalg.norm(v3, axis=1)
-    ss = l1 * l2 * l3
-    ss += einsum('ij,ij,i->i', v1, v2, l3)
-    ss += einsum('ij,ij,i->i', v1, v3, l2)
-    ss += einsum('ij,ij,i->i', v2, v3, l1)
+    triples = np.sum(rs[0] * tri_nn2, axis=1) - dots[:, 3]
+    ss = ls[0] * ls[1] * ls[2]
+    ss += vdot(0, 1) * ls[2]
+    ss += vdot(0, 2) * ls[1]
+    ss += vdot(1, 2) * ls[0]
     solids = np.arctan2(triples, ss)
 
-    # We *could* subselect the good points from v1, v2, v3, triples, solids,
-    # l1, l2, and l3, but there are *very* few bad points. So instead we do
-    # some unnecessary calculations, and then omit them from the final
-    # solution. These three lines ensure we don't get invalid values in
-    # _calc_beta.
-    bad_mask = np.abs(solids) < np.pi / 1e6
-    l1[bad_mask] = 1.
-    l2[bad_mask] = 1.
-    l3[bad_mask] = 1.
-
-    # Calculate the magic vector vec_omega
-    beta = [_calc_beta(v1, l1, v2, l2)[:, np.newaxis],
-            _calc_beta(v2, l2, v3, l3)[:, np.newaxis],
-            _calc_beta(v3, l3, v1, l1)[:, np.newaxis]]
-    vec_omega = (beta[2] - beta[0]) * v1
-    vec_omega += (beta[0] - beta[1]) * v2
-    vec_omega += (beta[1] - beta[2]) * v3
+    # We *could* subselect the good points from the values above, but there
+    # are *very* few bad points. So instead we do some unnecessary
+    # calculations, and then omit them from the final solution. These lines
+    # ensure we don't get invalid values in _calc_beta.
+    bad_mask = on_corner | (np.abs(solids) < np.pi / 1e6)
+    for ll in ls:
+        ll[bad_mask] = 1.
+
+    # Calculate the magic vector vec_omega = sum(cs[i] * v_i), where the
+    # cs sum to zero so that the field point drops out
+    beta = [_calc_beta(rs[ii], dots[:, ii], ls[ii],
+                       rs[jj], dots[:, jj], ls[jj])
+            for ii, jj in ((0, 1), (1, 2), (2, 0))]
+    cs = [beta[2] - beta[0], beta[0] - beta[1], beta[1] - beta[2]]
 
     area2 = 2.0 * tri_area
     n2 = 1.0 / (area2 * area2)
     # leave omega = 0 otherwise
     # Put it all together...
-    yys = [v1, v2, v3]
-    idx = [0, 1, 2, 0, 2]
+    omega = np.empty((len(fros), len(tri_rr), 3))
     for k in range(3):
-        diff = yys[idx[k - 1]] - yys[idx[k + 1]]
-        zdots = _fast_cross_nd_sum(yys[idx[k + 1]], yys[idx[k - 1]], tri_nn)
-        omega[:, k] = -n2 * (area2 * zdots * 2. * solids -
-                             triples * (diff * vec_omega).sum(axis=-1))
+        aa, bb = idx[k - 1], idx[k + 1]
+        diff = rs[aa] - rs[bb]
+        zdots = (np.sum(np.cross(rs[bb], rs[aa]) * tri_nn, axis=1) -
+                 dots[:, 4 + k])
+        diff_omega = sum(c * np.sum(diff * r, axis=1) for c, r in zip(cs, rs))
+        omega[..., k] = -n2 * (area2 * zdots * 2. * solids -
+                               triples * diff_omega)
     # omit the bad points from the solution
     omega[bad_mask] = 0.
     return omega
@@ -164,46 +189,58 @@ def _correct_auto_elements(surf, mat):
     return
 
 
-def _fwd_bem_lin_pot_coeff(surfs):
+def _fwd_bem_lin_pot_coeff(surfs, n_jobs=1):
     """Calculate the coefficients for linear collocation approach."""
     # taken from fwd_bem_linear_collocation.c
     nps = [surf['np'] for surf in surfs]
     np_tot = sum(nps)
     coeff = np.zeros((np_tot, np_tot))
     offsets = np.cumsum(np.concatenate(([0], nps)))
+    parallel, p_fun, n_jobs = parallel_func(_lin_pot_coeff_rows, n_jobs)
     for si_1, surf1 in enumerate(surfs):
-        rr_ord = np.arange(nps[si_1])
+        # each job computes a block of rows (field points)
+        rows = [rr for rr in np.array_split(np.arange(nps[si_1]), n_jobs)
+                if len(rr) > 0]
         for si_2, surf2 in enumerate(surfs):
             logger.info("        %s (%d) -> %s (%d) ..." %
                         (_surf_name[surf1['id']], nps[si_1],
                          _surf_name[surf2['id']], nps[si_2]))
-            tri_rr = surf2['rr'][surf2['tris']]
-            tri_nn = surf2['tri_nn']
-            tri_area = surf2['tri_area']
             submat = coeff[offsets[si_1]:offsets[si_1 + 1],
                            offsets[si_2]:offsets[si_2 + 1]]  # view
-            for k in range(surf2['ntri']):
-                tri = surf2['tris'][k]
-                if si_1 == si_2:
-                    skip_idx = ((rr_ord == tri[0]) |
-                                (rr_ord == tri[1]) |
-                                (rr_ord == tri[2]))
-                else:
-                    skip_idx = list()
-                # No contribution from a triangle that
-                # this vertex belongs to
-                # if sidx1 == sidx2 and (tri == j).any():
-                #     continue
-                # Otherwise do the hard job
-                coeffs = _lin_pot_coeff(surf1['rr'], tri_rr[k], tri_nn[k],
-                                        tri_area[k])
-                coeffs[skip_idx] = 0.
-                submat[:, tri] -= coeffs
+            blocks = parallel(p_fun(
+                surf1['rr'][rr], rr if si_1 == si_2 else None,
+                surf2['rr'][surf2['tris']], surf2['tri_nn'],
+                surf2['tri_area'], surf2['tris'], nps[si_2]) for rr in rows)
+            for rr, block in zip(rows, blocks):
+                submat[rr[0]:rr[-1] + 1] = block
+            del blocks
             if si_1 == si_2:
                 _correct_auto_elements(surf1, submat)
     return coeff
 
 
+def _lin_pot_coeff_rows(fros, fro_idx, tri_rr, tri_nn, tri_area, tris,
+                        n_pts):
+    """Compute the coefficients of some field points for all triangles."""
+    # Sum the coefficients of each triangle's corners into its vertices
+    # using a sparse (n_pts, 3 * n_tri) incidence matrix
+    incidence = sparse.csc_matrix(
+        (np.ones(tris.size), (tris.ravel(), np.arange(tris.size))),
+        shape=(n_pts, tris.size))
+    block = np.zeros((n_pts, len(fros)))
+    n_chunk = max(_LIN_POT_CHUNK // len(fros), 1)
+    for start in range(0, len(tris), n_chunk):
+        sl = slice(start, start + n_chunk)
+        coeffs = _lin_pot_coeff(fros, tri_rr[sl], tri_nn[sl], tri_area[sl])
+        # No contribution from a triangle that this vertex belongs to
+        if fro_idx is not None:
+            coeffs[(fro_idx[:, np.newaxis, np.newaxis] ==
+                    tris[np.newaxis, sl]).any(axis=-1)] = 0.
+        block -= incidence[:, 3 * start:3 * start + coeffs[0].size].dot(
+            coeffs.reshape(len(fros), -1).T)
+    return block.T
+
+
 def _fwd_bem_multi_solution(solids, gamma, nps):
     """Do multi surface solution.
 
@@ -217,16 +254,58 @@ def _fwd_bem_multi_solution(solids, gamma, nps):
     assert solids.shape == (n_tot, n_tot)
     nsurf = len(nps)
     defl = 1.0 / n_tot
-    # Modify the matrix
+    # Modify the matrix (in place, as it can be huge)
     offsets = np.cumsum(np.concatenate(([0], nps)))
     for si_1 in range(nsurf):
         for si_2 in range(nsurf):
             mult = pi2 if gamma is None else pi2 * gamma[si_1, si_2]
-            slice_j = slice(offsets[si_1], offsets[si_1 + 1])
-            slice_k = slice(offsets[si_2], offsets[si_2 + 1])
-            solids[slice_j, slice_k] = defl - solids[slice_j, slice_k] * mult
-    solids += np.eye(n_tot)
-    return linalg.inv(solids, overwrite_a=True)
+            sub = solids[offsets[si_1]:offsets[si_1 + 1],
+                         offsets[si_2]:offsets[si_2 + 1]]  # view
+            sub *= -mult
+            sub += defl
+    solids.flat[::n_tot + 1] += 1.
+    return _inv_inplace(solids)
+
+
+def _inv_inplace(a):
+    """Invert a C-contiguous matrix in place using its LU factorization."""
+    # a.T is Fortran-ordered, so LAPACK getrf/getri can overwrite it
+    # without the full-size copy that linalg.inv(a) would make
+    assert a.flags.c_contiguous
+    getrf, getri, getri_lwork = linalg.get_lapack_funcs(
+        ('getrf', 'getri', 'getri_lwork'), (a,))
+    lu, piv, info = getrf(a.T, overwrite_a=True)
+    if info > 0:
+        raise linalg.LinAlgError('BEM coefficient matrix is singular')
+    lwork, info = getri_lwork(a.shape[0])
+    assert info == 0
+    inv, info = getri(lu, piv, lwork=int(lwork), overwrite_lu=True)
+    assert info == 0
+    return inv.T
+
+
+def _bem_solution_memory(nps, dtype, ip):
+    """Estimate the peak memory (in bytes) needed for a BEM solution."""
+    n_tot, n_last = sum(nps), nps[-1]
+    # coefficients (later inverted in place) plus one block being assembled
+    peak = 8 * (n_tot * n_tot + max(nps) ** 2)
+    if ip:  # homogeneous solution and one product with it
+        peak = max(peak, 8 * (n_tot * n_tot + n_last * (n_last + n_tot)))
+    if dtype == np.float32:  # conversion (double and single precision)
+        peak = max(peak, 12 * n_tot * n_tot)
+    return peak
+
+
+def _get_available_memory():
+    """Get the available (or else total) physical memory in bytes."""
+    try:
+        import psutil
+    except ImportError:
+        try:
+            return os.sysconf('SC_PHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+        except (AttributeError, ValueError, OSError):
+            return None
+    return psutil.virtual_memory().available
 
 
 def _fwd_bem_homog_solution(solids, nps):
@@ -271,44 +350,71 @@ def _check_complete_surface(surf, copy=False, incomplete='raise', extra=''):
     return surf
 
 
-def _fwd_bem_linear_collocation_solution(m):
+def _fwd_bem_linear_collocation_solution(m, dtype=np.float64, n_jobs=1):
     """Compute the linear collocation potential solution."""
     # first, add surface geometries
     for surf in m['surfs']:
         _check_complete_surface(surf)
 
-    logger.info('Computing the linear collocation solution...')
+    nps = [surf['np'] for surf in m['surfs']]
+    ip_mult = m['sigma'][1] / m['sigma'][2] if len(nps) == 3 else np.inf
+    ip = ip_mult <= FWD.BEM_IP_APPROACH_LIMIT
+    peak = _bem_solution_memory(nps, dtype, ip)
+    logger.info('Computing the linear collocation solution (%d x %d, '
+                'requires about %s of memory)...'
+                % (sum(nps), sum(nps), sizeof_fmt(peak)))
+    available = _get_available_memory()
+    if available is not None and peak > available:
+        warn('The BEM solution requires about %s of memory, but only %s '
+             'is available. Consider using fewer vertices (a lower ico '
+             'subdivision) for the BEM surfaces.'
+             % (sizeof_fmt(peak), sizeof_fmt(available)))
     logger.info('    Matrix coefficients...')
-    coeff = _fwd_bem_lin_pot_coeff(m['surfs'])
+    coeff = _fwd_bem_lin_pot_coeff(m['surfs'], n_jobs)
     m['nsol'] = len(coeff)
     logger.info("    Inverting the coefficient matrix...")
-    nps = [surf['np'] for surf in m['surfs']]
     m['solution'] = _fwd_bem_multi_solution(coeff, m['gamma'], nps)
-    if len(m['surfs']) == 3:
-        ip_mult = m['sigma'][1] / m['sigma'][2]
-        if ip_mult <= FWD.BEM_IP_APPROACH_LIMIT:
-            logger.info('IP approach required...')
-            logger.info('    Matrix coefficients (homog)...')
-            coeff = _fwd_bem_lin_pot_coeff([m['surfs'][-1]])
-            logger.info('    Inverting the coefficient matrix (homog)...')
-            ip_solution = _fwd_bem_homog_solution(coeff,
-                                                  [m['surfs'][-1]['np']])
-            logger.info('    Modify the original solution to incorporate '
-                        'IP approach...')
-            _fwd_bem_ip_modify_solution(m['solution'], ip_solution, ip_mult,
-                                        nps)
+    del coeff  # destroyed
+    if ip:
+        logger.info('IP approach required...')
+        logger.info('    Matrix coefficients (homog)...')
+        coeff = _fwd_bem_lin_pot_coeff([m['surfs'][-1]], n_jobs)
+        logger.info('    Inverting the coefficient matrix (homog)...')
+        ip_solution = _fwd_bem_homog_solution(coeff, [m['surfs'][-1]['np']])
+        logger.info('    Modify the original solution to incorporate '
+                    'IP approach...')
+        _fwd_bem_ip_modify_solution(m['solution'], ip_solution, ip_mult,
+                                    nps)
+        del coeff, ip_solution
+    if dtype != m['solution'].dtype:
+        m['solution'] = m['solution'].astype(dtype)
     m['bem_method'] = FWD.BEM_LINEAR_COLL
     logger.info("Solution ready.")
 
 
 @verbose
-def make_bem_solution(surfs, verbose=None):
+def make_bem_solution(surfs, dtype='float64', n_jobs=1, verbose=None):
     """Create a BEM solution using the linear collocation approach.
 
     Parameters
     ----------
     surfs : list of dict
         The BEM surfaces to use (`from make_bem_model`)
+    dtype : str
+        The data type used to store the solution matrix, can be
+        ``'float64'`` (default) or ``'float32'``. The solution is always
+        computed in double precision, but ``'float32'`` halves the memory
+        needed to store and use it (solutions are saved to disk in single
+        precision anyway). It does not lower the peak memory usage of this
+        function, which is about ``8 * n ** 2`` bytes for ``n`` vertices in
+        total, and ``12 * n ** 2`` bytes with ``'float32'`` during the
+        conversion.
+
+        .. versionadded:: 0.20
+    %(n_jobs)s
+        It is used to compute blocks of the coefficient matrix in parallel.
+
+        .. versionadded:: 0.20
     %(verbose)s
 
     Returns
@@ -328,6 +434,8 @@ def make_bem_solution(surfs, verbose=None):
     read_bem_solution
     write_bem_solution
     """
+    _check_option('dtype', dtype, ('float64', 'float32'))
+    dtype = np.dtype(dtype)
     logger.info('Approximation method : Linear collocation\n')
     if isinstance(surfs, str):
         # Load the surfaces
@@ -342,7 +450,7 @@ def make_bem_solution(surfs, verbose=None):
     else:
         raise RuntimeError('Only 1- or 3-layer BEM computations supported')
     _check_bem_size(bem['surfs'])
-    _fwd_bem_linear_collocation_solution(bem)
+    _fwd_bem_linear_collocation_solution(bem, dtype, n_jobs)
     logger.info('BEM geometry computations complete.')
     return bem
 
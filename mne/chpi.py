@@ -16,11 +16,14 @@
 #     5. Use a linear model (DC + linear slope + sin + cos terms set up
 #        in ``_setup_hpi_struct``) to fit sinusoidal amplitudes to MEG
 #        channels. Use SVD to determine the phase/amplitude of the sinusoids.
-#        This step is accomplished using ``_fit_cHPI_amplitudes``
+#        This step is accomplished for all windows at once using
+#        ``_fit_chpi_amplitudes_batch``.
 #     6. If the amplitudes are 98% correlated with last position
 #        (and Δt < t_step_max), skip fitting.
 #     7. Fit magnetic dipoles using the amplitudes for each coil frequency
-#        (calling ``_fit_magnetic_dipole``).
+#        (calling ``_fit_magnetic_dipole`` for each coil, or
+#        ``_fit_magnetic_dipoles`` for all coils at once using gradients),
+#        starting from the last coil positions.
 #     8. If ``use_distances is True`` choose good coils based on pairwise
 #        distances, taking into account the tolerance ``dist_limit``.
 #     9. Fit dev_head_t quaternion (using ``_fit_chpi_quat``).
@@ -45,6 +48,7 @@ from .io.ctf.trans import _make_ctf_coord_trans_set
 from .forward import (_magnetic_dipole_field_vec, _create_meg_coils,
                       _concatenate_coils)
 from .cov import make_ad_hoc_cov, compute_whitener
+from .fixes import einsum
 from .transforms import (apply_trans, invert_transform, _angle_between_quats,
                          quat_to_rot, rot_to_quat)
 from .utils import (verbose, logger, use_log_level, _check_fname, warn,
@@ -404,6 +408,46 @@ def _fit_magnetic_dipole(B_orig, x0, coils, scale, method, too_close):
     return x, 1. - objective(x) / B2
 
 
+def _magnetic_dipole_objective_grad(x, B, B2, coils, scale, too_close):
+    """Compute the summed objective and its gradient for all coils at once.
+
+    Row ``i`` of the whitened data ``B`` is explained by a dipole at
+    ``x[3 * i:3 * i + 3]`` (in mm).
+    """
+    x = x.reshape(-1, 3) * 1e-3
+    fwd, dfwd = _magnetic_dipole_field_vec(x, coils, too_close, grad=True)
+    fwd = np.dot(fwd, scale.T).reshape(len(x), 3, -1)
+    dfwd = np.dot(dfwd, scale.T)
+    u, s, v = np.linalg.svd(fwd, full_matrices=False)
+    Bm = einsum('ijk,ik->ij', v, B)
+    resid = B - einsum('ijk,ij->ik', v, Bm)
+    # least-squares dipole moments, which give the gradient (variable
+    # projection) without differentiating the SVD
+    q = einsum('ijk,ik->ij', u, Bm / s)
+    grad = einsum('ik,ijlk,il->ij', resid, dfwd, q)
+    grad *= -2e-3 / B2[:, np.newaxis]
+    return (np.sum(resid * resid, axis=1) / B2).sum(), grad.ravel()
+
+
+def _fit_magnetic_dipoles(B_orig, x0, coils, scale, too_close):
+    """Fit the data of all coils at once (x0 = pos) using the gradient."""
+    from scipy.optimize import minimize
+    B = np.dot(B_orig, scale.T)  # whitened data, one row per coil
+    B2 = np.sum(B * B, axis=1)
+    objective = partial(_magnetic_dipole_objective_grad, B=B, B2=B2,
+                        coils=coils, scale=scale, too_close=too_close)
+    # Optimize in mm so that the initial step sizes are reasonable
+    x = minimize(objective, 1e3 * np.ravel(x0), jac=True, method='L-BFGS-B',
+                 options=dict(ftol=1e-12, gtol=1e-6)).x
+    x = x.reshape(-1, 3)
+    fwd = np.dot(_magnetic_dipole_field_vec(x * 1e-3, coils, too_close),
+                 scale.T).reshape(len(x), 3, -1)
+    v = np.linalg.svd(fwd, full_matrices=False)[2]
+    Bm = einsum('ijk,ik->ij', v, B)
+    gofs = np.sum(Bm * Bm, axis=1) / B2
+    return [(this_x, gof) for this_x, gof in zip(x * 1e-3, gofs)]
+
+
 def _chpi_objective(x, coil_dev_rrs, coil_head_rrs):
     """Compute objective function."""
     d = np.dot(coil_dev_rrs, quat_to_rot(x[:3]).T)
@@ -552,67 +596,127 @@ def _fit_cHPI_amplitudes(raw, time_sl, hpi, fit_time, verbose=None):
         The sin amplitudes matching each cHPI frequency
             or None if this time window should be skipped
     """
-    # No need to detrend the data because our model has a DC term
-    with use_log_level(False):
-        # loads good channels
-        this_data = raw[hpi['meg_picks'], time_sl][0]
+    return _fit_chpi_amplitudes_batch(raw, [time_sl], hpi, [fit_time])[0]
+
+
+_CHPI_AMP_BLOCK_SIZE = 2e6  # number of data values to read and fit at once
+
+
+def _split_chpi_blocks(starts, n_times, n_block, max_span):
+    """Split sorted window starts into blocks of bounded count and span."""
+    blocks, first = list(), 0
+    for ii in range(1, len(starts) + 1):
+        if ii == len(starts) or ii - first >= n_block or \
+                starts[ii] + n_times - starts[first] > max_span:
+            blocks.append(np.arange(first, ii))
+            first = ii
+    return blocks
+
+
+def _fit_chpi_amplitudes_batch(raw, time_sls, hpi, fit_times):
+    """Fit cHPI amplitudes for many time windows at once.
+
+    The data for blocks of windows are read only once, and windows of the
+    same length share the linear model, its pseudoinverse, and the
+    subsequent phase estimation and goodness of fit computations.
 
+    Returns
+    -------
+    sin_fits : list of ndarray, shape (n_freqs, n_channels) | None
+        The sin amplitudes for each window (see ``_fit_cHPI_amplitudes``).
+    """
+    sin_fits = [None] * len(time_sls)
+    starts = np.array([sl.start for sl in time_sls], int)
+    lens = np.array([sl.stop - sl.start for sl in time_sls], int)
+    n_chan = len(hpi['meg_picks'])
+    for this_len in np.unique(lens):
+        if this_len == hpi['n_window']:
+            model, inv_model = hpi['model'], hpi['inv_model']
+        else:  # first or last window
+            model = hpi['model'][:this_len]
+            inv_model = linalg.pinv(model)
+        idx = np.where(lens == this_len)[0]
+        idx = idx[np.argsort(starts[idx], kind='stable')]
+        n_block = max(int(_CHPI_AMP_BLOCK_SIZE // (this_len * n_chan)), 1)
+        # overlapping windows read fewer samples than they fit, so the
+        # contiguous span of data read for a block is bounded separately
+        max_span = max(int(_CHPI_AMP_BLOCK_SIZE // n_chan), this_len)
+        for block in _split_chpi_blocks(starts[idx], this_len, n_block,
+                                        max_span):
+            block = idx[block]
+            block_fits = _fit_chpi_amplitudes_block(
+                raw, starts[block], this_len, hpi, model, inv_model,
+                np.array(fit_times)[block])
+            for ii, this_fit in zip(block, block_fits):
+                sin_fits[ii] = this_fit
+    return sin_fits
+
+
+def _fit_chpi_amplitudes_block(raw, starts, n_times, hpi, model, inv_model,
+                               fit_times):
+    """Fit cHPI amplitudes for windows of data starting at given samples."""
+    block_sl = slice(starts.min(), starts.max() + n_times)
+    offsets = starts - block_sl.start
+    use = np.ones(len(starts), bool)
     # which HPI coils to use
     # other then erroring I don't see this getting used elsewhere?
     if hpi['hpi_pick'] is not None:
         with use_log_level(False):
             # loads hpi_stim channel
-            chpi_data = raw[hpi['hpi_pick'], time_sl][0]
-
-        ons = (np.round(chpi_data).astype(np.int) &
+            chpi_data = raw[hpi['hpi_pick'], block_sl][0][0]
+        chpi_data = chpi_data[offsets[:, np.newaxis] + np.arange(n_times)]
+        ons = (np.round(chpi_data).astype(int)[:, np.newaxis] &
                hpi['on'][:, np.newaxis]).astype(bool)
-        n_on = np.sum(ons, axis=0)
-        if not (n_on >= 3).all():
+        n_on = np.sum(ons, axis=1).min(axis=-1)
+        use = n_on >= 3
+        for fit_time, this_n_on in zip(fit_times[~use], n_on[~use]):
             logger.info(_time_prefix(fit_time) + '%s < 3 HPI coils turned on, '
-                        'skipping fit' % (n_on.min(),))
-            return None
-        # #TODO REMOVE # ons = ons.all(axis=1)  # which HPI coils to use
+                        'skipping fit' % (this_n_on,))
+        if not use.any():
+            return [None] * len(starts)
+        offsets, fit_times = offsets[use], fit_times[use]
+    with use_log_level(False):
+        # loads good channels
+        data = raw[hpi['meg_picks'], block_sl][0]
 
+    # Fit the linear model to all windows
     n_freqs = hpi['n_freqs']
-    this_len = time_sl.stop - time_sl.start
-    if this_len == hpi['n_window']:
-        model, inv_model = hpi['model'], hpi['inv_model']
-    else:  # first or last window
-        model = hpi['model'][:this_len]
-        inv_model = linalg.pinv(model)
-    X = np.dot(inv_model, this_data.T)
-    X_sin, X_cos = X[:n_freqs], X[n_freqs:2 * n_freqs]
+    X = np.empty((len(offsets), len(data), len(inv_model)))
+    inv_model = inv_model.T
+    for this_X, offset in zip(X, offsets):
+        np.dot(data[:, offset:offset + n_times], inv_model, out=this_X)
 
     # use SVD across all sensors to estimate the sinusoid phase
-    sin_fit = np.zeros((n_freqs, X_sin.shape[1]))
-    for fi in range(n_freqs):
-        u, s, vt = np.linalg.svd(np.vstack((X_sin[fi, :], X_cos[fi, :])),
-                                 full_matrices=False)
-        # the first component holds the predominant phase direction
-        # (so ignore the second, effectively doing s[1] = 0):
-        sin_fit[fi, :] = vt[0]
-        # Do not modify X, however, because it will break the signal
-        # reconstruction step.
-
-    data_diff_sq = np.dot(model, X).T - this_data
-    data_diff_sq *= data_diff_sq
-    data_diff_sq = np.sum(data_diff_sq, axis=-1)
+    # the first component holds the predominant phase direction
+    # (so ignore the second, effectively doing s[1] = 0):
+    # Do not modify X, however, because it will break the signal
+    # reconstruction step.
+    sin_fit = np.stack([X[:, :, :n_freqs], X[:, :, n_freqs:2 * n_freqs]],
+                       axis=-1).transpose(0, 2, 3, 1)
+    sin_fit = np.linalg.svd(sin_fit, full_matrices=False)[2][:, :, 0]
 
     # compute amplitude correlation (for logging), protect against zero
-    norm = this_data
-    del this_data
-    norm *= norm
-    norm = np.sum(norm, axis=-1)
-    norm_sum = norm.sum()
-    norm_sum = np.inf if norm_sum == 0 else norm_sum
+    # (model @ inv_model is an orthogonal projector, so the squared residual
+    # is the squared norm of the data minus that of the fit)
+    norm = np.cumsum(data * data, axis=1)
+    norm = np.concatenate([np.zeros((len(norm), 1)), norm], axis=1)
+    norm = (norm[:, offsets + n_times] - norm[:, offsets]).T
+    data_diff_sq = np.matmul(X, np.dot(model.T, model))
+    data_diff_sq *= X
+    data_diff_sq = norm - data_diff_sq.sum(axis=-1)
+    norm_sum = norm.sum(axis=-1)
+    norm_sum[norm_sum == 0] = np.inf
     norm[norm == 0] = np.inf
-    g_sin = 1 - data_diff_sq.sum() / norm_sum
+    g_sin = 1 - data_diff_sq.sum(axis=-1) / norm_sum
     g_chan = 1 - data_diff_sq / norm
-    logger.debug('    HPI amplitude correlation %0.3f: %0.3f '
-                 '(%s chnls > 0.95)' % (fit_time, g_sin,
-                                        (g_chan > 0.95).sum()))
-
-    return sin_fit
+    for fit_time, this_g_sin, this_g_chan in zip(fit_times, g_sin, g_chan):
+        logger.debug('    HPI amplitude correlation %0.3f: %0.3f '
+                     '(%s chnls > 0.95)' % (fit_time, this_g_sin,
+                                            (this_g_chan > 0.95).sum()))
+    sin_fits = [None] * len(starts)
+    for ii, this_fit in zip(np.where(use)[0], sin_fit):
+        sin_fits[ii] = this_fit
+    return sin_fits
 
 
 @verbose
@@ -681,7 +785,7 @@ def _fit_device_hpi_positions(raw, t_win=None, initial_dev_rrs=None,
 def _calculate_chpi_positions(raw, t_step_min=0.1, t_step_max=10.,
                               t_window=0.2, dist_limit=0.005, gof_limit=0.98,
                               use_distances=True, too_close='raise',
-                              verbose=None):
+                              optimizer='cobyla', verbose=None):
     """Calculate head positions using cHPI coils.
 
     Parameters
@@ -704,6 +808,13 @@ def _calculate_chpi_positions(raw, t_step_min=0.1, t_step_max=10.,
     too_close : str
         How to handle HPI positions too close to the sensors,
         can be 'raise', 'warning', or 'info'.
+    optimizer : str
+        Can be 'cobyla' (default) to fit each coil separately with a
+        derivative-free optimizer, or 'lbfgs' to fit all coils of a time
+        point jointly using analytic gradients of the dipole fields,
+        which is usually faster.
+
+        .. versionadded:: 0.20
     %(verbose)s
 
     Returns
@@ -725,6 +836,7 @@ def _calculate_chpi_positions(raw, t_step_min=0.1, t_step_max=10.,
     # extract initial geometry from info['hpi_results']
     hpi_dig_head_rrs = _get_hpi_initial_fit(raw.info)
     _check_option('too_close', too_close, ['raise', 'warning', 'info'])
+    _check_option('optimizer', optimizer, ['cobyla', 'lbfgs'])
 
     # extract hpi system information
     hpi = _setup_hpi_struct(raw.info, int(round(t_window * raw.info['sfreq'])))
@@ -754,22 +866,21 @@ def _calculate_chpi_positions(raw, t_step_min=0.1, t_step_max=10.,
     pos_0 = None
 
     hpi['n_freqs'] = len(hpi['freqs'])
-    for midpt in fit_idxs:
-        #
-        # 0. determine samples to fit.
-        #
-        fit_time = (midpt + raw.first_samp - hpi['n_window'] / 2.) /\
-            raw.info['sfreq']
-
-        time_sl = midpt - hpi['n_window'] // 2
-        time_sl = slice(max(time_sl, 0),
-                        min(time_sl + hpi['n_window'], len(raw.times)))
-
-        #
-        # 1. Fit amplitudes for each channel from each of the N cHPI sinusoids
-        #
-        sin_fit = _fit_cHPI_amplitudes(raw, time_sl, hpi, fit_time)
-
+    #
+    # 0. determine samples to fit.
+    #
+    fit_times = (fit_idxs + raw.first_samp - hpi['n_window'] / 2.) / \
+        raw.info['sfreq']
+    time_sls = [slice(max(start, 0),
+                      min(start + hpi['n_window'], len(raw.times)))
+                for start in fit_idxs - hpi['n_window'] // 2]
+
+    #
+    # 1. Fit amplitudes for each channel from each of the N cHPI sinusoids
+    #    (for all time windows at once)
+    #
+    sin_fits = _fit_chpi_amplitudes_batch(raw, time_sls, hpi, fit_times)
+    for fit_time, sin_fit in zip(fit_times, sin_fits):
         # skip this window if bad
         # logging has already been done! Maybe turn this into an Exception
         if sin_fit is None:
@@ -793,10 +904,16 @@ def _calculate_chpi_positions(raw, t_step_min=0.1, t_step_max=10.,
         #
         # 2. Fit magnetic dipole for each coil to obtain coil positions
         #    in device coordinates
+        #    (jointly or one by one, starting from the last positions)
         #
-        outs = [_fit_magnetic_dipole(f, pos, hpi['coils'], hpi['scale'],
-                                     hpi['method'], too_close)
-                for f, pos in zip(sin_fit, last['coil_dev_rrs'])]
+        if optimizer == 'lbfgs':
+            outs = _fit_magnetic_dipoles(sin_fit, last['coil_dev_rrs'],
+                                         hpi['coils'], hpi['scale'],
+                                         too_close)
+        else:
+            outs = [_fit_magnetic_dipole(f, pos, hpi['coils'], hpi['scale'],
+                                         hpi['method'], too_close)
+                    for f, pos in zip(sin_fit, last['coil_dev_rrs'])]
         this_coil_dev_rrs = np.array([o[0] for o in outs])
         g_coils = [o[1] for o in outs]
 
@@ -909,7 +1026,8 @@ def _calculate_chpi_positions(raw, t_step_min=0.1, t_step_max=10.,
 @verbose
 def _calculate_chpi_coil_locs(raw, t_step_min=0.1, t_step_max=10.,
                               t_window=0.2, dist_limit=0.005, gof_limit=0.98,
-                              too_close='raise', verbose=None):
+                              too_close='raise', optimizer='cobyla',
+                              verbose=None):
     """Calculate locations of each cHPI coils over time.
 
     Parameters
@@ -930,6 +1048,13 @@ def _calculate_chpi_coil_locs(raw, t_step_min=0.1, t_step_max=10.,
     too_close : str
         How to handle HPI positions too close to the sensors,
         can be 'raise', 'warning', or 'info'.
+    optimizer : str
+        Can be 'cobyla' (default) to fit each coil separately with a
+        derivative-free optimizer, or 'lbfgs' to fit all coils of a time
+        point jointly using analytic gradients of the dipole fields,
+        which is usually faster.
+
+        .. versionadded:: 0.20
     %(verbose)s
 
     Returns
@@ -951,6 +1076,7 @@ def _calculate_chpi_coil_locs(raw, t_step_min=0.1, t_step_max=10.,
     write_head_pos
     """
     _check_option('too_close', too_close, ['raise', 'warning', 'info'])
+    _check_option('optimizer', optimizer, ['cobyla', 'lbfgs'])
 
     # extract initial geometry from info['hpi_results']
     hpi_dig_head_rrs = _get_hpi_initial_fit(raw.info)
@@ -977,22 +1103,21 @@ def _calculate_chpi_coil_locs(raw, t_step_min=0.1, t_step_max=10.,
                 % (len(fit_idxs), t_end - t_begin))
 
     hpi['n_freqs'] = len(hpi['freqs'])
-    for midpt in fit_idxs:
-        #
-        # 0. determine samples to fit.
-        #
-        fit_time = (midpt + raw.first_samp - hpi['n_window'] / 2.) /\
-            raw.info['sfreq']
-
-        time_sl = midpt - hpi['n_window'] // 2
-        time_sl = slice(max(time_sl, 0),
-                        min(time_sl + hpi['n_window'], len(raw.times)))
-
-        #
-        # 1. Fit amplitudes for each channel from each of the N cHPI sinusoids
-        #
-        sin_fit = _fit_cHPI_amplitudes(raw, time_sl, hpi, fit_time)
-
+    #
+    # 0. determine samples to fit.
+    #
+    fit_times = (fit_idxs + raw.first_samp - hpi['n_window'] / 2.) / \
+        raw.info['sfreq']
+    time_sls = [slice(max(start, 0),
+                      min(start + hpi['n_window'], len(raw.times)))
+                for start in fit_idxs - hpi['n_window'] // 2]
+
+    #
+    # 1. Fit amplitudes for each channel from each of the N cHPI sinusoids
+    #    (for all time windows at once)
+    #
+    sin_fits = _fit_chpi_amplitudes_batch(raw, time_sls, hpi, fit_times)
+    for fit_time, sin_fit in zip(fit_times, sin_fits):
         # skip this window if bad
         # logging has already been done! Maybe turn this into an Exception
         if sin_fit is None:
@@ -1013,10 +1138,16 @@ def _calculate_chpi_coil_locs(raw, t_step_min=0.1, t_step_max=10.,
         #
         # 2. Fit magnetic dipole for each coil to obtain coil positions
         #    in device coordinates
+        #    (jointly or one by one, starting from the last positions)
         #
-        outs = [_fit_magnetic_dipole(f, pos, hpi['coils'], hpi['scale'],
-                                     hpi['method'], too_close)
-                for f, pos in zip(sin_fit, last['coil_dev_rrs'])]
+        if optimizer == 'lbfgs':
+            outs = _fit_magnetic_dipoles(sin_fit, last['coil_dev_rrs'],
+                                         hpi['coils'], hpi['scale'],
+                                         too_close)
+        else:
+            outs = [_fit_magnetic_dipole(f, pos, hpi['coils'], hpi['scale'],
+                                         hpi['method'], too_close)
+                    for f, pos in zip(sin_fit, last['coil_dev_rrs'])]
 
         dig = []
         for idx, o in enumerate(outs):
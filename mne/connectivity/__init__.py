@@ -1,6 +1,6 @@
 """Spectral and effective connectivity measures."""
 
 from .utils import seed_target_indices, degree
-from .spectral import spectral_connectivity
+from .spectral import spectral_connectivity, spectral_connectivity_windowed
 from .effective import phase_slope_index
 from .envelope import envelope_correlation
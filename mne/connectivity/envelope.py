@@ -4,16 +4,19 @@
 #
 # License: BSD (3-clause)
 
+from itertools import islice
+
 import numpy as np
 
 from ..filter import next_fast_len
+from ..parallel import parallel_func
 from ..source_estimate import _BaseSourceEstimate
-from ..utils import verbose, _check_combine, _check_option
+from ..utils import verbose, _check_combine, _check_option, _validate_type
 
 
 @verbose
 def envelope_correlation(data, combine='mean', orthogonalize="pairwise",
-                         verbose=None):
+                         n_jobs=1, verbose=None):
     """Compute the envelope correlation.
 
     Parameters
@@ -40,6 +43,10 @@ def envelope_correlation(data, combine='mean', orthogonalize="pairwise",
         absolute values.
 
         .. versionadded:: 0.19
+    %(n_jobs)s
+        Epochs are processed in parallel threads.
+
+        .. versionadded:: 0.20
     %(verbose)s
 
     Returns
@@ -64,67 +71,123 @@ def envelope_correlation(data, combine='mean', orthogonalize="pairwise",
            Neuroimage 174:57–68
     """
     _check_option('orthogonalize', orthogonalize, (False, 'pairwise'))
-    from scipy.signal import hilbert
     n_nodes = None
     if combine is not None:
         fun = _check_combine(combine, valid=('mean',))
     else:  # None
         fun = np.array
 
+    parallel, my_epoch_corr, n_jobs = parallel_func(
+        _epoch_envelope_correlation, n_jobs, prefer='threads')
     corrs = list()
-    # Note: This is embarassingly parallel, but the overhead of sending
-    # the data to different workers is roughly the same as the gain of
-    # using multiple CPUs. And we require too much GIL for prefer='threading'
-    # to help.
-    for ei, epoch_data in enumerate(data):
-        if isinstance(epoch_data, _BaseSourceEstimate):
-            epoch_data = epoch_data.data
-        if epoch_data.ndim != 2:
-            raise ValueError('Each entry in data must be 2D, got shape %s'
-                             % (epoch_data.shape,))
-        n_nodes, n_times = epoch_data.shape
-        if ei > 0 and n_nodes != corrs[0].shape[0]:
-            raise ValueError('n_nodes mismatch between data[0] and data[%d], '
-                             'got %s and %s'
-                             % (ei, n_nodes, corrs[0].shape[0]))
-        # Get the complex envelope (allowing complex inputs allows people
-        # to do raw.apply_hilbert if they want)
-        if epoch_data.dtype in (np.float32, np.float64):
-            n_fft = next_fast_len(n_times)
-            epoch_data = hilbert(epoch_data, N=n_fft, axis=-1)[..., :n_times]
-
-        if epoch_data.dtype not in (np.complex64, np.complex128):
-            raise ValueError('data.dtype must be float or complex, got %s'
-                             % (epoch_data.dtype,))
-        data_mag = np.abs(epoch_data)
-        data_conj_scaled = epoch_data.conj()
-        data_conj_scaled /= data_mag
-        # subtract means
-        data_mag_nomean = data_mag - np.mean(data_mag, axis=-1, keepdims=True)
-        # compute variances using linalg.norm (square, sum, sqrt) since mean=0
-        data_mag_std = np.linalg.norm(data_mag_nomean, axis=-1)
-        data_mag_std[data_mag_std == 0] = 1
-        corr = np.empty((n_nodes, n_nodes))
-        for li, label_data in enumerate(epoch_data):
-            if orthogonalize is False:  # the new code
-                label_data_orth = data_mag
-                label_data_orth_std = data_mag_std
-            else:
-                label_data_orth = (label_data * data_conj_scaled).imag
-                label_data_orth -= np.mean(label_data_orth, axis=-1,
-                                           keepdims=True)
-                label_data_orth_std = np.linalg.norm(label_data_orth, axis=-1)
-                label_data_orth_std[label_data_orth_std == 0] = 1
-            # correlation is dot product divided by variances
-            corr[li] = np.dot(label_data_orth, data_mag_nomean[li])
-            corr[li] /= data_mag_std[li]
-            corr[li] /= label_data_orth_std
-        if orthogonalize is not False:
-            # Make it symmetric (it isn't at this point)
-            corr = np.abs(corr)
-            corr = (corr.T + corr) / 2.
-        corrs.append(corr)
-        del corr
+    # Most of the time is spent in BLAS calls that release the GIL, so
+    # threads can process several epochs at once without copying the data.
+    data = iter(data)
+    while True:
+        epoch_block = list(islice(data, n_jobs))
+        if len(epoch_block) == 0:
+            break
+        for ei, epoch_data in enumerate(epoch_block, len(corrs)):
+            if isinstance(epoch_data, _BaseSourceEstimate):
+                epoch_data = epoch_block[ei - len(corrs)] = epoch_data.data
+            _validate_type(epoch_data, np.ndarray, 'data[%d]' % (ei,),
+                           'ndarray or SourceEstimate')
+            if epoch_data.ndim != 2:
+                raise ValueError('Each entry in data must be 2D, got shape %s'
+                                 % (epoch_data.shape,))
+            if ei > 0 and epoch_data.shape[0] != n_nodes:
+                raise ValueError('n_nodes mismatch between data[0] and '
+                                 'data[%d], got %s and %s'
+                                 % (ei, epoch_data.shape[0], n_nodes))
+            n_nodes = epoch_data.shape[0]
+        corrs.extend(parallel(my_epoch_corr(epoch_data, orthogonalize)
+                              for epoch_data in epoch_block))
 
     corr = fun(corrs)
     return corr
+
+
+# relative variance of an orthogonalized envelope below which it is centered
+# explicitly instead of using the sum of squares, and the number of values of
+# such envelopes to compute at once
+_ORTH_VAR_RTOL = 1e-3
+_ORTH_BLOCK_SIZE = 1e6
+
+
+def _epoch_envelope_correlation(epoch_data, orthogonalize):
+    """Compute the envelope correlation of a single epoch."""
+    from scipy.signal import hilbert
+    n_nodes, n_times = epoch_data.shape
+    # Get the complex envelope (allowing complex inputs allows people
+    # to do raw.apply_hilbert if they want)
+    if epoch_data.dtype in (np.float32, np.float64):
+        n_fft = next_fast_len(n_times)
+        epoch_data = hilbert(epoch_data, N=n_fft, axis=-1)[..., :n_times]
+
+    if epoch_data.dtype not in (np.complex64, np.complex128):
+        raise ValueError('data.dtype must be float or complex, got %s'
+                         % (epoch_data.dtype,))
+    data_mag = np.abs(epoch_data)
+    # subtract means
+    data_mag_nomean = data_mag - np.mean(data_mag, axis=-1, keepdims=True)
+    # compute variances using linalg.norm (square, sum, sqrt) since mean=0
+    data_mag_std = np.linalg.norm(data_mag_nomean, axis=-1)
+    data_mag_std[data_mag_std == 0] = 1
+    if orthogonalize is False:  # the new code
+        corr = np.dot(data_mag_nomean, data_mag_nomean.T)
+        corr /= data_mag_std
+        corr /= data_mag_std[:, np.newaxis]
+        return corr
+
+    # The envelope of label li orthogonalized w.r.t. label lj is
+    #
+    #     imag(x_li * conj(x_lj) / |x_lj|) = re_li * im_lj + im_li * re_lj
+    #
+    # with re/im the real and imaginary parts of x and conj(x) / |x|,
+    # respectively. Its dot products with the envelopes and with itself
+    # (for the variance) are thus matrix products over time, so we never
+    # need to form the (n_nodes, n_nodes, n_times) orthogonalized data.
+    data_conj_scaled = epoch_data.conj()
+    data_conj_scaled /= data_mag
+    re, im = epoch_data.real, epoch_data.imag
+    re_s, im_s = data_conj_scaled.real, data_conj_scaled.imag
+    # correlation is dot product divided by variances (the mean of the
+    # orthogonalized data does not matter as data_mag_nomean has zero mean)
+    corr = (np.dot(data_mag_nomean * re, im_s.T) +
+            np.dot(data_mag_nomean * im, re_s.T))
+    # sum and sum of squares of the orthogonalized data over time
+    orth_sum = np.dot(re, im_s.T) + np.dot(im, re_s.T)
+    orth_sq = (np.dot(re * re, (im_s * im_s).T) +
+               2 * np.dot(re * im, (im_s * re_s).T) +
+               np.dot(im * im, (re_s * re_s).T))
+    orth_std = orth_sq - orth_sum * orth_sum / n_times
+    # The difference cancels badly when an orthogonalized envelope is almost
+    # constant (e.g., for steady phase-locked oscillations), so center those
+    # envelopes explicitly before taking their norms and dot products
+    bad = orth_std <= _ORTH_VAR_RTOL * orth_sq
+    bad.flat[::n_nodes + 1] = False  # handled below
+    bad_li, bad_lj = np.where(bad)
+    n_block = max(int(_ORTH_BLOCK_SIZE // n_times), 1)
+    for start in range(0, len(bad_li), n_block):
+        li = bad_li[start:start + n_block]
+        lj = bad_lj[start:start + n_block]
+        orth = re[li] * im_s[lj] + im[li] * re_s[lj]
+        orth -= np.mean(orth, axis=-1, keepdims=True)
+        orth_std[li, lj] = np.einsum('ij,ij->i', orth, orth)
+        corr[li, lj] = np.einsum('ij,ij->i', orth, data_mag_nomean[li])
+    del orth_sq, bad
+    np.sqrt(np.maximum(orth_std, 0, out=orth_std), out=orth_std)
+    # A signal orthogonalized w.r.t. itself is only round-off error, which
+    # the matrix products above do not reproduce, so compute it directly
+    diag_orth = (epoch_data * data_conj_scaled).imag
+    diag_orth -= np.mean(diag_orth, axis=-1, keepdims=True)
+    orth_std.flat[::n_nodes + 1] = np.linalg.norm(diag_orth, axis=-1)
+    corr.flat[::n_nodes + 1] = np.einsum('ij,ij->i', diag_orth,
+                                         data_mag_nomean)
+    orth_std[orth_std == 0] = 1
+    corr /= data_mag_std[:, np.newaxis]
+    corr /= orth_std
+    # Make it symmetric (it isn't at this point)
+    corr = np.abs(corr)
+    corr = (corr.T + corr) / 2.
+    return corr
@@ -3,14 +3,18 @@
 #
 # License: BSD (3-clause)
 
+from collections import deque
 from functools import partial
 from inspect import getmembers
+import os.path as op
 
 import numpy as np
+from numpy.lib.format import open_memmap
+from numpy.lib.stride_tricks import as_strided
 
 from .utils import check_indices
 from ..utils import _check_option
-from ..fixes import _get_args, rfftfreq
+from ..fixes import _get_args, rfft, rfftfreq
 from ..parallel import parallel_func
 from ..source_estimate import _BaseSourceEstimate
 from ..epochs import BaseEpochs
@@ -36,6 +40,9 @@ class _AbstractConEstBase(object):
     def combine(self, other):
         raise NotImplementedError('combine method not implemented')
 
+    def subtract(self, other):
+        raise NotImplementedError('subtract method not implemented')
+
     def compute_con(self, con_idx, n_epochs):
         raise NotImplementedError('compute_con method not implemented')
 
@@ -63,6 +70,10 @@ class _EpochMeanConEstBase(_AbstractConEstBase):
         """Include con. accumated for some epochs in this estimate."""
         self._acc += other._acc
 
+    def subtract(self, other):
+        """Remove con. accumulated for some epochs from this estimate."""
+        self._acc -= other._acc
+
 
 class _CohEstBase(_EpochMeanConEstBase):
     """Base Estimator for Coherence, Coherency, Imag. Coherence."""
@@ -330,7 +341,7 @@ def _epoch_spectral_connectivity(data, sig_idx, tmin_idx, tmax_idx, sfreq,
                                  freq_mask, mt_adaptive, idx_map, block_size,
                                  psd, accumulate_psd, con_method_types,
                                  con_methods, n_signals, n_times,
-                                 accumulate_inplace=True):
+                                 accumulate_inplace=True, dense=False):
     """Estimate connectivity for one epoch (see spectral_connectivity)."""
     n_cons = len(idx_map[0])
 
@@ -420,20 +431,8 @@ def _epoch_spectral_connectivity(data, sig_idx, tmin_idx, tmax_idx, sfreq,
 
     # accumulate connectivity scores
     if mode in ['multitaper', 'fourier']:
-        for i in range(0, n_cons, block_size):
-            con_idx = slice(i, i + block_size)
-            if mt_adaptive:
-                csd = _csd_from_mt(x_t[idx_map[0][con_idx]],
-                                   x_t[idx_map[1][con_idx]],
-                                   weights[idx_map[0][con_idx]],
-                                   weights[idx_map[1][con_idx]])
-            else:
-                csd = _csd_from_mt(x_t[idx_map[0][con_idx]],
-                                   x_t[idx_map[1][con_idx]],
-                                   weights, weights)
-
-            for method in con_methods:
-                method.accumulate(con_idx, csd)
+        _accumulate_mt_csd(con_methods, x_t, weights, mt_adaptive, idx_map,
+                           block_size, dense)
     else:  # mode == 'cwt_morlet'  # reminder to add alternative TFR methods
         for i_block, i in enumerate(range(0, n_cons, block_size)):
             con_idx = slice(i, i + block_size)
@@ -448,6 +447,118 @@ def _epoch_spectral_connectivity(data, sig_idx, tmin_idx, tmax_idx, sfreq,
     return con_methods, psd
 
 
+def _accumulate_mt_csd(con_methods, x_t, weights, mt_adaptive, idx_map,
+                       block_size, dense):
+    """Accumulate the CSD of tapered spectra into the estimators."""
+    if dense:
+        for con_idx, csd in _dense_csd_blocks(x_t, weights, block_size):
+            for method in con_methods:
+                method.accumulate(con_idx, csd)
+        return
+    for i in range(0, len(idx_map[0]), block_size):
+        con_idx = slice(i, i + block_size)
+        if mt_adaptive:
+            csd = _csd_from_mt(x_t[idx_map[0][con_idx]],
+                               x_t[idx_map[1][con_idx]],
+                               weights[idx_map[0][con_idx]],
+                               weights[idx_map[1][con_idx]])
+        else:
+            csd = _csd_from_mt(x_t[idx_map[0][con_idx]],
+                               x_t[idx_map[1][con_idx]],
+                               weights, weights)
+
+        for method in con_methods:
+            method.accumulate(con_idx, csd)
+
+
+def _dense_csd_blocks(x_t, weights, block_size):
+    """Compute the lower-triangular CSD of all signals in row blocks.
+
+    The CSD of each frequency is the Hermitian matrix ``X @ X.H`` of the
+    weighted tapered spectra, so it is computed with batched matrix
+    products over blocks of rows of its lower triangle. Connections are
+    yielded in the order of ``np.tril_indices(n_signals, -1)``.
+    """
+    # normalize the weighted spectra so the CSD is a plain matrix product
+    x_w = weights * x_t
+    x_w /= np.sqrt((weights * weights.conj()).real.sum(axis=-2,
+                                                       keepdims=True))
+    x_w = np.ascontiguousarray(x_w.transpose(2, 0, 1))  # (n_freqs, sig, tap)
+    x_wh = x_w.conj().transpose(0, 2, 1)
+    n_signals = x_w.shape[1]
+    ii, jj = np.tril_indices(n_signals, -1)
+    # the connections of rows [0, r) are the first r * (r - 1) / 2
+    con_starts = np.arange(n_signals + 1) * np.arange(-1, n_signals) // 2
+    r_start = 1
+    while r_start < n_signals:
+        r_stop = max(np.searchsorted(con_starts,
+                                     con_starts[r_start] + block_size,
+                                     side='right') - 1, r_start + 1)
+        r_stop = min(r_stop, n_signals)
+        con_idx = slice(con_starts[r_start], con_starts[r_stop])
+        csd = np.matmul(x_w[:, r_start:r_stop], x_wh[:, :, :r_stop])
+        csd = csd[:, ii[con_idx] - r_start, jj[con_idx]].T
+        csd *= 2
+        yield con_idx, csd
+        r_start = r_stop
+
+
+def _compute_con_scores(con_methods, n_comp_args, n_epochs, psd, idx_map,
+                        block_size, n_freqs, faverage, freq_idx_bands):
+    """Compute the final scores of accumulated connectivity estimators."""
+    n_cons = len(idx_map[0])
+    con = list()
+    for method, n_args in zip(con_methods, n_comp_args):
+        # future estimators will need to be handled here
+        if n_args == 3:
+            # compute all scores at once
+            method.compute_con(slice(0, n_cons), n_epochs)
+        elif n_args == 5:
+            # compute scores block-wise to save memory
+            for i in range(0, n_cons, block_size):
+                con_idx = slice(i, i + block_size)
+                psd_xx = psd[idx_map[0][con_idx]]
+                psd_yy = psd[idx_map[1][con_idx]]
+                method.compute_con(con_idx, n_epochs, psd_xx, psd_yy)
+        else:
+            raise RuntimeError('This should never happen.')
+
+        # get the connectivity scores
+        this_con = method.con_scores
+
+        if this_con.shape[0] != n_cons:
+            raise ValueError('First dimension of connectivity scores must be '
+                             'the same as the number of connections')
+        if faverage:
+            if this_con.shape[1] != n_freqs:
+                raise ValueError('2nd dimension of connectivity scores must '
+                                 'be the same as the number of frequencies')
+            n_bands = len(freq_idx_bands)
+            con_shape = (n_cons, n_bands) + this_con.shape[2:]
+            this_con_bands = np.empty(con_shape, dtype=this_con.dtype)
+            for band_idx in range(n_bands):
+                this_con_bands[:, band_idx] =\
+                    np.mean(this_con[:, freq_idx_bands[band_idx]], axis=1)
+            this_con = this_con_bands
+
+        con.append(this_con)
+    return con
+
+
+def _check_fmin_fmax(fmin, fmax):
+    """Format fmin and fmax as arrays of band edges."""
+    if fmin is None:
+        fmin = -np.inf  # set it to -inf, so we can adjust it later
+
+    fmin = np.array((fmin,), dtype=float).ravel()
+    fmax = np.array((fmax,), dtype=float).ravel()
+    if len(fmin) != len(fmax):
+        raise ValueError('fmin and fmax must have the same length')
+    if np.any(fmin > fmax):
+        raise ValueError('fmax must be larger than fmin')
+    return fmin, fmax
+
+
 def _get_n_epochs(epochs, n):
     """Generate lists with at most n epochs."""
     epochs_out = list()
@@ -750,16 +861,7 @@ def spectral_connectivity(data, method='coh', indices=None, sfreq=2 * np.pi,
                           verbose=verbose)
 
     # format fmin and fmax and check inputs
-    if fmin is None:
-        fmin = -np.inf  # set it to -inf, so we can adjust it later
-
-    fmin = np.array((fmin,), dtype=float).ravel()
-    fmax = np.array((fmax,), dtype=float).ravel()
-    if len(fmin) != len(fmax):
-        raise ValueError('fmin and fmax must have the same length')
-    if np.any(fmin > fmax):
-        raise ValueError('fmax must be larger than fmin')
-
+    fmin, fmax = _check_fmin_fmax(fmin, fmax)
     n_bands = len(fmin)
 
     # assign names to connectivity methods
@@ -813,6 +915,9 @@ def spectral_connectivity(data, method='coh', indices=None, sfreq=2 * np.pi,
             else:
                 psd = None
 
+            # for all-to-all connectivity, compute the CSD matrix at once
+            dense = indices is None and mode in ('multitaper', 'fourier')
+
             # create instances of the connectivity estimators
             con_methods = [mtype(n_cons, n_freqs, n_times_spectrum)
                            for mtype in con_method_types]
@@ -836,7 +941,8 @@ def spectral_connectivity(data, method='coh', indices=None, sfreq=2 * np.pi,
             con_method_types=con_method_types,
             con_methods=con_methods if n_jobs == 1 else None,
             n_signals=n_signals, n_times=n_times,
-            accumulate_inplace=True if n_jobs == 1 else False)
+            accumulate_inplace=True if n_jobs == 1 else False,
+            dense=dense)
         call_params.update(**spectral_params)
 
         if n_jobs == 1:
@@ -870,40 +976,9 @@ def spectral_connectivity(data, method='coh', indices=None, sfreq=2 * np.pi,
         psd /= n_epochs
 
     # compute final connectivity scores
-    con = list()
-    for method, n_args in zip(con_methods, n_comp_args):
-        # future estimators will need to be handled here
-        if n_args == 3:
-            # compute all scores at once
-            method.compute_con(slice(0, n_cons), n_epochs)
-        elif n_args == 5:
-            # compute scores block-wise to save memory
-            for i in range(0, n_cons, block_size):
-                con_idx = slice(i, i + block_size)
-                psd_xx = psd[idx_map[0][con_idx]]
-                psd_yy = psd[idx_map[1][con_idx]]
-                method.compute_con(con_idx, n_epochs, psd_xx, psd_yy)
-        else:
-            raise RuntimeError('This should never happen.')
-
-        # get the connectivity scores
-        this_con = method.con_scores
-
-        if this_con.shape[0] != n_cons:
-            raise ValueError('First dimension of connectivity scores must be '
-                             'the same as the number of connections')
-        if faverage:
-            if this_con.shape[1] != n_freqs:
-                raise ValueError('2nd dimension of connectivity scores must '
-                                 'be the same as the number of frequencies')
-            con_shape = (n_cons, n_bands) + this_con.shape[2:]
-            this_con_bands = np.empty(con_shape, dtype=this_con.dtype)
-            for band_idx in range(n_bands):
-                this_con_bands[:, band_idx] =\
-                    np.mean(this_con[:, freq_idx_bands[band_idx]], axis=1)
-            this_con = this_con_bands
-
-        con.append(this_con)
+    con = _compute_con_scores(con_methods, n_comp_args, n_epochs, psd,
+                              idx_map, block_size, n_freqs, faverage,
+                              freq_idx_bands)
 
     if indices is None:
         # return all-to-all connectivity matrices
@@ -931,6 +1006,292 @@ def spectral_connectivity(data, method='coh', indices=None, sfreq=2 * np.pi,
     return con, freqs, times, n_epochs, n_tapers
 
 
+@verbose
+def spectral_connectivity_windowed(data, method='coh', indices=None,
+                                   sfreq=2 * np.pi, picks=None,
+                                   seg_length=1., seg_step=None,
+                                   win_length=10., win_step=None, fmin=None,
+                                   fmax=np.inf, fskip=0, faverage=False,
+                                   mt_bandwidth=None, mt_adaptive=False,
+                                   mt_low_bias=True, block_size=1000,
+                                   fname=None, verbose=None):
+    """Compute sliding-window multitaper connectivity of continuous data.
+
+    The data are cut into (possibly overlapping) segments of ``seg_length``
+    seconds and the tapered spectra of the segments are computed once, in
+    batches. The connectivity of each window is estimated from the segments
+    it contains, in the same way :func:`spectral_connectivity` averages
+    across epochs, so overlapping windows share their segment spectra.
+
+    Parameters
+    ----------
+    data : instance of Raw | array, shape (n_signals, n_times)
+        The continuous data. Raw instances do not need to be preloaded, the
+        data are read as they are needed.
+    method : str | list of str
+        Connectivity measure(s) to compute, see
+        :func:`spectral_connectivity`.
+    indices : tuple of array | None
+        Two arrays with indices of connections for which to compute
+        connectivity. If None, all connections are computed.
+    sfreq : float
+        The sampling frequency. Only used if ``data`` is an array.
+    %(picks_good_data)s
+        Only used if ``data`` is an instance of Raw.
+    seg_length : float
+        Length of the segments (in seconds) for which tapered spectra are
+        computed. This sets the frequency resolution.
+    seg_step : float | None
+        Time (in seconds) between the starts of consecutive segments. None
+        (default) uses ``seg_length``, i.e. segments do not overlap.
+    win_length : float
+        Length of the connectivity windows (in seconds). Each window
+        averages over the segments it contains.
+    win_step : float | None
+        Time (in seconds) between the starts of consecutive windows. It is
+        rounded to a multiple of ``seg_step``. None (default) uses
+        ``win_length``, i.e. windows do not overlap.
+    fmin : float | tuple of float
+        The lower frequency of interest. Multiple bands are defined using
+        a tuple, e.g., (8., 20.) for two bands with 8Hz and 20Hz lower freq.
+        If None the frequency corresponding to a segment length of 5 cycles
+        is used.
+    fmax : float | tuple of float
+        The upper frequency of interest. Multiple bands are defined using
+        a tuple, e.g. (13., 30.) for two band with 13Hz and 30Hz upper freq.
+    fskip : int
+        Omit every "(fskip + 1)-th" frequency bin to decimate in frequency
+        domain.
+    faverage : bool
+        Average connectivity scores for each frequency band. If True,
+        the output freqs will be a list with arrays of the frequencies
+        that were averaged.
+    mt_bandwidth : float | None
+        The bandwidth of the multitaper windowing function in Hz.
+    mt_adaptive : bool
+        Use adaptive weights to combine the tapered spectra into PSD.
+    mt_low_bias : bool
+        Only use tapers with more than 90%% spectral concentration within
+        bandwidth.
+    block_size : int
+        How many connections to compute at once (higher numbers are faster
+        but require more memory).
+    fname : str | None
+        If not None, the connectivity of each window is written to a
+        memory-mapped ``.npy`` file as soon as it is computed, so the output
+        does not need to fit in memory. The name of the method is appended
+        to ``fname`` before the extension (e.g., ``con_coh.npy``) and the
+        returned arrays are read-only memory maps of these files.
+    %(verbose)s
+
+    Returns
+    -------
+    con : array | list of array
+        Computed connectivity measure(s). The shape of each array is either
+        (n_signals, n_signals, n_freqs, n_windows) when "indices" is None,
+        or (n_con, n_freqs, n_windows) when "indices" is specified and
+        "n_con = len(indices[0])".
+    freqs : array
+        Frequency points at which the connectivity was computed.
+    times : array
+        The center time of each window (in seconds).
+    n_tapers : int
+        The number of DPSS tapers used.
+
+    See Also
+    --------
+    spectral_connectivity
+
+    Notes
+    -----
+    .. versionadded:: 0.20
+    """
+    from ..io.base import BaseRaw
+    from ..io.pick import _picks_to_idx
+    if isinstance(data, BaseRaw):
+        sfreq = data.info['sfreq']
+        picks = _picks_to_idx(data.info, picks, 'data_or_ica')
+        n_signals, n_times = len(picks), data.n_times
+        raw = data
+
+        def _get_data(sel, start, stop):
+            return raw[picks[sel], start:stop][0]
+    else:
+        data = np.asarray(data)
+        if data.ndim != 2:
+            raise ValueError('data must be a 2D array, got %d dimensions'
+                             % (data.ndim,))
+        n_signals, n_times = data.shape
+
+        def _get_data(sel, start, stop):
+            return data[sel, start:stop]
+    fmin, fmax = _check_fmin_fmax(fmin, fmax)
+    if not isinstance(method, (list, tuple)):
+        method = [method]
+    (con_method_types, n_methods, accumulate_psd,
+     n_comp_args) = _check_estimators(method=method, mode='multitaper')
+
+    # segments and windows, in samples / segments
+    n_seg = int(round(seg_length * sfreq))
+    n_hop = n_seg if seg_step is None else int(round(seg_step * sfreq))
+    if n_seg < 2 or n_hop < 1:
+        raise ValueError('seg_length and seg_step are too short for the '
+                         'sampling frequency %0.1f Hz' % (sfreq,))
+    win_length = float(win_length)
+    if win_length < seg_length:
+        raise ValueError('win_length (%s) must be at least seg_length (%s)'
+                         % (win_length, seg_length))
+    n_win_segs = int(round((win_length * sfreq - n_seg) / n_hop)) + 1
+    win_step = win_length if win_step is None else float(win_step)
+    n_win_hop = max(int(round(win_step * sfreq / n_hop)), 1)
+    n_segs_total = (n_times - n_seg) // n_hop + 1
+    n_windows = (n_segs_total - n_win_segs) // n_win_hop + 1
+    if n_times < n_seg or n_windows < 1:
+        raise ValueError('The data (%d samples) are too short for a single '
+                         'window of %0.3f sec' % (n_times, win_length))
+    if n_win_hop < n_win_segs:
+        for mtype in con_method_types:
+            if not hasattr(mtype, 'subtract'):
+                raise ValueError('The supplied connectivity method does not '
+                                 'have the method subtract, which is needed '
+                                 'for overlapping windows')
+    logger.info('Windowed connectivity computation...')
+    logger.info('    using %d windows of %d segments of %d samples'
+                % (n_windows, n_win_segs, n_seg))
+
+    (n_cons, _, _, _, _, _, _, n_freqs, freq_mask, freqs, freqs_bands,
+     freq_idx_bands, n_signals, indices_use) = _prepare_connectivity(
+        epoch_block=[(np.empty((n_signals, n_seg)),)], tmin=None, tmax=None,
+        fmin=fmin, fmax=fmax, sfreq=sfreq, indices=indices,
+        mode='multitaper', fskip=fskip, n_bands=len(fmin), cwt_freqs=None,
+        faverage=faverage)
+    spectral_params, mt_adaptive, _, _ = _assemble_spectral_params(
+        mode='multitaper', n_times=n_seg, mt_adaptive=mt_adaptive,
+        mt_bandwidth=mt_bandwidth, sfreq=sfreq, mt_low_bias=mt_low_bias,
+        cwt_n_cycles=None, cwt_freqs=None, freqs=freqs, freq_mask=freq_mask)
+    window_fun = spectral_params['window_fun']
+    eigvals = spectral_params['eigvals']
+    n_tapers = len(eigvals)
+    if not mt_adaptive:
+        weights = np.sqrt(eigvals)[np.newaxis, :, np.newaxis]
+    sig_idx = np.unique(np.r_[indices_use[0], indices_use[1]])
+    idx_map = [np.searchsorted(sig_idx, ind) for ind in indices_use]
+    dense = indices is None
+
+    # process the segments in batches of at most ~50 MB of spectra
+    n_batch = max(50000000 // (len(sig_idx) * n_tapers *
+                               len(freq_mask) * 16), 1)
+    n_batch = max(n_batch, n_win_hop)
+    # Running sums over the segments of the current window: the CSD of a
+    # segment is added when it enters the window and subtracted when it
+    # leaves it, so only the tapered spectra of the segments in the window
+    # are kept instead of one set of estimators per segment
+    segments = deque()
+    con_methods = [mtype(n_cons, n_freqs, 0) for mtype in con_method_types]
+    psd_sum = 0.
+    n_segs_used = (n_windows - 1) * n_win_hop + n_win_segs
+    con = None
+    times = (np.arange(n_windows) * n_win_hop * n_hop +
+             ((n_win_segs - 1) * n_hop + n_seg) / 2.) / sfreq
+    for seg_start in range(0, n_segs_used, n_batch):
+        seg_stop = min(seg_start + n_batch, n_segs_used)
+        # one strided view of all (overlapping) segments of this batch
+        x = np.ascontiguousarray(_get_data(
+            sig_idx, seg_start * n_hop, (seg_stop - 1) * n_hop + n_seg))
+        x = as_strided(x, (seg_stop - seg_start,) + x.shape[:1] + (n_seg,),
+                       (x.strides[1] * n_hop,) + x.strides)
+        x = x - x.mean(axis=-1, keepdims=True)
+        x_mt = rfft(x[:, :, np.newaxis] * window_fun, n=n_seg)
+        del x
+        x_mt[..., 0] /= np.sqrt(2.)
+        if n_seg % 2 == 0:
+            x_mt[..., -1] /= np.sqrt(2.)
+        for seg_idx, this_x_mt in enumerate(x_mt, seg_start):
+            if seg_idx % n_win_hop >= n_win_segs:
+                continue  # in the gap between two windows
+            if mt_adaptive:
+                psd, weights = _psd_from_mt_adaptive(
+                    this_x_mt, eigvals, freq_mask, return_weights=True)
+                this_x_mt = this_x_mt[:, :, freq_mask]
+            else:
+                this_x_mt = this_x_mt[:, :, freq_mask]
+                psd = _psd_from_mt(this_x_mt, weights) if accumulate_psd \
+                    else None
+            for con_method in con_methods:
+                con_method.start_epoch()
+            _accumulate_mt_csd(con_methods, this_x_mt, weights, mt_adaptive,
+                               idx_map, block_size, dense)
+            if accumulate_psd:
+                psd_sum = psd_sum + psd
+            segments.append((seg_idx, this_x_mt, weights, psd))
+
+            # a window ends with this segment
+            win_idx, rem = divmod(seg_idx + 1 - n_win_segs, n_win_hop)
+            if seg_idx + 1 < n_win_segs or rem != 0:
+                continue
+            psd = psd_sum / n_win_segs if accumulate_psd else None
+            this_con = _compute_con_scores(
+                con_methods, n_comp_args, n_win_segs, psd, idx_map,
+                block_size, n_freqs, faverage, freq_idx_bands)
+            if con is None:
+                con = list()
+                for this_method, c in zip(method, this_con):
+                    shape = c.shape + (n_windows,)
+                    if dense:
+                        shape = (n_signals, n_signals) + shape[1:]
+                    if fname is None:
+                        con.append(np.zeros(shape, c.dtype))
+                    else:
+                        con.append(open_memmap(
+                            _windowed_fname(fname, this_method),
+                            mode='w+', dtype=c.dtype, shape=shape))
+            for c_out, c in zip(con, this_con):
+                if dense:
+                    c_out[indices_use[0], indices_use[1], ..., win_idx] = c
+                else:
+                    c_out[..., win_idx] = c
+            logger.debug('    window %d/%d done' % (win_idx + 1, n_windows))
+
+            # remove the segments that are not part of the next window
+            next_start = (win_idx + 1) * n_win_hop
+            if segments[-1][0] < next_start:  # nothing is carried over
+                segments.clear()
+                con_methods = [mtype(n_cons, n_freqs, 0)
+                               for mtype in con_method_types]
+                psd_sum = 0.
+            while len(segments) > 0 and segments[0][0] < next_start:
+                _, old_x_mt, old_weights, old_psd = segments.popleft()
+                seg_methods = [mtype(n_cons, n_freqs, 0)
+                               for mtype in con_method_types]
+                _accumulate_mt_csd(seg_methods, old_x_mt, old_weights,
+                                   mt_adaptive, idx_map, block_size, dense)
+                for con_method, seg_method in zip(con_methods, seg_methods):
+                    con_method.subtract(seg_method)
+                if accumulate_psd:
+                    psd_sum = psd_sum - old_psd
+
+    if fname is not None:
+        for c in con:
+            c.flush()
+        con = [np.load(_windowed_fname(fname, this_method), mmap_mode='r')
+               for this_method in method]
+    logger.info('[Connectivity computation done]')
+
+    if n_methods == 1:
+        con = con[0]
+    if faverage:
+        freqs = freqs_bands
+    return con, freqs, times, n_tapers
+
+
+def _windowed_fname(fname, method):
+    """Get the output file name for one connectivity method."""
+    if not isinstance(method, str):
+        method = method.__name__
+    base, ext = op.splitext(fname)
+    return '%s_%s%s' % (base, method, ext or '.npy')
+
+
 def _prepare_connectivity(epoch_block, tmin, tmax, fmin, fmax, sfreq, indices,
                           mode, fskip, n_bands,
                           cwt_freqs, faverage):
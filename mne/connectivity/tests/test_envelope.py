@@ -58,6 +58,8 @@ def test_envelope_correlation():
         envelope_correlation(data[np.newaxis])
     with pytest.raises(ValueError, match='n_nodes mismatch'):
         envelope_correlation([rng.randn(2, 8), rng.randn(3, 8)])
+    with pytest.raises(TypeError, match=r'data\[1\] must be an instance of'):
+        envelope_correlation([data_hilbert[0], (data_hilbert[1],)])
     with pytest.raises(ValueError, match='mean or callable'):
         envelope_correlation(data, 1.)
     with pytest.raises(ValueError, match='Combine option'):
@@ -72,3 +74,19 @@ def test_envelope_correlation():
     assert_allclose(np.diag(corr_plain_mean), 1)
     np_corr = np.array([np.corrcoef(np.abs(x)) for x in data_hilbert])
     assert_allclose(corr_plain, np_corr)
+
+    # more nodes, generator input and parallel processing of epochs
+    data = rng.randn(3, 20, 200)
+    corr_orig = _compute_corrs_orig(hilbert(data, axis=-1))
+    corr = envelope_correlation((d for d in data), n_jobs=2)
+    assert_allclose(corr, corr_orig)
+
+    # steady phase-locked oscillations, whose orthogonalized envelopes are
+    # almost constant
+    times = np.arange(2000) / 1000.
+    phases = rng.rand(6, 1) * 2 * np.pi
+    data = 1e3 * np.cos(2 * np.pi * 10 * times + phases)
+    data = (data + 1e-3 * rng.randn(*data.shape))[np.newaxis]
+    corr_orig = _compute_corrs_orig(hilbert(data, axis=-1))
+    corr = envelope_correlation(data)
+    assert_allclose(corr, corr_orig, rtol=1e-10)
@@ -1,11 +1,14 @@
 import numpy as np
-from numpy.testing import assert_array_almost_equal
+from numpy.testing import (assert_array_almost_equal, assert_allclose,
+                           assert_array_equal)
 import pytest
 
-from mne.connectivity import spectral_connectivity
+from mne.connectivity import (spectral_connectivity,
+                              spectral_connectivity_windowed)
 from mne.connectivity.spectral import _CohEst, _get_n_epochs
 
-from mne import SourceEstimate
+from mne import SourceEstimate, create_info
+from mne.io import RawArray
 from mne.utils import run_tests_if_main
 from mne.filter import filter_data
 
@@ -212,4 +215,84 @@ def test_spectral_connectivity(method, mode):
     assert (out_lens[0] == 10)
 
 
+@pytest.mark.parametrize('mode, adaptive', [('multitaper', False),
+                                            ('multitaper', True),
+                                            ('fourier', False)])
+def test_spectral_connectivity_dense(mode, adaptive):
+    """Test that all-to-all connectivity matches explicit indices."""
+    rng = np.random.RandomState(0)
+    data = rng.randn(3, 12, 200)
+    data[:, 1] += data[:, 0]
+    methods = ['coh', 'cohy', 'imcoh', 'plv', 'wpli', 'pli', _CohEst]
+    indices = np.tril_indices(12, -1)
+    kwargs = dict(method=methods, mode=mode, sfreq=100., fmin=5.,
+                  mt_adaptive=adaptive, mt_bandwidth=4.)
+    con_ind = spectral_connectivity(data, indices=indices, **kwargs)[0]
+    for block_size in (1, 7, 1000):
+        con = spectral_connectivity(data, block_size=block_size,
+                                    **kwargs)[0]
+        for c, c_ind in zip(con, con_ind):
+            assert c.shape == (12, 12, c_ind.shape[-1])
+            assert_allclose(c[indices], c_ind, rtol=1e-7, atol=1e-12)
+            assert_array_equal(c[np.triu_indices(12)], 0.)
+
+
+@pytest.mark.parametrize('adaptive', (False, True))
+def test_spectral_connectivity_windowed(adaptive, tmpdir):
+    """Test sliding-window connectivity of continuous data."""
+    rng = np.random.RandomState(0)
+    sfreq = 100.
+    data = rng.randn(3, 3000)
+    data[1] += data[0]
+    methods = ['coh', 'wpli', 'imcoh', 'wpli2_debiased', 'ppc']
+    kwargs = dict(fmin=5., fmax=30., mt_adaptive=adaptive)
+    con, freqs, times, n_tapers = spectral_connectivity_windowed(
+        data, method=methods, sfreq=sfreq, seg_length=1., seg_step=0.5,
+        win_length=5., win_step=2.5, **kwargs)
+    n_windows = (3000 - 500) // 250 + 1
+    assert n_tapers == 7
+    assert_allclose(times, 2.5 * (np.arange(n_windows) + 1))
+    # each window is the same as epoch-wise connectivity of its segments
+    for win_idx in (0, 3, n_windows - 1):
+        start = win_idx * 250
+        epochs = np.array([data[:, start + k * 50:start + k * 50 + 100]
+                           for k in range(9)])
+        con_ep, freqs_ep, _, _, _ = spectral_connectivity(
+            epochs, method=methods, sfreq=sfreq, **kwargs)
+        assert_allclose(freqs, freqs_ep)
+        for c, c_ep in zip(con, con_ep):
+            assert c.shape == (3, 3, len(freqs), n_windows)
+            assert_allclose(c[..., win_idx], c_ep, rtol=1e-7, atol=1e-12)
+    assert con[0][1, 0].mean() > 2 * con[0][2, 0].mean()
+    # windows with gaps between them
+    con_gap, _, times, _ = spectral_connectivity_windowed(
+        data, method=methods, sfreq=sfreq, seg_length=1., win_length=2.,
+        win_step=3., **kwargs)
+    assert_allclose(times, 3. * np.arange(10) + 1.)
+    epochs = np.array([data[:, 2700:2800], data[:, 2800:2900]])
+    con_ep = spectral_connectivity(epochs, method=methods, sfreq=sfreq,
+                                   **kwargs)[0]
+    for c, c_ep in zip(con_gap, con_ep):
+        assert_allclose(c[..., -1], c_ep, rtol=1e-7, atol=1e-12)
+
+    # Raw input, indices and output streamed to disk
+    raw = RawArray(data, create_info(3, sfreq, 'eeg'))
+    fname = str(tmpdir.join('con.npy'))
+    indices = (np.array([1, 2]), np.array([0, 0]))
+    con_raw, freqs_raw, _, _ = spectral_connectivity_windowed(
+        raw, method=methods, indices=indices, seg_length=1., seg_step=0.5,
+        win_length=5., win_step=2.5, faverage=True, fname=fname, **kwargs)
+    assert isinstance(freqs_raw, list)
+    for c, c_raw, method in zip(con, con_raw, methods):
+        assert isinstance(c_raw, np.memmap)
+        assert_allclose(c[indices].mean(axis=1, keepdims=True), c_raw,
+                        rtol=1e-7, atol=1e-12)
+        assert_allclose(np.load(str(tmpdir.join('con_%s.npy' % method))),
+                        c_raw)
+    with pytest.raises(ValueError, match='at least seg_length'):
+        spectral_connectivity_windowed(data, seg_length=2., win_length=1.)
+    with pytest.raises(ValueError, match='too short'):
+        spectral_connectivity_windowed(data, sfreq=sfreq, win_length=40.)
+
+
 run_tests_if_main()
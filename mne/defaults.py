@@ -70,7 +70,8 @@ DEFAULTS = dict(
         rpa_color=(0., 0., 1.),
     ),
     noise_std=dict(grad=5e-13, mag=20e-15, eeg=0.2e-6),
-    eloreta_options=dict(eps=1e-6, max_iter=20, force_equal=None),
+    eloreta_options=dict(eps=1e-6, max_iter=20, force_equal=None,
+                         init=None),
     depth_mne=dict(exp=0.8, limit=10., limit_depth_chs=True,
                    combine_xyz='spectral', allow_fixed_depth=False),
     depth_sparse=dict(exp=0.8, limit=None, limit_depth_chs='whiten',
@@ -666,6 +666,21 @@ def _fit_eval(rd, B, B2, fwd_svd=None, fwd_data=None, whitener=None,
     return 1. - gof
 
 
+def _fit_eval_guesses(guess_data, B, B2):
+    """Calculate the residual sum of squares for all guesses at once."""
+    one = np.dot(guess_data['fwd_vv'], B).reshape(-1, 3)
+    return 1. - np.sum(one * one, axis=1) / B2
+
+
+def _make_guess_vv(fwd_svd):
+    """Stack the right singular vectors used by :func:`_dipole_gof`."""
+    vv = np.array([this_vv for _, _, this_vv in fwd_svd])
+    for this_vv, (_, sing, _) in zip(vv, fwd_svd):
+        if not sing[2] / (sing[0] if sing[0] > 0 else 1.) > 0.2:
+            this_vv[2] = 0.  # ncomp == 2
+    return vv.reshape(-1, vv.shape[-1])
+
+
 def _dipole_gof(uu, sing, vv, B, B2):
     """Calculate the goodness of fit from the forward SVD."""
     ncomp = 3 if sing[2] / (sing[0] if sing[0] > 0 else 1.) > 0.2 else 2
@@ -711,16 +726,36 @@ def _fit_Q(fwd_data, whitener, B, B2, B_orig, rd, ori=None):
     return Q, gof, B_residual_noproj, ncomp
 
 
+# Number of consecutive time points over which warm starts are chained
+_WARM_START_BLOCK = 20
+
+
+def _get_dipole_chunks(n_times, n_jobs, block_size):
+    """Split time points into at most n_jobs chunks of whole blocks.
+
+    With warm starts, chunks are made of whole warm-start blocks so that
+    the results do not depend on n_jobs.
+    """
+    block_starts = np.arange(0, n_times, block_size)
+    return [slice(starts[0], min(starts[-1] + block_size, n_times))
+            for starts in np.array_split(block_starts, n_jobs)
+            if len(starts) > 0]
+
+
 def _fit_dipoles(fun, min_dist_to_inner_skull, data, times, guess_rrs,
-                 guess_data, fwd_data, whitener, ori, n_jobs, rank):
+                 guess_data, fwd_data, whitener, ori, n_jobs, rank,
+                 warm_start=False):
     """Fit a single dipole to the given whitened, projected data."""
-    from scipy.optimize import fmin_cobyla
-    parallel, p_fun, _ = parallel_func(fun, n_jobs)
-    # parallel over time points
-    res = parallel(p_fun(min_dist_to_inner_skull, B, t, guess_rrs,
-                         guess_data, fwd_data, whitener,
-                         fmin_cobyla, ori, rank)
-                   for B, t in zip(data.T, times))
+    parallel, p_fun, n_jobs = parallel_func(_fit_dipole_chunk, n_jobs)
+    # parallel over contiguous chunks of time points, so that the shared
+    # forward data only need to be sent once to each job
+    block_size = _WARM_START_BLOCK if warm_start else 1
+    chunks = _get_dipole_chunks(len(times), n_jobs, block_size)
+    res = parallel(p_fun(fun, min_dist_to_inner_skull, data[:, sl],
+                         times[sl], guess_rrs, guess_data, fwd_data,
+                         whitener, ori, rank, warm_start, block_size)
+                   for sl in chunks)
+    res = [r for chunk in res for r in chunk]
     pos = np.array([r[0] for r in res])
     amp = np.array([r[1] for r in res])
     ori = np.array([r[2] for r in res])
@@ -737,6 +772,22 @@ def _fit_dipoles(fun, min_dist_to_inner_skull, data, times, guess_rrs,
     return pos, amp, ori, gof, conf, khi2, nfree, residual_noproj
 
 
+def _fit_dipole_chunk(fun, min_dist_to_inner_skull, data, times, guess_rrs,
+                      guess_data, fwd_data, whitener, ori, rank, warm_start,
+                      block_size):
+    """Fit consecutive time points, optionally starting from the last fit."""
+    from scipy.optimize import fmin_cobyla
+    res = list()
+    for ti, (B, t) in enumerate(zip(data.T, times)):
+        if ti % block_size == 0:  # each block starts from the grid
+            rd_last = None
+        res.append(fun(min_dist_to_inner_skull, B, t, guess_rrs, guess_data,
+                       fwd_data, whitener, fmin_cobyla, ori, rank, rd_last))
+        if warm_start and res[-1][3] > 0:
+            rd_last = res[-1][0]
+    return res
+
+
 '''Simplex code in case we ever want/need it for testing
 
 def _make_tetra_simplex():
@@ -912,7 +963,8 @@ def _sphere_constraint(rd, r0, R_adj):
 
 
 def _fit_dipole(min_dist_to_inner_skull, B_orig, t, guess_rrs,
-                guess_data, fwd_data, whitener, fmin_cobyla, ori, rank):
+                guess_data, fwd_data, whitener, fmin_cobyla, ori, rank,
+                rd_last=None):
     """Fit a single bit of data."""
     B = np.dot(whitener, B_orig)
 
@@ -933,12 +985,19 @@ def _fit_dipole(min_dist_to_inner_skull, B_orig, t, guess_rrs,
         warn('Zero field found for time %s' % t)
         return np.zeros(3), 0, np.zeros(3), 0, B
 
-    idx = np.argmin([_fit_eval(guess_rrs[[fi], :], B, B2, fwd_svd)
-                     for fi, fwd_svd in enumerate(guess_data['fwd_svd'])])
+    fits = _fit_eval_guesses(guess_data, B, B2)
+    idx = np.argmin(fits)
     x0 = guess_rrs[idx]
     lwork = _svd_lwork((3, B.shape[0]))
     fun = partial(_fit_eval, B=B, B2=B2, fwd_data=fwd_data, whitener=whitener,
                   lwork=lwork)
+    # Warm start from the previous fit if it explains the data better than
+    # the best guess, in which case a much smaller initial step suffices
+    rhobeg = 5e-2
+    if rd_last is not None and constraint(rd_last) > 0 and \
+            fun(rd_last) <= fits[idx]:
+        x0 = rd_last
+        rhobeg = 5e-3
 
     # Tested minimizers:
     #    Simplex, BFGS, CG, COBYLA, L-BFGS-B, Powell, SLSQP, TNC
@@ -946,7 +1005,7 @@ def _fit_dipole(min_dist_to_inner_skull, B_orig, t, guess_rrs,
     # function we can use to ensure we stay inside the inner skull /
     # smallest sphere
     rd_final = fmin_cobyla(fun, x0, (constraint,), consargs=(),
-                           rhobeg=5e-2, rhoend=5e-5, disp=False)
+                           rhobeg=rhobeg, rhoend=5e-5, disp=False)
 
     # simplex = _make_tetra_simplex() + x0
     # _simplex_minimize(simplex, 1e-4, 2e-4, fun)
@@ -976,7 +1035,7 @@ def _fit_dipole(min_dist_to_inner_skull, B_orig, t, guess_rrs,
 
 def _fit_dipole_fixed(min_dist_to_inner_skull, B_orig, t, guess_rrs,
                       guess_data, fwd_data, whitener,
-                      fmin_cobyla, ori, rank):
+                      fmin_cobyla, ori, rank, rd_last=None):
     """Fit a data using a fixed position."""
     B = np.dot(whitener, B_orig)
     B2 = np.dot(B, B)
@@ -1002,7 +1061,7 @@ def _fit_dipole_fixed(min_dist_to_inner_skull, B_orig, t, guess_rrs,
 
 @verbose
 def fit_dipole(evoked, cov, bem, trans=None, min_dist=5., n_jobs=1,
-               pos=None, ori=None, verbose=None):
+               pos=None, ori=None, warm_start=False, verbose=None):
     """Fit a dipole.
 
     Parameters
@@ -1022,7 +1081,8 @@ def fit_dipole(evoked, cov, bem, trans=None, min_dist=5., n_jobs=1,
         a solver it is not strict but close, i.e. for a ``min_dist=5.`` the
         fits could be 4.9 mm from the inner skull.
     %(n_jobs)s
-        It is used in field computation and fitting.
+        It is used in field computation and fitting. Each job fits a
+        contiguous block of time points.
     pos : ndarray, shape (3,) | None
         Position of the dipole to use. If None (default), sequential
         fitting (different position and orientation for each time instance)
@@ -1041,6 +1101,17 @@ def fit_dipole(evoked, cov, bem, trans=None, min_dist=5., n_jobs=1,
 
         .. versionadded:: 0.12
 
+    warm_start : bool
+        If True, each fit starts from the previous time point's solution
+        when it explains the data better than the best grid guess, which
+        reduces the number of optimizer steps for smoothly varying sources.
+        Warm starts are chained within fixed blocks of 20 time points, and
+        the first fit of each block starts from the grid, so the results do
+        not depend on ``n_jobs``. Default is False, which starts every fit
+        from the best grid guess.
+
+        .. versionadded:: 0.20
+
     %(verbose)s
 
     Returns
@@ -1260,6 +1331,7 @@ def fit_dipole(evoked, cov, bem, trans=None, min_dist=5., n_jobs=1,
                      for fwd in np.array_split(guess_fwd,
                                                len(guess_src['rr']))]
     guess_data = dict(fwd=guess_fwd, fwd_svd=guess_fwd_svd,
+                      fwd_vv=_make_guess_vv(guess_fwd_svd),
                       fwd_orig=guess_fwd_orig, scales=guess_fwd_scales)
     del guess_fwd, guess_fwd_svd, guess_fwd_orig, guess_fwd_scales  # destroyed
     logger.info('[done %d source%s]' % (guess_src['nuse'],
@@ -1272,7 +1344,7 @@ def fit_dipole(evoked, cov, bem, trans=None, min_dist=5., n_jobs=1,
     fun = _fit_dipole_fixed if fixed_position else _fit_dipole
     out = _fit_dipoles(
         fun, min_dist_to_inner_skull, data, times, guess_src['rr'],
-        guess_data, fwd_data, whitener, ori, n_jobs, rank)
+        guess_data, fwd_data, whitener, ori, n_jobs, rank, warm_start)
     assert len(out) == 8
     if fixed_position and ori is not None:
         # DipoleFixed
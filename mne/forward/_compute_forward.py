@@ -18,6 +18,7 @@
 
 import numpy as np
 from copy import deepcopy
+from functools import partial
 
 from ..surface import fast_cross_3d, _project_onto_surface
 from ..io.constants import FIFF, FWD
@@ -319,18 +320,21 @@ def _bem_inf_pots(mri_rr, bem_rr, mri_Q=None):
     ndarray : shape(n_dipole_vertices, 3, n_BEM_vertices)
     """
     # NOTE: the (μ_0 / (4π) factor has been moved to _prep_field_communication
-    # Get position difference vector between BEM vertex and dipole
-    diff = np.empty((len(mri_rr), 3, len(bem_rr)))
-    for ri, rr in enumerate(mri_rr):
-        this_diff = bem_rr - rr
-        diff_norm = np.sum(this_diff * this_diff, axis=1, keepdims=True)
-        diff_norm *= np.sqrt(diff_norm)
-        diff_norm[diff_norm == 0] = 1
-        if mri_Q is not None:
-            this_diff = np.dot(this_diff, mri_Q.T)
-        this_diff /= diff_norm
-        diff[ri] = this_diff.T
-
+    if mri_Q is not None and np.allclose(np.dot(mri_Q, mri_Q.T), np.eye(3)):
+        # rotations preserve the distances, so rotate the points instead of
+        # all of their differences
+        mri_Q = mri_Q.astype(bem_rr.dtype)
+        mri_rr, bem_rr = np.dot(mri_rr, mri_Q.T), np.dot(bem_rr, mri_Q.T)
+        mri_Q = None
+    # Get position difference vector between BEM vertex and dipole, all
+    # dipoles at once (the computations use the dtype of the inputs)
+    diff = bem_rr.T[np.newaxis] - mri_rr[:, :, np.newaxis]
+    diff_norm = einsum('ijk,ijk->ik', diff, diff)[:, np.newaxis]
+    diff_norm *= np.sqrt(diff_norm)
+    diff_norm[diff_norm == 0] = 1
+    if mri_Q is not None:
+        diff = np.matmul(mri_Q.astype(diff.dtype), diff)
+    diff /= diff_norm
     return diff
 
 
@@ -370,25 +374,45 @@ def _bem_inf_fields(rr, rmag, cosmag):
         Magnetic field from all dipoles at each MEG sensor integration point
     """
     # rr, rmag refactored according to Equation (19) in Mosher, 1999
-    # Knowing that we're doing all directions, refactor above function:
-
-    diff = rmag.T[np.newaxis, :, :] - rr[:, :, np.newaxis]
-    diff_norm = np.sum(diff * diff, axis=1)
+    # Knowing that we're doing all directions, refactor above function.
+    # Both the squared distances and the cross products are expanded so
+    # that the terms depending on the dipoles are matrix products:
+    # |rmag - rr|^2 = |rmag|^2 - 2 rmag . rr + |rr|^2
+    diff_norm = np.dot(rr, -2 * rmag.T)
+    diff_norm += np.sum(rr * rr, axis=1)[:, np.newaxis]
+    diff_norm += np.sum(rmag * rmag, axis=1)
     diff_norm *= np.sqrt(diff_norm)  # Get magnitude of distance cubed
     diff_norm[diff_norm == 0] = 1  # avoid nans
 
     # This is the result of cross-prod calcs with basis vectors,
     # as if we had taken (Q=np.eye(3)), then multiplied by cosmags
-    # factor, and then summed across directions
-    x = np.array([diff[:, 1] * cosmag[:, 2] - diff[:, 2] * cosmag[:, 1],
-                  diff[:, 2] * cosmag[:, 0] - diff[:, 0] * cosmag[:, 2],
-                  diff[:, 0] * cosmag[:, 1] - diff[:, 1] * cosmag[:, 0]])
-    return np.rollaxis(x / diff_norm, 1)
+    # factor, and then summed across directions, i.e. (rmag - rr) x cosmag
+    # where rr x cosmag is rr.dot(cross_mat) with cross_mat[j, k] the
+    # coefficients of rr[j] in (rr x cosmag)[k]
+    cross_mat = np.zeros((3, 3, len(cosmag)))
+    cross_mat[1, 0], cross_mat[2, 0] = cosmag[:, 2], -cosmag[:, 1]
+    cross_mat[2, 1], cross_mat[0, 1] = cosmag[:, 0], -cosmag[:, 2]
+    cross_mat[0, 2], cross_mat[1, 2] = cosmag[:, 1], -cosmag[:, 0]
+    x = np.dot(rr, cross_mat.reshape(3, -1)).reshape(len(rr), 3, -1)
+    np.subtract(fast_cross_3d(rmag, cosmag).T, x, out=x)
+    x /= diff_norm[:, np.newaxis]
+    return x
+
+
+# Maximum size (in bytes) of the temporary arrays of all blocks of sources
+# processed at once in _bem_pot_or_field
+_BEM_BLOCK_MEMORY = 50e6
+
+
+def _bem_block_size(n_per_source, dtype, n_jobs):
+    """Get the number of sources per block within the memory budget."""
+    return max(int(_BEM_BLOCK_MEMORY // (n_per_source * n_jobs *
+                                         np.dtype(dtype).itemsize)), 1)
 
 
 @fill_doc
 def _bem_pot_or_field(rr, mri_rr, mri_Q, coils, solution, bem_rr, n_jobs,
-                      coil_type):
+                      coil_type, dtype=np.float64):
     """Calculate the magnetic field or electric potential forward solution.
 
     The code is very similar between EEG and MEG potentials, so combine them.
@@ -412,6 +436,9 @@ def _bem_pot_or_field(rr, mri_rr, mri_Q, coils, solution, bem_rr, n_jobs,
     %(n_jobs)s
     coil_type : str
         'meg' or 'eeg'
+    dtype : dtype
+        The dtype of the infinite-medium potentials. The primary currents
+        and the output are always computed in double precision.
 
     Returns
     -------
@@ -420,27 +447,34 @@ def _bem_pot_or_field(rr, mri_rr, mri_Q, coils, solution, bem_rr, n_jobs,
     """
     # Both MEG and EEG have the inifinite-medium potentials
     # This could be just vectorized, but eats too much memory, so instead we
-    # reduce memory by chunking within _do_inf_pots and parallelize, too:
-    parallel, p_fun, _ = parallel_func(_do_inf_pots, n_jobs)
+    # reduce memory by processing blocks of sources whose size is set by
+    # _BEM_BLOCK_MEMORY. The work is dominated by BLAS and NumPy operations
+    # that release the GIL, so the blocks are split across threads, which
+    # share the solution instead of pickling it to each process.
     nas = np.array_split
-    B = np.sum(parallel(p_fun(mri_rr, sr.copy(), mri_Q, sol.copy())
-                        for sr, sol in zip(nas(bem_rr, n_jobs),
-                                           nas(solution.T, n_jobs))), axis=0)
-    # The copy()s above should make it so the whole objects don't need to be
-    # pickled...
+    parallel, p_fun, _ = parallel_func(_do_inf_pots, n_jobs, prefer='threads')
+    bem_rr = bem_rr.astype(dtype)
+    sol = solution.T.astype(dtype)
+    n_block = _bem_block_size(7 * len(bem_rr), dtype, n_jobs)
+    B = np.concatenate(parallel(
+        p_fun(r.astype(dtype), bem_rr, mri_Q, sol, n_block)
+        for r in nas(mri_rr, n_jobs)))
 
     # Only MEG coils are sensitive to the primary current distribution.
     if coil_type == 'meg':
         # Primary current contribution (can be calc. in coil/dipole coords)
-        parallel, p_fun, _ = parallel_func(_do_prim_curr, n_jobs)
-        pcc = np.concatenate(parallel(p_fun(r, coils)
+        parallel, p_fun, _ = parallel_func(_do_prim_curr, n_jobs,
+                                           prefer='threads')
+        coils = _triage_coils(coils)
+        n_block = _bem_block_size(8 * len(coils[0]), np.float64, n_jobs)
+        pcc = np.concatenate(parallel(p_fun(r, coils, n_block)
                                       for r in nas(rr, n_jobs)), axis=0)
         B += pcc
         B *= _MAG_FACTOR
     return B
 
 
-def _do_prim_curr(rr, coils):
+def _do_prim_curr(rr, coils, n_block=1):
     """Calculate primary currents in a set of MEG coils.
 
     See Mosher et al., 1999 Section II for discussion of primary vs. volume
@@ -452,6 +486,8 @@ def _do_prim_curr(rr, coils):
         3D dipole source positions in head coordinates
     coils : list of dict
         List of MEG coils where each element contains coil specific information
+    n_block : int
+        The number of sources processed at once.
 
     Returns
     -------
@@ -461,13 +497,14 @@ def _do_prim_curr(rr, coils):
     rmags, cosmags, ws, bins = _triage_coils(coils)
     n_coils = bins[-1] + 1
     del coils
+    # the points of each coil are contiguous, so sum them with reduceat
+    starts = np.searchsorted(bins, np.arange(n_coils))
     pc = np.empty((len(rr) * 3, n_coils))
-    for start, stop in _rr_bounds(rr, chunk=1):
+    for start, stop in _rr_bounds(rr, chunk=n_block):
         p = _bem_inf_fields(rr[start:stop], rmags, cosmags)
         p *= ws
         p.shape = (3 * (stop - start), -1)
-        pc[3 * start:3 * stop] = [np.bincount(bins, pp, bins[-1] + 1)
-                                  for pp in p]
+        pc[3 * start:3 * stop] = np.add.reduceat(p, starts, axis=1)
     return pc
 
 
@@ -477,7 +514,7 @@ def _rr_bounds(rr, chunk=200):
     return zip(bounds[:-1], bounds[1:])
 
 
-def _do_inf_pots(mri_rr, bem_rr, mri_Q, sol):
+def _do_inf_pots(mri_rr, bem_rr, mri_Q, sol, n_block=200):
     """Calculate infinite potentials for MEG or EEG sensors using chunks.
 
     Parameters
@@ -488,8 +525,10 @@ def _do_inf_pots(mri_rr, bem_rr, mri_Q, sol):
         3D vertex positions for all surfaces in the BEM
     mri_Q :
         3x3 head -> MRI transform. I.e., head_mri_t.dot(np.eye(3))
-    sol : ndarray, shape (n_sensors_subset, n_BEM_vertices_subset)
-        Comes from _bem_specify_coils
+    sol : ndarray, shape (n_BEM_vertices, n_sensors)
+        Comes from _bem_specify_coils (transposed)
+    n_block : int
+        The number of sources processed at once.
 
     Returns
     -------
@@ -504,7 +543,7 @@ def _do_inf_pots(mri_rr, bem_rr, mri_Q, sol):
 
     # We chunk the source mri_rr's in order to save memory
     B = np.empty((len(mri_rr) * 3, sol.shape[1]))
-    for start, stop in _rr_bounds(mri_rr):
+    for start, stop in _rr_bounds(mri_rr, chunk=n_block):
         # v0 in Hämäläinen et al., 1989 == v_inf in Mosher, et al., 1999
         v0s = _bem_inf_pots(mri_rr[start:stop], bem_rr, mri_Q)
         v0s = v0s.reshape(-1, v0s.shape[2])
@@ -646,8 +685,17 @@ def _triage_coils(coils):
 # #############################################################################
 # MAGNETIC DIPOLE (e.g. CHPI)
 
-def _magnetic_dipole_field_vec(rrs, coils, too_close='raise'):
-    """Compute an MEG forward solution for a set of magnetic dipoles."""
+# Number of (dipole, integration point) pairs processed at once
+_MAG_DIPOLE_CHUNK = 50000
+
+
+def _magnetic_dipole_field_vec(rrs, coils, too_close='raise', grad=False):
+    """Compute an MEG forward solution for a set of magnetic dipoles.
+
+    If ``grad`` is True, the derivatives of the fields with respect to
+    the dipole positions are also returned, shaped (n_rrs, 3, 3, n_coils)
+    as (dipole, position axis, moment axis, coil).
+    """
     # The code below is a more efficient version (~30x) of this:
     # for ri, rr in enumerate(rrs):
     #     for k in range(len(coils)):
@@ -663,12 +711,23 @@ def _magnetic_dipole_field_vec(rrs, coils, too_close='raise'):
     #                                   axis=1)[:, np.newaxis] -
     #                 dist2 * this_coil['cosmag']) / dist5
     #         fwd[3*ri:3*ri+3, k] = 1e-7 * np.dot(this_coil['w'], sum_)
+    # All dipoles of a chunk are evaluated at once, and the weighted sum
+    # over the integration points of each coil is a single reduction.
     rmags, cosmags, ws, bins = _triage_coils(coils)
     del coils
-    fwd = np.empty((3 * len(rrs), bins[-1] + 1), order='F')
-    for ri, rr in enumerate(rrs):
-        diff = rmags - rr
-        dist2 = np.sum(diff * diff, axis=1)[:, np.newaxis]
+    rrs = np.array(rrs, float).reshape(-1, 3)
+    n_rr, n_pts, n_coils = len(rrs), len(rmags), bins[-1] + 1
+    # the points of each coil are contiguous, so sum them with reduceat
+    starts = np.searchsorted(bins, np.arange(n_coils))
+    fwd = np.empty((3 * n_rr, n_coils), order='F')
+    if grad:
+        dfwd = np.empty((n_rr, 3, 3, n_coils))
+        eye = np.eye(3)
+    n_chunk = max(_MAG_DIPOLE_CHUNK // max(n_pts, 1), 1)
+    for start in range(0, n_rr, n_chunk):
+        stop = min(start + n_chunk, n_rr)
+        diff = rmags - rrs[start:stop, np.newaxis]  # (n_rr, n_pts, 3)
+        dist2 = np.sum(diff * diff, axis=-1, keepdims=True)
         dist = np.sqrt(dist2)
         if (dist < 1e-5).any():
             msg = 'Coil too close (dist = %g m)' % dist.min()
@@ -676,13 +735,28 @@ def _magnetic_dipole_field_vec(rrs, coils, too_close='raise'):
                 raise RuntimeError(msg)
             else:  # warning
                 func = warn if too_close == 'warning' else logger.info
-                func('Coil too close (dist = %g m)' % dist.min())
-        sum_ = ws[:, np.newaxis] * (3 * diff * np.sum(diff * cosmags,
-                                                      axis=1)[:, np.newaxis] -
-                                    dist2 * cosmags) / (dist2 * dist2 * dist)
-        for ii in range(3):
-            fwd[3 * ri + ii] = np.bincount(bins, sum_[:, ii], bins[-1] + 1)
+                func(msg)
+        dot = np.sum(diff * cosmags, axis=-1, keepdims=True)
+        inv_dist5 = 1. / (dist2 * dist2 * dist)
+        sum_ = (3 * diff * dot - dist2 * cosmags) * inv_dist5
+        fwd[3 * start:3 * stop] = np.add.reduceat(
+            sum_ * ws[:, np.newaxis], starts, axis=1).transpose(
+            0, 2, 1).reshape(-1, n_coils)
+        if grad:
+            # d(sum_[k]) / d(diff[j]); moving the dipole negates this
+            d_sum = 3 * cosmags[:, :, np.newaxis] * diff[:, :, np.newaxis]
+            d_sum += 3 * dot[..., np.newaxis] * eye
+            d_sum -= 2 * diff[..., np.newaxis] * cosmags[:, np.newaxis]
+            d_sum *= inv_dist5[..., np.newaxis]
+            d_sum -= (5 * diff / dist2)[..., np.newaxis] * \
+                sum_[:, :, np.newaxis]
+            d_sum *= -ws[:, np.newaxis, np.newaxis]
+            dfwd[start:stop] = np.add.reduceat(
+                d_sum, starts, axis=1).transpose(0, 2, 3, 1)
     fwd *= 1e-7
+    if grad:
+        dfwd *= 1e-7
+        return fwd, dfwd
     return fwd
 
 
@@ -690,7 +764,8 @@ def _magnetic_dipole_field_vec(rrs, coils, too_close='raise'):
 # MAIN TRIAGING FUNCTION
 
 @verbose
-def _prep_field_computation(rr, bem, fwd_data, n_jobs, verbose=None):
+def _prep_field_computation(rr, bem, fwd_data, n_jobs, dtype=np.float64,
+                            verbose=None):
     """Precompute and store some things that are used for both MEG and EEG.
 
     Calculation includes multiplication factors, coordinate transforms,
@@ -706,6 +781,8 @@ def _prep_field_computation(rr, bem, fwd_data, n_jobs, verbose=None):
         Dict containing sensor information. Gets updated here with BEM and
         sensor information for later forward calculations
     %(n_jobs)s
+    dtype : dtype
+        The dtype of the intermediate BEM computations.
     %(verbose)s
     """
     bem_rr = mults = mri_Q = head_mri_t = None
@@ -768,7 +845,10 @@ def _prep_field_computation(rr, bem, fwd_data, n_jobs, verbose=None):
         csolutions.append(csolution)
 
     # Get appropriate forward physics function depending on sphere or BEM model
-    fun = _sphere_pot_or_field if bem['is_sphere'] else _bem_pot_or_field
+    if bem['is_sphere']:
+        fun = _sphere_pot_or_field
+    else:
+        fun = partial(_bem_pot_or_field, dtype=dtype)
 
     # Update fwd_data with
     #    bem_rr (3D BEM vertex positions)
@@ -849,7 +929,7 @@ def _compute_forwards_meeg(rr, fd, n_jobs, silent=False):
 
 @verbose
 def _compute_forwards(rr, bem, coils_list, ccoils_list, infos, coil_types,
-                      n_jobs, verbose=None):
+                      n_jobs, dtype=np.float64, verbose=None):
     """Compute the MEG and EEG forward solutions.
 
     This effectively combines compute_forward_meg and compute_forward_eeg
@@ -870,6 +950,8 @@ def _compute_forwards(rr, bem, coils_list, ccoils_list, infos, coil_types,
     %(n_jobs)s
     infos : list, len(2)
         infos[0] is MEG info, infos[1] is EEG info
+    dtype : dtype
+        The dtype of the intermediate BEM computations.
 
     Returns
     -------
@@ -881,6 +963,6 @@ def _compute_forwards(rr, bem, coils_list, ccoils_list, infos, coil_types,
     # when e.g. dipole fitting
     fwd_data = dict(coils_list=coils_list, ccoils_list=ccoils_list,
                     infos=infos, coil_types=coil_types)
-    _prep_field_computation(rr, bem, fwd_data, n_jobs)
+    _prep_field_computation(rr, bem, fwd_data, n_jobs, dtype)
     Bs = _compute_forwards_meeg(rr, fwd_data, n_jobs)
     return Bs
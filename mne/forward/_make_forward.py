@@ -12,9 +12,12 @@ from copy import deepcopy
 from contextlib import contextmanager
 import os
 import os.path as op
+import re
 
 import numpy as np
+from scipy import sparse
 
+from .. import __version__
 from ._compute_forward import _compute_forwards
 from ..io import read_info, _loc_to_coil_trans, _loc_to_eeg_loc, Info
 from ..io.pick import _has_kit_refs, pick_types, pick_info
@@ -22,7 +25,8 @@ from ..io.constants import FIFF, FWD
 from ..transforms import (_ensure_trans, transform_surface_to, apply_trans,
                           _get_trans, _print_coord_trans, _coord_frame_name,
                           Transform)
-from ..utils import logger, verbose, warn, _pl
+from ..utils import (logger, verbose, warn, _pl, object_hash, sizeof_fmt,
+                     _check_option)
 from ..parallel import check_n_jobs
 from ..source_space import (_ensure_src, _filter_source_spaces,
                             _make_discrete_source_space, SourceSpaces)
@@ -30,7 +34,8 @@ from ..source_estimate import VolSourceEstimate
 from ..surface import _normalize_vectors
 from ..bem import read_bem_solution, _bem_find_surface, ConductorModel
 
-from .forward import Forward, _merge_meg_eeg_fwds, convert_forward_solution
+from .forward import (Forward, _merge_meg_eeg_fwds, convert_forward_solution,
+                      read_forward_solution, write_forward_solution)
 
 
 _accuracy_dict = dict(normal=FWD.COIL_ACCURACY_NORMAL,
@@ -503,9 +508,47 @@ def _prepare_for_forward(src, mri_head_t, info, bem, mindist, n_jobs,
         info, update_kwargs, bem
 
 
+# Names of the files written by the forward solution cache
+_FWD_CACHE_PATTERN = re.compile('^[0-9a-f]{32}-fwd.fif$')
+
+
+def _forward_cache_key(info, mri_head_t, src, bem, meg, eeg, mindist,
+                       ignore_ref, dtype):
+    """Hash the inputs that determine a forward solution."""
+    # Every source space entry ends up in the returned forward solution
+    # (e.g., patch information used by convert_forward_solution)
+    src_hash = list()
+    for s in src:
+        s = dict(s)
+        for key, val in s.items():
+            if sparse.issparse(val):
+                val = val.tocsr()
+                s[key] = (val.shape, val.data, val.indices, val.indptr)
+        src_hash.append(s)
+    return object_hash(dict(
+        version=__version__, coil_def=_extra_coil_def_fname,
+        chs=info['chs'], comps=info['comps'], bads=info['bads'],
+        dev_head_t=info['dev_head_t'], mri_head_t=mri_head_t,
+        src=src_hash, bem=dict(bem), meg=meg, eeg=eeg,
+        mindist=float(mindist), ignore_ref=ignore_ref, dtype=dtype))
+
+
+def _evict_forward_cache(cache_dir, cache_size):
+    """Remove the least recently used forward solutions above a size."""
+    # only touch the files written by the cache, never those of the user
+    fnames = [op.join(cache_dir, fname) for fname in os.listdir(cache_dir)
+              if _FWD_CACHE_PATTERN.match(fname) is not None]
+    fnames = sorted(fnames, key=op.getmtime, reverse=True)
+    sizes = np.cumsum([op.getsize(fname) for fname in fnames])
+    for fname in np.array(fnames)[sizes > cache_size]:
+        logger.info('Removing cached forward solution %s' % fname)
+        os.remove(fname)
+
+
 @verbose
 def make_forward_solution(info, trans, src, bem, meg=True, eeg=True,
                           mindist=0.0, ignore_ref=False, n_jobs=1,
+                          dtype='float64', cache_dir=None, cache_size=1e9,
                           verbose=None):
     """Calculate a forward solution for a subject.
 
@@ -533,6 +576,34 @@ def make_forward_solution(info, trans, src, bem, meg=True, eeg=True,
         option should be True for KIT files, since forward computation
         with reference channels is not currently supported.
     %(n_jobs)s
+    dtype : str
+        The data type of the infinite-medium potentials computed for BEM
+        models, can be ``'float64'`` (default) or ``'float32'``.
+        ``'float32'`` halves the memory needed for them and speeds up
+        their products with the BEM solution, at the cost of a relative
+        error of about 1e-6. The forward solution is always returned in
+        double precision.
+
+        .. versionadded:: 0.20
+    cache_dir : str | None
+        Directory in which computed forward solutions are stored, keyed by
+        a hash of the sensor geometry, transformation, source space, BEM
+        and computation options. If a matching solution is present, it is
+        read instead of being recomputed. None (default) disables caching.
+        With caching, the returned solution is always the one read back
+        from the cache file (also when it was just computed), so it has the
+        single precision of the FIF format and the content of
+        :func:`mne.read_forward_solution`, whether or not the cache was hit.
+
+        .. versionadded:: 0.20
+    cache_size : float
+        Maximum total size (in bytes) of the files kept in ``cache_dir``.
+        When it is exceeded, the least recently used forward solutions are
+        removed (a solution larger than ``cache_size`` is returned but not
+        kept). Only the files written by the cache (named after the hash)
+        are removed, other files in ``cache_dir`` are left untouched.
+
+        .. versionadded:: 0.20
     %(verbose)s
 
     Returns
@@ -572,6 +643,21 @@ def make_forward_solution(info, trans, src, bem, meg=True, eeg=True,
     else:
         info_extra = 'instance of Info'
     n_jobs = check_n_jobs(n_jobs)
+    _check_option('dtype', dtype, ('float64', 'float32'))
+    if cache_dir is not None:
+        src = _ensure_src(src)
+        if isinstance(bem, str):
+            bem = read_bem_solution(bem)
+        cache_fname = op.join(cache_dir, '%032x-fwd.fif' % _forward_cache_key(
+            info, mri_head_t, src, bem, meg, eeg, mindist, ignore_ref,
+            dtype))
+        if op.isfile(cache_fname):
+            logger.info('Reading cached forward solution %s' % cache_fname)
+            try:
+                os.utime(cache_fname)  # mark as recently used
+            except OSError:  # e.g., a read-only shared cache
+                pass
+            return read_forward_solution(cache_fname)
 
     # Report the setup
     logger.info('Source space          : %s' % src)
@@ -601,7 +687,8 @@ def make_forward_solution(info, trans, src, bem, meg=True, eeg=True,
     ccoils = [compcoils, None]
     infos = [meg_info, None]
     megfwd, eegfwd = _compute_forwards(rr, bem, coils, ccoils,
-                                       infos, coil_types, n_jobs)
+                                       infos, coil_types, n_jobs,
+                                       np.dtype(dtype))
 
     # merge forwards
     fwd = _merge_meg_eeg_fwds(_to_forward_dict(megfwd, megnames),
@@ -613,6 +700,25 @@ def make_forward_solution(info, trans, src, bem, meg=True, eeg=True,
     # done in the C code) because mne-python assumes forward solution source
     # spaces are in head coords.
     fwd.update(**update_kwargs)
+    if cache_dir is not None:
+        if not op.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        # write to a temporary file first so that concurrent runs never read
+        # a partially written solution
+        temp_fname = op.join(cache_dir, '.%d-%s' % (
+            os.getpid(), op.basename(cache_fname)))
+        try:
+            write_forward_solution(temp_fname, fwd, overwrite=True,
+                                   verbose=False)
+            os.replace(temp_fname, cache_fname)
+        finally:
+            if op.isfile(temp_fname):
+                os.remove(temp_fname)
+        logger.info('Cached forward solution as %s (%s)'
+                    % (cache_fname, sizeof_fmt(op.getsize(cache_fname))))
+        # return what a cache hit returns, independently of the cache state
+        fwd = read_forward_solution(cache_fname, verbose=False)
+        _evict_forward_cache(cache_dir, cache_size)
     logger.info('Finished.')
     return fwd
 
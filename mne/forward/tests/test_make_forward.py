@@ -16,8 +16,9 @@ from mne import (read_forward_solution, write_forward_solution,
                  make_sphere_model, pick_types_forward, pick_info, pick_types,
                  read_evokeds, read_cov, read_dipole, SourceSpaces)
 from mne.utils import (requires_mne, requires_nibabel,
-                       run_tests_if_main, run_subprocess)
-from mne.forward._make_forward import _create_meg_coils, make_forward_dipole
+                       run_tests_if_main, run_subprocess, catch_logging)
+from mne.forward._make_forward import (_create_meg_coils, make_forward_dipole,
+                                       _forward_cache_key)
 from mne.forward._compute_forward import _magnetic_dipole_field_vec
 from mne.forward import Forward, _do_forward_solution
 from mne.dipole import Dipole, fit_dipole
@@ -25,12 +26,16 @@ from mne.simulation import simulate_evoked
 from mne.source_estimate import VolSourceEstimate
 from mne.source_space import (get_volume_labels_from_aseg, write_source_spaces,
                               _compare_source_spaces, setup_source_space)
+from mne.surface import _get_ico_surface
+from mne.bem import _surfaces_to_bem, make_bem_solution
 
 data_path = testing.data_path(download=False)
 fname_meeg = op.join(data_path, 'MEG', 'sample',
                      'sample_audvis_trunc-meg-eeg-oct-4-fwd.fif')
 fname_raw = op.join(op.dirname(__file__), '..', '..', 'io', 'tests', 'data',
                     'test_raw.fif')
+fname_ctf = op.join(op.dirname(__file__), '..', '..', 'io', 'tests', 'data',
+                    'test_ctf_comp_raw.fif')
 fname_evo = op.join(data_path, 'MEG', 'sample', 'sample_audvis_trunc-ave.fif')
 fname_cov = op.join(data_path, 'MEG', 'sample', 'sample_audvis_trunc-cov.fif')
 fname_dip = op.join(data_path, 'MEG', 'sample', 'sample_audvis_trunc_set1.dip')
@@ -105,6 +110,22 @@ def test_magnetic_dipole():
         near_fwd = _magnetic_dipole_field_vec(rr[np.newaxis, :], [coil])
         ratio = 8. if ch['ch_name'][-1] == '1' else 16.  # grad vs mag
         assert_allclose(np.median(near_fwd / far_fwd), ratio, atol=1e-1)
+    # several dipoles at once, and position derivatives
+    rrs = np.array([[0., 0., 0.], [0.01, -0.02, 0.03], [0., 13., -6.]])
+    fwd, dfwd = _magnetic_dipole_field_vec(rrs, coils, grad=True)
+    assert fwd.shape == (9, len(coils))
+    assert dfwd.shape == (3, 3, 3, len(coils))
+    for ri, rr in enumerate(rrs):
+        assert_allclose(fwd[3 * ri:3 * ri + 3],
+                        _magnetic_dipole_field_vec(rr[np.newaxis], coils))
+    eps = 1e-7
+    for ii in range(3):
+        step = np.zeros(3)
+        step[ii] = eps
+        fd = (_magnetic_dipole_field_vec(rrs + step, coils) -
+              _magnetic_dipole_field_vec(rrs - step, coils)) / (2 * eps)
+        assert_allclose(dfwd[:, ii], fd.reshape(3, 3, -1),
+                        rtol=1e-5, atol=1e-6 * np.abs(fd).max())
     # degenerate case
     r0 = coils[0]['rmag'][[0]]
     with pytest.raises(RuntimeError, match='Coil too close'):
@@ -457,4 +478,96 @@ def test_make_forward_no_meg(tmpdir):
     assert_allclose(fwd['sol']['data'], fwd_read['sol']['data'])
 
 
+def test_make_forward_cache(tmpdir, monkeypatch):
+    """Test caching of forward solutions."""
+    src = setup_volume_source_space(pos=dict(rr=[[0.05, 0, 0], [0, 0.05, 0]],
+                                             nn=[[0, 0, 1.], [0, 0, 1.]]))
+    bem = make_sphere_model()
+    montage = make_standard_montage('standard_1020')
+    info = create_info(['Cz', 'Fz'], 1000., 'eeg', montage=montage)
+    cache_dir = str(tmpdir.join('cache'))
+    fwd = make_forward_solution(info, None, src, bem, cache_dir=cache_dir)
+    assert len(os.listdir(cache_dir)) == 1
+    with catch_logging() as log:
+        fwd_cached = make_forward_solution(info, None, src, bem,
+                                           cache_dir=cache_dir, verbose=True)
+    assert 'Reading cached forward solution' in log.getvalue()
+    # a miss returns the same as a hit
+    assert_array_equal(fwd['sol']['data'], fwd_cached['sol']['data'])
+    assert fwd['sol']['data'].dtype == fwd_cached['sol']['data'].dtype
+    assert set(fwd) == set(fwd_cached)
+    assert set(fwd['info']) == set(fwd_cached['info'])
+    assert_allclose(fwd['source_rr'], fwd_cached['source_rr'])
+    # a read-only cache can still be hit
+
+    def _utime_fail(fname):
+        raise PermissionError('read-only')
+
+    with monkeypatch.context() as m:
+        m.setattr(os, 'utime', _utime_fail)
+        fwd_cached = make_forward_solution(info, None, src, bem,
+                                           cache_dir=cache_dir)
+    assert_array_equal(fwd['sol']['data'], fwd_cached['sol']['data'])
+    # all source space entries are part of the key
+    key = _forward_cache_key(info, None, src, bem, True, True, 0., False,
+                             'float64')
+    src_2 = src.copy()
+    src_2[0]['subject_his_id'] = 'other'
+    assert _forward_cache_key(info, None, src_2, bem, True, True, 0., False,
+                              'float64') != key
+    # different geometry is a cache miss, old files are evicted by size,
+    # other forward solutions in the directory are kept
+    fname = op.join(cache_dir, os.listdir(cache_dir)[0])
+    fname_user = op.join(cache_dir, 'sample-fwd.fif')
+    write_forward_solution(fname_user, fwd)
+    info['chs'][0]['loc'][:3] *= 1.1
+    fwd_2 = make_forward_solution(info, None, src, bem, cache_dir=cache_dir,
+                                  cache_size=1.5 * op.getsize(fname))
+    assert not op.isfile(fname)
+    assert op.isfile(fname_user)
+    os.remove(fname_user)
+    assert len(os.listdir(cache_dir)) == 1
+    assert not np.allclose(fwd['sol']['data'], fwd_2['sol']['data'])
+    # a failed write leaves no temporary file behind
+
+    def _write_fail(fname, fwd, overwrite=False, verbose=None):
+        open(fname, 'w').close()
+        raise RuntimeError('disk full')
+
+    monkeypatch.setattr('mne.forward._make_forward.write_forward_solution',
+                        _write_fail)
+    info['chs'][0]['loc'][:3] *= 1.1
+    with pytest.raises(RuntimeError, match='disk full'):
+        make_forward_solution(info, None, src, bem, cache_dir=cache_dir)
+    assert len(os.listdir(cache_dir)) == 1
+
+
+def test_make_forward_bem_dtype():
+    """Test BEM forward computations in blocks and single precision."""
+    ico = _get_ico_surface(1)
+    surfs = [dict(rr=ico['rr'] * rad, tris=ico['tris'])
+             for rad in (90, 85, 80)]
+    bem = make_bem_solution(_surfaces_to_bem(
+        surfs, [FIFF.FIFFV_BEM_SURF_ID_HEAD, FIFF.FIFFV_BEM_SURF_ID_SKULL,
+                FIFF.FIFFV_BEM_SURF_ID_BRAIN], [0.3, 0.006, 0.3]))
+    src = setup_volume_source_space(pos=10., sphere=(0, 0, 0, 60.))
+    info = read_info(fname_ctf)  # with compensation channels
+    montage = make_standard_montage('standard_1020')
+    info_eeg = create_info(['Cz', 'Fz', 'Pz', 'T7', 'T8'], 1000., 'eeg',
+                           montage=montage)
+    for this_info in (info, info_eeg):
+        fwd = make_forward_solution(this_info, None, src, bem)
+        fwd_32 = make_forward_solution(this_info, None, src, bem,
+                                       dtype='float32')
+        assert fwd_32['sol']['data'].dtype == np.float64
+        atol = 1e-5 * np.abs(fwd['sol']['data']).max()
+        assert_allclose(fwd_32['sol']['data'], fwd['sol']['data'],
+                        rtol=1e-4, atol=atol)
+    # sources split across threads
+    fwd_par = make_forward_solution(info_eeg, None, src, bem, n_jobs=2)
+    assert_allclose(fwd_par['sol']['data'], fwd['sol']['data'], rtol=1e-12)
+    with pytest.raises(ValueError, match="Invalid value for the 'dtype'"):
+        make_forward_solution(info, None, src, bem, dtype='float16')
+
+
 run_tests_if_main()
@@ -2,12 +2,13 @@
 #
 # License: BSD (3-clause)
 
+from time import time
+
 import numpy as np
 
 from ..defaults import _handle_default
 from ..fixes import _safe_svd
-from ..utils import (warn, logger, _svd_lwork, _repeated_svd, _repeated_pinv2,
-                     eigh)
+from ..utils import warn, logger, _svd_lwork, _repeated_svd
 
 
 # For the reference implementation of eLORETA (force_equal=False),
@@ -56,18 +57,27 @@ def _compute_eloreta(inv, lambda2, options):
     shape = (n_src,)
     shape += () if force_equal or n_orient == 1 else (n_orient, n_orient)
     W = np.empty(shape)
-    W[:] = 1. if force_equal or n_orient == 1 else np.eye(n_orient)[np.newaxis]
+    if options['init'] is None:
+        W[:] = 1. if force_equal or n_orient == 1 else \
+            np.eye(n_orient)[np.newaxis]
+    else:
+        # warm start, e.g. from the weights obtained with another lambda2
+        init = np.asarray(options['init'], float)
+        if init.shape != shape:
+            raise ValueError('eLORETA init weights must have shape %s, got %s'
+                             % (shape, init.shape))
+        W[:] = init
+        logger.info('        Using the provided initial weights')
     # Here we keep the weights normalized to roughly n_src * n_orient.
     # Not sure if there is a better way to normalize.
-    extra = ' (this make take a while)' if n_orient == 3 else ''
-    logger.info('        Fitting up to %d iterations%s...'
-                % (max_iter, extra))
-    pinv2_lwork = _svd_lwork((3, 3))
+    logger.info('        Fitting up to %d iterations...' % (max_iter,))
     svd_lwork = _svd_lwork((G.shape[0], G.shape[0]))
+    t_start = time()
     for kk in range(max_iter):
+        t_iter = time()
         # Compute inverse of the weights (stabilized) and corresponding M
         M, _ = _compute_eloreta_inv(G, G_3, W, n_orient, n_nzero, lambda2,
-                                    force_equal, pinv2_lwork, svd_lwork)
+                                    force_equal, svd_lwork)
 
         # Update the weights
         W_last = W.copy()
@@ -75,33 +85,33 @@ def _compute_eloreta(inv, lambda2, options):
             W[:] = np.sqrt((np.dot(M, G) * G).sum(0))
             W /= W.sum() / n_src
         else:
-            norm = 0.
-            for ii in range(n_src):
-                this_w, this_s = _sqrtm_sym(
-                    np.dot(np.dot(G_3[ii].T, M), G_3[ii]),
-                    overwrite_a=True, check_finite=False)
-                W[ii] = np.mean(this_s) if force_equal else this_w
-                norm += np.mean(this_s)
-            W /= norm / n_src
+            # all 3x3 blocks G_3[ii].T @ M @ G_3[ii] at once
+            M_G_3 = np.dot(M, G).reshape(n_chan, n_src, 3).transpose(1, 0, 2)
+            this_w, this_s = _sqrtm_sym(
+                np.matmul(G_3.transpose(0, 2, 1), M_G_3))
+            W[:] = this_s if force_equal else this_w
+            W /= this_s.sum() / n_src
 
         # Check for weight convergence
         delta = (np.linalg.norm(W.ravel() - W_last.ravel()) /
                  np.linalg.norm(W_last.ravel()))
-        logger.debug('            Iteration %s / %s ...%s'
-                     % (kk + 1, max_iter, extra))
+        logger.debug('            Iteration %s / %s (delta %0.2g, %0.2f sec)'
+                     % (kk + 1, max_iter, delta, time() - t_iter))
         if delta < eps:
-            logger.info('        Converged on iteration %d (%0.2g < %0.2g)'
-                        % (kk, delta, eps))
+            logger.info('        Converged on iteration %d (%0.2g < %0.2g) '
+                        'in %0.1f sec' % (kk, delta, eps, time() - t_start))
             break
     else:
         warn('eLORETA weight fitting did not converge (>= %s)' % eps)
     logger.info('        Assembling eLORETA kernel and modifying inverse')
     M, W_inv = _compute_eloreta_inv(G, G_3, W, n_orient, n_nzero, lambda2,
-                                    force_equal, pinv2_lwork, svd_lwork)
-    K = np.zeros((n_src * n_orient, n_chan))
-    for ii in range(n_src):
-        sl = slice(n_orient * ii, n_orient * (ii + 1))
-        K[sl] = np.dot(W_inv[ii], np.dot(G.T[sl], M))
+                                    force_equal, svd_lwork)
+    K = np.dot(G.T, M)
+    if W_inv.ndim == 1:
+        K *= np.repeat(W_inv, n_orient)[:, np.newaxis]
+    else:
+        K = np.matmul(W_inv, K.reshape(n_src, n_orient, n_chan))
+        K.shape = (n_src * n_orient, n_chan)
     # Avoid the scaling to get to currents
     K /= np.sqrt(inv['source_cov']['data'])[:, np.newaxis]
     # eLORETA seems to break our simple relationships with noisenorm etc.,
@@ -110,23 +120,22 @@ def _compute_eloreta(inv, lambda2, options):
     inv['eigen_leads']['data'] = eigen_leads
     inv['reginv'] = reginv
     inv['eigen_fields']['data'] = eigen_fields
+    inv['eloreta_weights'] = W
     logger.info('[done]')
     return W
 
 
 def _compute_eloreta_inv(G, G_3, W, n_orient, n_nzero, lambda2, force_equal,
-                         pinv2_lwork, svd_lwork):
+                         svd_lwork):
     """Invert weights and compute M."""
-    W_inv = np.empty(W.shape)
-    n_src = W_inv.shape[0]
+    n_src = W.shape[0]
     if n_orient == 1 or force_equal:
-        W_inv[:] = 1. / W
+        W_inv = 1. / W
     else:
-        for ii in range(n_src):
-            # Here we use a single-precision-suitable `rcond` (given our
-            # 3x3 matrix size) because the inv could be saved in single
-            # precision.
-            W_inv[ii] = _repeated_pinv2(W[ii], rcond=1e-7, lwork=pinv2_lwork)
+        # Here we use a single-precision-suitable `rcond` (given our
+        # 3x3 matrix size) because the inv could be saved in single
+        # precision.
+        W_inv = np.linalg.pinv(W, rcond=1e-7)
 
     # Weight the gain matrix
     if n_orient == 1 or force_equal:
@@ -136,9 +145,7 @@ def _compute_eloreta_inv(G, G_3, W, n_orient, n_nzero, lambda2, force_equal,
             W_inv_rep = W_inv
         W_inv_Gt = G.T * W_inv_rep[:, np.newaxis]
     else:
-        W_inv_Gt = np.empty((n_src, 3, G.shape[0]))
-        for ii in range(n_src):
-            W_inv_Gt[ii] = np.dot(W_inv[ii], G_3[ii].T)
+        W_inv_Gt = np.matmul(W_inv, G_3.transpose(0, 2, 1))
         W_inv_Gt.shape = (n_src * 3, -1)
 
     # Compute the inverse, normalizing by the trace
@@ -150,12 +157,12 @@ def _compute_eloreta_inv(G, G_3, W, n_orient, n_nzero, lambda2, force_equal,
     return M, W_inv
 
 
-def _sqrtm_sym(C, overwrite_a=False, check_finite=True):
-    """Compute the square root of a symmetric matrix."""
-    # Same as linalg.sqrtm(C) but faster, also yields the eigenvalues
-    s, u = eigh(C, overwrite_a=overwrite_a, check_finite=check_finite)
-    mask = s > s[-1] * 1e-7
-    u = u[:, mask]
-    s = np.sqrt(s[mask])
-    a = np.dot(s * u, u.T)
-    return a, s
+def _sqrtm_sym(C):
+    """Compute the square roots of a stack of symmetric matrices."""
+    # Same as linalg.sqrtm(C) but faster, also yields the mean of the square
+    # roots of the eigenvalues (ignoring those that are numerically zero)
+    s, u = np.linalg.eigh(C)
+    mask = s > s[..., -1:] * 1e-7
+    s = np.where(mask, np.sqrt(np.where(mask, s, 0.)), 0.)
+    a = np.matmul(u * s[..., np.newaxis, :], np.swapaxes(u, -1, -2))
+    return a, s.sum(-1) / mask.sum(-1)
@@ -5,9 +5,11 @@
 #
 # License: BSD (3-clause)
 
+from collections import OrderedDict
 from copy import deepcopy
 from math import sqrt
 import numpy as np
+from numpy.lib.format import open_memmap
 from scipy import linalg
 
 from ._eloreta import _compute_eloreta
@@ -35,21 +37,32 @@ from ..source_space import (_read_source_spaces_from_tree,
                             find_source_space_hemi, _get_vertno,
                             _write_source_spaces_to_fid, label_src_vertno_sel)
 from ..transforms import _ensure_trans, transform_surface_to
+from ..parallel import parallel_func
 from ..source_estimate import _make_stc, _get_src_type
 from ..utils import (check_fname, logger, verbose, warn,
                      _check_compensation_grade, _check_option,
-                     _check_depth, _check_src_normal)
+                     _check_depth, _check_src_normal, _validate_type, _pl)
 
 
 INVERSE_METHODS = ['MNE', 'dSPM', 'sLORETA', 'eLORETA']
+# number of prepared operators (and kernels per prepared operator) to cache
+_CACHE_SIZE = 2
 
 
 class InverseOperator(dict):
     """InverseOperator class to represent info from inverse operator."""
 
+    def __init__(self, *args, **kwargs):  # noqa: D102
+        super(InverseOperator, self).__init__(*args, **kwargs)
+        # prepared operators keyed by (nave, lambda2, method, method_params)
+        # and assembled kernels keyed by (method, pick_ori), see
+        # _check_or_prepare and _assemble_kernel
+        self._prepared_cache = OrderedDict()
+        self._kernel_cache = OrderedDict()
+
     def copy(self):
         """Return a copy of the InverseOperator."""
-        return InverseOperator(deepcopy(self))
+        return InverseOperator(deepcopy(dict(self)))
 
     def __repr__(self):  # noqa: D105
         """Summarize inverse info instead of printing all."""
@@ -478,11 +491,42 @@ def _check_ch_names(inv, info):
     _check_compensation_grade(inv['info'], info, 'inverse')
 
 
-def _check_or_prepare(inv, nave, lambda2, method, method_params, prepared):
+def _cache_get(cache, key):
+    """Get an entry of a bounded cache (if any) and mark it as recent."""
+    if cache is None or key is None or key not in cache:
+        return None
+    cache.move_to_end(key)
+    return cache[key]
+
+
+def _cache_set(cache, key, value):
+    """Add an entry to a bounded cache, dropping the least recent ones."""
+    if cache is not None and key is not None:
+        cache[key] = value
+        while len(cache) > _CACHE_SIZE:
+            cache.popitem(last=False)
+
+
+def _check_or_prepare(inv, nave, lambda2, method, method_params, prepared,
+                      use_cache=False):
     """Check if inverse was prepared, or prepare it."""
     if not prepared:
-        inv = prepare_inverse_operator(
-            inv, nave, lambda2, method, method_params)
+        key = (nave, lambda2, method, method_params)
+        if method_params is not None:
+            key = key[:-1] + (tuple(sorted(method_params.items())),)
+        try:
+            hash(key)
+        except TypeError:
+            key = None
+        cache = getattr(inv, '_prepared_cache', None) if use_cache else None
+        prepared_inv = _cache_get(cache, key)
+        if prepared_inv is None:
+            prepared_inv = prepare_inverse_operator(
+                inv, nave, lambda2, method, method_params)
+            _cache_set(cache, key, prepared_inv)
+        else:
+            logger.info('Using the cached prepared inverse operator')
+        inv = prepared_inv
     elif 'colorer' not in inv:
         raise ValueError('inverse operator has not been prepared, but got '
                          'argument prepared=True. Either pass prepared=False '
@@ -515,6 +559,19 @@ def prepare_inverse_operator(orig, nave, lambda2, method='dSPM',
     -------
     inv : instance of InverseOperator
         Prepared inverse operator.
+
+    Notes
+    -----
+    When an inverse function is called with ``prepared=False``, the
+    prepared operator (and the assembled kernel) of the last two distinct
+    settings of ``nave``, ``lambda2``, ``method`` and ``method_params`` are
+    cached in the original inverse operator and reused. Modifications of
+    the inverse operator after it was applied are thus not taken into
+    account; use ``inv.copy()`` to get an operator with an empty cache.
+    Each cached setting holds a full copy of the operator plus its kernel
+    (``n_sources * n_channels`` floats), which can use a lot of memory for
+    large source spaces; pass ``use_cache=False`` to the inverse functions
+    to disable the caching.
     """
     if nave <= 0:
         raise ValueError('The number of averages should be positive')
@@ -628,7 +685,8 @@ def prepare_inverse_operator(orig, nave, lambda2, method='dSPM',
 
 
 @verbose
-def _assemble_kernel(inv, label, method, pick_ori, verbose=None):
+def _assemble_kernel(inv, label, method, pick_ori, use_cache=False,
+                     verbose=None):
     """Assemble the kernel.
 
     Simple matrix multiplication followed by combination of the current
@@ -647,6 +705,8 @@ def _assemble_kernel(inv, label, method, pick_ori, verbose=None):
         Use minimum norm, dSPM, sLORETA, or eLORETA.
     pick_ori : None | "normal" | "vector"
         Which orientation to pick (only matters in the case of 'normal').
+    use_cache : bool
+        If True and label is None, cache the kernel in the inverse operator.
 
     Returns
     -------
@@ -664,7 +724,19 @@ def _assemble_kernel(inv, label, method, pick_ori, verbose=None):
     source_nn : array, shape (3 * n_vertices, 3)
         The direction in carthesian coordicates of the direction of the source
         dipoles.
+
+    Notes
+    -----
+    A cached kernel is read-only and returned without a copy, so it must
+    not be modified inplace.
     """  # noqa: E501
+    cache = getattr(inv, '_kernel_cache', None) \
+        if use_cache and label is None else None
+    out = _cache_get(cache, (method, pick_ori))
+    if out is not None:
+        logger.info('    Using the cached kernel')
+        return out
+
     eigen_leads = inv['eigen_leads']['data']
     source_cov = inv['source_cov']['data'][:, None]
     if method in ('dSPM', 'sLORETA'):
@@ -726,6 +798,10 @@ def _assemble_kernel(inv, label, method, pick_ori, verbose=None):
         logger.info('    Eigenleads need to be weighted ...')
         K = np.sqrt(source_cov) * np.dot(eigen_leads, trans)
 
+    if cache is not None:
+        K.flags.writeable = False
+        _cache_set(cache, (method, pick_ori), (K, noise_norm, vertno,
+                                               source_nn))
     return K, noise_norm, vertno, source_nn
 
 
@@ -761,7 +837,8 @@ def _subject_from_inverse(inverse_operator):
 @verbose
 def apply_inverse(evoked, inverse_operator, lambda2=1. / 9., method="dSPM",
                   pick_ori=None, prepared=False, label=None,
-                  method_params=None, return_residual=False, verbose=None):
+                  method_params=None, return_residual=False, use_cache=True,
+                  verbose=None):
     """Apply inverse operator to evoked data.
 
     Parameters
@@ -799,6 +876,7 @@ def apply_inverse(evoked, inverse_operator, lambda2=1. / 9., method="dSPM",
         Cannot be used with ``method=='eLORETA'``.
 
         .. versionadded:: 0.17
+    %(use_cache_inv)s
     %(verbose)s
 
     Returns
@@ -831,6 +909,12 @@ def apply_inverse(evoked, inverse_operator, lambda2=1. / 9., method="dSPM",
             location equal. The default is None, which means ``True`` for
             loose-orientation inverses and ``False`` for free- and
             fixed-orientation inverses. See below.
+        'init' : ndarray | None
+            Initial weights, e.g. the ``'eloreta_weights'`` entry of an
+            inverse operator prepared with another ``lambda2``, to speed up
+            the fit when sweeping the regularization (default None).
+
+            .. versionadded:: 0.20
 
     The eLORETA paper [4]_ defines how to compute inverses for fixed- and
     free-orientation inverses. In the free orientation case, the X/Y/Z
@@ -880,7 +964,7 @@ def apply_inverse(evoked, inverse_operator, lambda2=1. / 9., method="dSPM",
     _check_ch_names(inverse_operator, evoked.info)
 
     inv = _check_or_prepare(inverse_operator, nave, lambda2, method,
-                            method_params, prepared)
+                            method_params, prepared, use_cache)
 
     #
     #   Pick the correct channels from the data
@@ -890,7 +974,7 @@ def apply_inverse(evoked, inverse_operator, lambda2=1. / 9., method="dSPM",
     logger.info('    Picked %d channels from the data' % len(sel))
     logger.info('    Computing inverse...')
     K, noise_norm, vertno, source_nn = _assemble_kernel(inv, label, method,
-                                                        pick_ori)
+                                                        pick_ori, use_cache)
     sol = np.dot(K, evoked.data[sel])  # apply imaging kernel
     logger.info('    Computing residual...')
     # x̂(t) = G ĵ(t) = C ** 1/2 U Π w(t)
@@ -938,7 +1022,8 @@ def apply_inverse(evoked, inverse_operator, lambda2=1. / 9., method="dSPM",
 def apply_inverse_raw(raw, inverse_operator, lambda2, method="dSPM",
                       label=None, start=None, stop=None, nave=1,
                       time_func=None, pick_ori=None, buffer_size=None,
-                      prepared=False, method_params=None, verbose=None):
+                      prepared=False, method_params=None, n_jobs=1,
+                      fname=None, use_cache=True, verbose=None):
     """Apply inverse operator to Raw data.
 
     Parameters
@@ -972,19 +1057,31 @@ def apply_inverse_raw(raw, inverse_operator, lambda2, method="dSPM",
         :class:`mne.VectorSourceEstimate` object. This does not work when using
         an inverse operator with fixed orientations.
     buffer_size : int (or None)
-        If not None, the computation of the inverse and the combination of the
-        current components is performed in segments of length buffer_size
-        samples. While slightly slower, this is useful for long datasets as it
-        reduces the memory requirements by approx. a factor of 3 (assuming
-        buffer_size << data length).
-        Note that this setting has no effect for fixed-orientation inverse
-        operators.
+        If not None, the data are read and the inverse is computed in
+        segments of length buffer_size samples. While slightly slower, this
+        is useful for long datasets as it reduces the memory requirements by
+        approx. a factor of 3 (assuming buffer_size << data length).
+        If ``time_func`` is not None, all data are read at once and only the
+        computation is segmented.
     prepared : bool
         If True, do not call :func:`prepare_inverse_operator`.
     method_params : dict | None
         Additional options for eLORETA. See Notes of :func:`apply_inverse`.
 
         .. versionadded:: 0.16
+    %(n_jobs)s
+        The segments (see ``buffer_size``) are processed in parallel threads.
+
+        .. versionadded:: 0.20
+    fname : str | None
+        If not None, the source time courses are written segment by segment
+        to a memory-mapped ``.npy`` file, so they do not need to fit in
+        memory. The data of the returned source estimate are a memory map of
+        this file, which can also be read in chunks later with
+        ``numpy.load(fname, mmap_mode='r')``.
+
+        .. versionadded:: 0.20
+    %(use_cache_inv)s
     %(verbose)s
 
     Returns
@@ -1007,7 +1104,7 @@ def apply_inverse_raw(raw, inverse_operator, lambda2, method="dSPM",
     #   Set up the inverse according to the parameters
     #
     inv = _check_or_prepare(inverse_operator, nave, lambda2, method,
-                            method_params, prepared)
+                            method_params, prepared, use_cache)
 
     #
     #   Pick the correct channels from the data
@@ -1017,49 +1114,65 @@ def apply_inverse_raw(raw, inverse_operator, lambda2, method="dSPM",
     logger.info('    Picked %d channels from the data' % len(sel))
     logger.info('    Computing inverse...')
 
-    data, times = raw[sel, start:stop]
-
+    start, stop, _ = slice(start, stop).indices(len(raw.times))
+    n_times = max(stop - start, 0)
+    if n_times == 0:
+        raise ValueError('No data in the requested time range')
+    tmin = float(raw.times[start])
     if time_func is not None:
-        data = time_func(data)
+        data = time_func(raw[sel, start:stop][0])
+        n_times = data.shape[1]
+    buffer_size = n_times if buffer_size is None else int(buffer_size)
+    if buffer_size < 1:
+        raise ValueError('buffer_size must be a positive integer, got %s'
+                         % (buffer_size,))
 
     K, noise_norm, vertno, source_nn = _assemble_kernel(inv, label, method,
-                                                        pick_ori)
+                                                        pick_ori, use_cache)
 
     is_free_ori = (inverse_operator['source_ori'] ==
                    FIFF.FIFFV_MNE_FREE_ORI and pick_ori != 'normal')
+    if noise_norm is not None and pick_ori == 'vector' and is_free_ori:
+        noise_norm = noise_norm.repeat(3, axis=0)
 
-    if buffer_size is not None and is_free_ori:
-        # Process the data in segments to conserve memory
-        n_seg = int(np.ceil(data.shape[1] / float(buffer_size)))
-        logger.info('    computing inverse and combining the current '
-                    'components (using %d segments)...' % (n_seg))
-
-        # Allocate space for inverse solution
-        n_times = data.shape[1]
-
-        n_dipoles = K.shape[0] if pick_ori == 'vector' else K.shape[0] // 3
-        sol = np.empty((n_dipoles, n_times), dtype=np.result_type(K, data))
-
-        for pos in range(0, n_times, buffer_size):
-            sol_chunk = np.dot(K, data[:, pos:pos + buffer_size])
-            if pick_ori != 'vector':
-                sol_chunk = combine_xyz(sol_chunk)
-            sol[:, pos:pos + buffer_size] = sol_chunk
-
-            logger.info('        segment %d / %d done..'
-                        % (pos / buffer_size + 1, n_seg))
+    # Allocate space for inverse solution
+    n_dipoles = K.shape[0] // 3 if is_free_ori and pick_ori != 'vector' \
+        else K.shape[0]
+    shape = (n_dipoles, n_times)
+    dtype = np.result_type(K, raw._dtype if time_func is None else data)
+    if fname is None:
+        sol = np.empty(shape, dtype)
     else:
-        sol = np.dot(K, data)
-        if is_free_ori and pick_ori != 'vector':
-            logger.info('    combining the current components...')
-            sol = combine_xyz(sol)
-
-    if noise_norm is not None:
-        if pick_ori == 'vector' and is_free_ori:
-            noise_norm = noise_norm.repeat(3, axis=0)
-        sol *= noise_norm
+        sol = open_memmap(fname, mode='w+', dtype=dtype, shape=shape)
+
+    starts = np.arange(0, n_times, buffer_size)
+    n_seg = len(starts)
+    parallel, p_fun, n_jobs = parallel_func(_apply_kernel_raw, n_jobs,
+                                            prefer='threads')
+    logger.info('    computing inverse%s (using %d segment%s)...'
+                % (' and combining the current components'
+                   if is_free_ori and pick_ori != 'vector' else '',
+                   n_seg, _pl(n_seg)))
+    # read n_jobs segments at a time and process them in parallel
+    for block_start in range(0, n_seg, n_jobs):
+        block = list()
+        for pos in starts[block_start:block_start + n_jobs]:
+            if time_func is None:
+                seg = raw[sel, start + pos:
+                          start + min(pos + buffer_size, n_times)][0]
+            else:
+                seg = data[:, pos:pos + buffer_size]
+            block.append((pos, seg))
+        parallel(p_fun(K, noise_norm, seg, sol, pos, is_free_ori, pick_ori)
+                 for pos, seg in block)
+        if n_seg > 1:
+            logger.info('        segment %d / %d done..'
+                        % (block_start + len(block), n_seg))
+    if fname is not None:
+        sol.flush()
+        del sol
+        sol = np.load(fname, mmap_mode='r+')
 
-    tmin = float(times[0])
     tstep = 1.0 / raw.info['sfreq']
     subject = _subject_from_inverse(inverse_operator)
     src_type = _get_src_type(inverse_operator['src'], vertno)
@@ -1071,21 +1184,54 @@ def apply_inverse_raw(raw, inverse_operator, lambda2, method="dSPM",
     return stc
 
 
+def _apply_kernel_raw(K, noise_norm, data, sol, pos, is_free_ori, pick_ori):
+    """Apply the imaging kernel to a segment of raw data."""
+    sol_seg = np.dot(K, data)
+    if is_free_ori and pick_ori != 'vector':
+        sol_seg = combine_xyz(sol_seg)
+    if noise_norm is not None:
+        sol_seg *= noise_norm
+    sol[:, pos:pos + sol_seg.shape[1]] = sol_seg
+
+
+def _apply_kernel_epochs(block, K, noise_norm, is_free_ori, pick_ori):
+    """Apply an imaging kernel to a block of epochs with one matrix product.
+
+    The epochs are concatenated in time, the kernel is applied once, and the
+    solution is reshaped to (n_epochs, n_sources, n_times).
+    """
+    n_epochs, n_times = len(block), block[0].shape[1]
+    sol = np.dot(K, np.concatenate(block, axis=1))  # apply imaging kernel
+    if is_free_ori:
+        if pick_ori != 'vector':
+            logger.info('combining the current components...')
+            sol = combine_xyz(sol)
+        if noise_norm is not None:
+            sol *= noise_norm
+    sol = sol.reshape(len(sol), n_epochs, n_times).transpose(1, 0, 2)
+    return np.ascontiguousarray(sol)
+
+
 def _apply_inverse_epochs_gen(epochs, inverse_operator, lambda2, method='dSPM',
                               label=None, nave=1, pick_ori=None,
                               prepared=False, method_params=None,
-                              verbose=None):
+                              batch_size=1, return_array=False,
+                              use_cache=True, verbose=None):
     """Generate inverse solutions for epochs. Used in apply_inverse_epochs."""
     _check_option('method', method, INVERSE_METHODS)
     _check_ori(pick_ori, inverse_operator['source_ori'],
                inverse_operator['src'])
     _check_ch_names(inverse_operator, epochs.info)
+    batch_size = int(batch_size)
+    if batch_size < 1:
+        raise ValueError('batch_size must be a positive integer, got %s'
+                         % (batch_size,))
 
     #
     #   Set up the inverse according to the parameters
     #
     inv = _check_or_prepare(inverse_operator, nave, lambda2, method,
-                            method_params, prepared)
+                            method_params, prepared, use_cache)
 
     #
     #   Pick the correct channels from the data
@@ -1094,7 +1240,7 @@ def _apply_inverse_epochs_gen(epochs, inverse_operator, lambda2, method='dSPM',
     logger.info('Picked %d channels from the data' % len(sel))
     logger.info('Computing inverse...')
     K, noise_norm, vertno, source_nn = _assemble_kernel(inv, label, method,
-                                                        pick_ori)
+                                                        pick_ori, use_cache)
 
     tstep = 1.0 / epochs.info['sfreq']
     tmin = epochs.times[0]
@@ -1106,39 +1252,45 @@ def _apply_inverse_epochs_gen(epochs, inverse_operator, lambda2, method='dSPM',
         noise_norm = noise_norm.repeat(3, axis=0)
 
     if not is_free_ori and noise_norm is not None:
-        # premultiply kernel with noise normalization
-        K *= noise_norm
+        # premultiply kernel with noise normalization (a cached kernel is
+        # read-only)
+        K = K * noise_norm
 
+    # Linear inverse with fewer channels than sources: delay the computation
+    delayed = not (is_free_ori or return_array) and len(sel) < K.shape[1]
+    vector = (pick_ori == 'vector')
     subject = _subject_from_inverse(inverse_operator)
+    src_type = _get_src_type(inverse_operator['src'], vertno)
+
+    def _out(sol):
+        if return_array:
+            if vector:
+                sol = sol.reshape(len(sol) // 3, 3, sol.shape[-1])
+            return sol
+        return _make_stc(sol, vertno, tmin=tmin, tstep=tstep,
+                         subject=subject, vector=vector, source_nn=source_nn,
+                         src_type=src_type)
+
     try:
         total = ' / %d' % (len(epochs),)  # len not always defined
     except RuntimeError:
         total = ' / %d (at most)' % (len(epochs.events),)
+    block = list()
     for k, e in enumerate(epochs):
         logger.info('Processing epoch : %d%s' % (k + 1, total))
-        if is_free_ori:
-            # Compute solution and combine current components (non-linear)
-            sol = np.dot(K, e[sel])  # apply imaging kernel
-
-            if pick_ori != 'vector':
-                logger.info('combining the current components...')
-                sol = combine_xyz(sol)
-
-            if noise_norm is not None:
-                sol *= noise_norm
-        else:
-            # Linear inverse: do computation here or delayed
-            if len(sel) < K.shape[1]:
-                sol = (K, e[sel])
-            else:
-                sol = np.dot(K, e[sel])
-
-        src_type = _get_src_type(inverse_operator['src'], vertno)
-        stc = _make_stc(sol, vertno, tmin=tmin, tstep=tstep, subject=subject,
-                        vector=(pick_ori == 'vector'), source_nn=source_nn,
-                        src_type=src_type)
-
-        yield stc
+        if delayed:  # batch_size has no effect
+            yield _out((K, e[sel]))
+            continue
+        block.append(e[sel])
+        if len(block) == batch_size:
+            for sol in _apply_kernel_epochs(block, K, noise_norm,
+                                            is_free_ori, pick_ori):
+                yield _out(sol)
+            block = list()
+    if len(block) > 0:
+        for sol in _apply_kernel_epochs(block, K, noise_norm, is_free_ori,
+                                        pick_ori):
+            yield _out(sol)
 
     logger.info('[done]')
 
@@ -1147,7 +1299,8 @@ def _apply_inverse_epochs_gen(epochs, inverse_operator, lambda2, method='dSPM',
 def apply_inverse_epochs(epochs, inverse_operator, lambda2, method="dSPM",
                          label=None, nave=1, pick_ori=None,
                          return_generator=False, prepared=False,
-                         method_params=None, verbose=None):
+                         method_params=None, batch_size=1, return_array=False,
+                         use_cache=True, verbose=None):
     """Apply inverse operator to Epochs.
 
     Parameters
@@ -1183,12 +1336,32 @@ def apply_inverse_epochs(epochs, inverse_operator, lambda2, method="dSPM",
         Additional options for eLORETA. See Notes of :func:`apply_inverse`.
 
         .. versionadded:: 0.16
+    batch_size : int
+        Number of epochs that are concatenated in time so that the imaging
+        kernel is applied to all of them with a single matrix product.
+        Larger values are faster but use more memory. Defaults to 1.
+        It has no effect for fixed orientations (or ``pick_ori='normal'``)
+        with fewer channels than sources and ``return_array=False``, as
+        the source estimates then store the kernel and the sensor data and
+        no product is computed.
+
+        .. versionadded:: 0.20
+    return_array : bool
+        If True, return the source time courses as arrays instead of source
+        estimates. Unless ``return_generator=True``, the arrays of all epochs
+        are stacked into a single array of shape
+        ``(n_epochs, n_sources, n_times)`` (or
+        ``(n_epochs, n_sources, 3, n_times)`` if ``pick_ori='vector'``).
+
+        .. versionadded:: 0.20
+    %(use_cache_inv)s
     %(verbose)s
 
     Returns
     -------
     stc : list of (SourceEstimate | VectorSourceEstimate | VolSourceEstimate)
-        The source estimates for all epochs.
+        The source estimates for all epochs (an array if
+        ``return_array=True``).
 
     See Also
     --------
@@ -1198,15 +1371,205 @@ def apply_inverse_epochs(epochs, inverse_operator, lambda2, method="dSPM",
     stcs = _apply_inverse_epochs_gen(
         epochs, inverse_operator, lambda2, method=method, label=label,
         nave=nave, pick_ori=pick_ori, verbose=verbose, prepared=prepared,
-        method_params=method_params)
+        method_params=method_params, batch_size=batch_size,
+        return_array=return_array, use_cache=use_cache)
 
     if not return_generator:
         # return a list
         stcs = [stc for stc in stcs]
+        if return_array:
+            stcs = np.array(stcs)
 
     return stcs
 
 
+def _prepare_label_kernels(inv, labels, method, mode, pick_ori, allow_empty,
+                           use_cache=False):
+    """Combine the rows of the inverse kernel within each label."""
+    from ..source_estimate import _label_funcs, _prepare_label_extraction
+    K, noise_norm, vertno, _ = _assemble_kernel(inv, None, method, pick_ori,
+                                                use_cache)
+    src = inv['src']
+    is_free_ori = not (is_fixed_orient(inv) or pick_ori == 'normal')
+    if not is_free_ori and noise_norm is not None:
+        # premultiply kernel with noise normalization (a cached kernel is
+        # read-only)
+        K = K * noise_norm
+        noise_norm = None
+
+    label_vertidx, label_flip = _prepare_label_extraction(
+        vertno, labels, src, mode, allow_empty)
+    modes = [mode] * len(labels)
+    # the volume source spaces of a mixed source space are averaged
+    offset = sum(len(v) for v in vertno[:2])
+    for v in vertno[2:]:
+        label_vertidx.append(np.arange(offset, offset + len(v))
+                             if len(v) > 0 else None)
+        label_flip.append(None)
+        modes.append('mean')
+        offset += len(v)
+
+    linear_idx, linear_kernel, other = list(), list(), list()
+    for ii, (vertidx, flip, this_mode) in enumerate(zip(
+            label_vertidx, label_flip, modes)):
+        if vertidx is None:
+            continue
+        func = _label_funcs[this_mode]
+        if is_free_ori:
+            # the combination of the current components is not linear, so
+            # compute the time courses of the vertices in the label
+            rows = (3 * vertidx[:, np.newaxis] + np.arange(3)).ravel()
+            this_norm = None if noise_norm is None else noise_norm[vertidx]
+            other.append((ii, func, flip, K[rows], this_norm, True))
+        elif this_mode in ('mean', 'mean_flip'):
+            # linear modes reduce to a single row of the kernel
+            linear_idx.append(ii)
+            linear_kernel.append(func(flip, K[vertidx]))
+        elif this_mode == 'pca_flip':
+            # with K_l = Q R, the SVD of the label time courses K_l X can be
+            # obtained from the much smaller R X
+            Q, R = linalg.qr(K[vertidx], mode='economic')
+            scale = np.sqrt(len(R) / float(len(vertidx)))
+            other.append((ii, func, np.dot(Q.T, flip), R, scale, False))
+        else:
+            other.append((ii, func, flip, K[vertidx], None, False))
+    linear_kernel = (np.array(linear_kernel) if len(linear_kernel) > 0 else
+                     np.zeros((0, K.shape[1])))
+    return len(label_vertidx), np.array(linear_idx, int), linear_kernel, other
+
+
+def _apply_label_kernels(label_kernels, data):
+    """Compute label time courses from sensor data."""
+    n_labels, linear_idx, linear_kernel, other = label_kernels
+    label_tc = np.zeros((n_labels, data.shape[1]))
+    label_tc[linear_idx] = np.dot(linear_kernel, data)
+    for ii, func, flip, kernel, norm, is_free_ori in other:
+        sol = np.dot(kernel, data)
+        if is_free_ori:
+            sol = combine_xyz(sol)
+            if norm is not None:
+                sol *= norm
+            label_tc[ii] = func(flip, sol)
+        elif norm is not None:
+            label_tc[ii] = norm * func(flip, sol)
+        else:
+            label_tc[ii] = func(flip, sol)
+    return label_tc
+
+
+@verbose
+def apply_inverse_labels(inst, inverse_operator, labels, lambda2=1. / 9.,
+                         method='dSPM', mode='mean_flip', pick_ori=None,
+                         prepared=False, method_params=None,
+                         allow_empty=False, return_generator=False,
+                         use_cache=True, verbose=None):
+    """Compute label time courses directly from sensor data.
+
+    This gives the same result as :func:`extract_label_time_course` applied
+    to the output of :func:`apply_inverse`, :func:`apply_inverse_raw` or
+    :func:`apply_inverse_epochs`, but the inverse kernel is combined within
+    each label once, so the source estimates are never computed.
+
+    Parameters
+    ----------
+    inst : instance of Raw | Epochs | Evoked
+        The data. For Evoked data, ``nave`` is taken from the instance,
+        otherwise ``nave=1`` is used.
+    inverse_operator : instance of InverseOperator
+        Inverse operator.
+    labels : Label | BiHemiLabel | list of Label or BiHemiLabel
+        The labels for which to extract the time courses.
+    lambda2 : float
+        The regularization parameter.
+    method : "MNE" | "dSPM" | "sLORETA" | "eLORETA"
+        Use minimum norm, dSPM (default), sLORETA, or eLORETA.
+    mode : str
+        Extraction mode, see :func:`extract_label_time_course`.
+    pick_ori : None | "normal"
+        If "normal", only the radial component of a free or loose
+        orientation inverse is used. With free orientations and
+        ``pick_ori=None``, the time courses of the vertices within each label
+        are computed, as pooling the orientations is not linear.
+    prepared : bool
+        If True, do not call :func:`prepare_inverse_operator`.
+    method_params : dict | None
+        Additional options for eLORETA. See Notes of :func:`apply_inverse`.
+    allow_empty : bool
+        Instead of emitting an error, return all-zero time courses for labels
+        that do not have any vertices in the source space.
+    return_generator : bool
+        For Epochs, return a generator instead of a list.
+    %(use_cache_inv)s
+    %(verbose)s
+
+    Returns
+    -------
+    label_tc : array, shape (n_labels, n_times) | list (or generator) of array
+        The label time courses (one array per epoch for Epochs).
+
+    See Also
+    --------
+    extract_label_time_course
+    apply_inverse_epochs
+
+    Notes
+    -----
+    With fixed orientations (or ``pick_ori='normal'``), the ``'mean'`` and
+    ``'mean_flip'`` modes reduce to a single row of the kernel per label and
+    ``'pca_flip'`` is computed from a QR decomposition of the kernel rows of
+    each label, so the cost scales with the number of channels instead of
+    the number of vertices.
+
+    .. versionadded:: 0.20
+    """
+    from ..epochs import BaseEpochs
+    from ..evoked import Evoked
+    from ..io import BaseRaw
+    from ..source_estimate import _label_funcs
+    _validate_type(inst, (BaseRaw, BaseEpochs, Evoked), 'inst',
+                   'Raw, Epochs, or Evoked')
+    _check_option('method', method, INVERSE_METHODS)
+    _check_option('mode', mode, sorted(_label_funcs.keys()))
+    _check_option('pick_ori', pick_ori, [None, 'normal'])
+    _check_ori(pick_ori, inverse_operator['source_ori'],
+               inverse_operator['src'])
+    _check_reference(inst, inverse_operator['info']['ch_names'])
+    _check_ch_names(inverse_operator, inst.info)
+    if not isinstance(labels, list):
+        labels = [labels]
+
+    nave = inst.nave if isinstance(inst, Evoked) else 1
+    inv = _check_or_prepare(inverse_operator, nave, lambda2, method,
+                            method_params, prepared, use_cache)
+    sel = _pick_channels_inverse_operator(inst.ch_names, inv)
+    logger.info('Picked %d channels from the data' % len(sel))
+    logger.info('Combining the inverse kernel within %d labels (mode: %s)...'
+                % (len(labels), mode))
+    label_kernels = _prepare_label_kernels(inv, labels, method, mode,
+                                           pick_ori, allow_empty, use_cache)
+
+    if isinstance(inst, BaseEpochs):
+        label_tc = (_apply_label_kernels(label_kernels, e[sel])
+                    for e in inst)
+        if not return_generator:
+            label_tc = list(label_tc)
+    elif isinstance(inst, Evoked):
+        label_tc = _apply_label_kernels(label_kernels, inst.data[sel])
+    else:
+        # pca_flip needs all time points at once, the other modes can be
+        # computed in buffers
+        n_times = len(inst.times)
+        buffer_size = n_times if mode == 'pca_flip' else \
+            inst._get_buffer_size()
+        label_tc = np.empty((label_kernels[0], n_times))
+        for start in range(0, n_times, buffer_size):
+            stop = min(start + buffer_size, n_times)
+            label_tc[:, start:stop] = _apply_label_kernels(
+                label_kernels, inst[sel, start:stop][0])
+    logger.info('[done]')
+    return label_tc
+
+
 # XXX what is this???
 '''
 def _xyz2lf(Lf_xyz, normals):
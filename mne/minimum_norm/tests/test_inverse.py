@@ -30,7 +30,8 @@ from mne.minimum_norm.inverse import (apply_inverse, read_inverse_operator,
                                       make_inverse_operator,
                                       write_inverse_operator,
                                       compute_rank_inverse,
-                                      prepare_inverse_operator)
+                                      prepare_inverse_operator,
+                                      apply_inverse_labels, _assemble_kernel)
 from mne.utils import _TempDir, run_tests_if_main, catch_logging
 
 test_path = testing.data_path(download=False)
@@ -364,6 +365,37 @@ def test_localization_bias_free(bias_params_free, method, lower, upper,
     assert lower <= perc <= upper, method
 
 
+@pytest.mark.parametrize('force_equal', (False, True))
+def test_eloreta_warm_start(bias_params_free, force_equal):
+    """Test warm-starting the eLORETA weights."""
+    evoked, fwd, noise_cov, _, _ = bias_params_free
+    inv = make_inverse_operator(evoked.info, fwd, noise_cov, loose=1.)
+    method_params = dict(force_equal=force_equal, eps=1e-8, max_iter=50)
+    inv_1 = prepare_inverse_operator(inv, 1, 1. / 4., 'eLORETA',
+                                     method_params)
+    weights = inv_1['eloreta_weights']
+    n_src = inv['nsource']
+    assert weights.shape == ((n_src,) if force_equal else (n_src, 3, 3))
+    with catch_logging() as log:
+        inv_2 = prepare_inverse_operator(inv, 1, lambda2, 'eLORETA',
+                                         method_params, verbose=True)
+    n_iter = int(re.search('Converged on iteration ([0-9]+)',
+                           log.getvalue()).group(1))
+    with catch_logging() as log:
+        inv_3 = prepare_inverse_operator(
+            inv, 1, lambda2, 'eLORETA', dict(method_params, init=weights),
+            verbose=True)
+    log = log.getvalue()
+    assert 'Using the provided initial weights' in log
+    assert int(re.search('Converged on iteration ([0-9]+)',
+                         log).group(1)) < n_iter
+    assert_allclose(inv_3['eloreta_weights'], inv_2['eloreta_weights'],
+                    rtol=1e-5)
+    with pytest.raises(ValueError, match='init weights must have shape'):
+        prepare_inverse_operator(inv, 1, lambda2, 'eLORETA',
+                                 dict(init=weights[:-1]))
+
+
 def test_apply_inverse_sphere(evoked):
     """Test applying an inverse with a sphere model (rank-deficient)."""
     evoked.pick_channels(evoked.ch_names[:306:8])
@@ -676,6 +708,52 @@ def test_inverse_operator_volume(evoked):
         apply_inverse(evoked, inv_vol, pick_ori='normal')
 
 
+@testing.requires_testing_data
+def test_inverse_operator_cache(evoked):
+    """Test caching of prepared inverse operators and kernels."""
+    inv = read_inverse_operator(fname_inv)
+    want = apply_inverse(evoked, inv.copy(), lambda2, 'dSPM').data
+    assert len(inv._prepared_cache) == 0
+    stc = apply_inverse(evoked, inv, lambda2, 'dSPM')
+    assert_allclose(stc.data, want)
+    assert len(inv._prepared_cache) == 1
+    with catch_logging() as log:
+        stc = apply_inverse(evoked, inv, lambda2, 'dSPM', verbose=True)
+    log = log.getvalue()
+    assert 'cached prepared inverse operator' in log
+    assert 'cached kernel' in log
+    assert_allclose(stc.data, want)
+    # the cache is bounded
+    for this_lambda2 in (1., 2., 3.):
+        apply_inverse(evoked, inv, this_lambda2, 'MNE')
+    assert len(inv._prepared_cache) == 2
+    assert all(key[2] == 'MNE' for key in inv._prepared_cache)
+    assert len(inv.copy()._prepared_cache) == 0
+    # cached kernels are shared and read-only
+    prepared = next(iter(inv._prepared_cache.values()))
+    K = next(iter(prepared._kernel_cache.values()))[0]
+    assert not K.flags.writeable
+    K_2 = _assemble_kernel(prepared, None, 'MNE', None, use_cache=True)[0]
+    assert K_2 is K
+    # the cache can be disabled
+    inv = read_inverse_operator(fname_inv)
+    stc = apply_inverse(evoked, inv, lambda2, 'dSPM', use_cache=False)
+    assert_allclose(stc.data, want)
+    assert len(inv._prepared_cache) == 0
+    epochs = mne.EpochsArray(evoked.data[np.newaxis], evoked.info)
+    stcs = apply_inverse_epochs(epochs, inv, lambda2, 'dSPM', nave=evoked.nave,
+                                pick_ori='normal', use_cache=False)
+    assert len(inv._prepared_cache) == 0
+    stc = apply_inverse(evoked, inv, lambda2, 'dSPM', pick_ori='normal')
+    assert_allclose(stcs[0].data, stc.data)
+    assert len(inv._prepared_cache) == 1
+    # the read-only cached kernel is not modified by the epochs path
+    for _ in range(2):
+        stcs = apply_inverse_epochs(epochs, inv, lambda2, 'dSPM',
+                                    nave=evoked.nave, pick_ori='normal')
+        assert_allclose(stcs[0].data, stc.data)
+
+
 @pytest.mark.slowtest
 @testing.requires_testing_data
 def test_io_inverse_operator():
@@ -709,7 +787,7 @@ def test_io_inverse_operator():
 
 
 @testing.requires_testing_data
-def test_apply_mne_inverse_raw():
+def test_apply_mne_inverse_raw(tmpdir):
     """Test MNE with precomputed inverse operator on Raw."""
     start = 3
     stop = 10
@@ -742,6 +820,17 @@ def test_apply_mne_inverse_raw():
         assert_array_almost_equal(stc2.times, times)
         assert_array_almost_equal(stc.data, stc2.data)
 
+        # parallel segments written to disk
+        fname = str(tmpdir.join('stc.npy'))
+        stc3 = apply_inverse_raw(raw, inverse_operator, lambda2, "dSPM",
+                                 label=label_lh, start=start, stop=stop,
+                                 nave=1, pick_ori=pick_ori, buffer_size=2,
+                                 prepared=True, n_jobs=2, fname=fname)
+        assert_array_almost_equal(stc3.times, times)
+        assert_allclose(stc3.data, stc.data)
+        assert_allclose(np.load(fname, mmap_mode='r'),
+                        stc.data.reshape(-1, len(stc.times)))
+
 
 @testing.requires_testing_data
 def test_apply_mne_inverse_fixed_raw():
@@ -856,6 +945,80 @@ def test_apply_mne_inverse_epochs():
     assert_array_almost_equal(stcs_rh[0].data, label_stc.data)
 
 
+@testing.requires_testing_data
+@pytest.mark.parametrize('pick_ori', [None, 'normal'])
+def test_apply_inverse_labels(pick_ori):
+    """Test label time courses computed from the inverse kernel."""
+    inverse_operator = read_inverse_operator(fname_full)
+    labels = [read_label(fname_label % 'Aud-lh'),
+              read_label(fname_label % 'Aud-rh')]
+    raw = read_raw_fif(fname_raw)
+    events = read_events(fname_event)[:15]
+    epochs = Epochs(raw, events, 1, -0.2, 0.5, baseline=(None, 0))
+    evoked = epochs.average()
+    kwargs = dict(lambda2=lambda2, method='dSPM', pick_ori=pick_ori)
+    src = inverse_operator['src']
+    for mode in ('mean', 'mean_flip', 'pca_flip', 'max'):
+        stcs = apply_inverse_epochs(epochs, inverse_operator, **kwargs)
+        want = mne.extract_label_time_course(stcs, labels, src, mode=mode)
+        got = apply_inverse_labels(epochs, inverse_operator, labels,
+                                   mode=mode, **kwargs)
+        assert len(got) == len(want)
+        for tc, tc_want in zip(got, want):
+            assert tc.shape == (len(labels), len(epochs.times))
+            assert_allclose(tc, tc_want, rtol=1e-7, atol=1e-10)
+        stc = apply_inverse(evoked, inverse_operator, **kwargs)
+        assert_allclose(
+            apply_inverse_labels(evoked, inverse_operator, labels, mode=mode,
+                                 **kwargs),
+            stc.extract_label_time_course(labels, src, mode=mode),
+            rtol=1e-7, atol=1e-10)
+    raw.crop(0, 2)
+    stc = apply_inverse_raw(raw, inverse_operator, **kwargs)
+    assert_allclose(
+        apply_inverse_labels(raw, inverse_operator, labels, **kwargs),
+        stc.extract_label_time_course(labels, src), rtol=1e-7, atol=1e-10)
+    with pytest.raises(ValueError, match='Invalid value'):
+        apply_inverse_labels(evoked, inverse_operator, labels,
+                             pick_ori='vector')
+
+
+@pytest.mark.parametrize('pick_ori', [None, 'vector'])
+def test_apply_inverse_epochs_batch(evoked, pick_ori):
+    """Test applying an inverse to blocks of epochs."""
+    evoked.pick_types(meg=True, eeg=False)
+    evoked.pick_channels(evoked.ch_names[::8])
+    evoked.info['projs'] = []
+    sphere = make_sphere_model('auto', 'auto', evoked.info)
+    src = mne.setup_volume_source_space(pos=30., sphere=sphere)
+    fwd = make_forward_solution(evoked.info, None, src, sphere)
+    inv = make_inverse_operator(evoked.info, fwd,
+                                make_ad_hoc_cov(evoked.info), loose=1.)
+    rng = np.random.RandomState(0)
+    epochs = mne.EpochsArray(
+        rng.randn(5, len(evoked.ch_names), len(evoked.times)) * 1e-12,
+        evoked.info)
+    kwargs = dict(lambda2=lambda2, method='dSPM', pick_ori=pick_ori)
+    stcs = apply_inverse_epochs(epochs, inv, **kwargs)
+    want = np.array([stc.data for stc in stcs])
+    for batch_size in (2, 5, 10):
+        stcs_batch = apply_inverse_epochs(epochs, inv, batch_size=batch_size,
+                                          **kwargs)
+        assert len(stcs_batch) == len(stcs)
+        for stc, stc_batch in zip(stcs, stcs_batch):
+            assert type(stc_batch) is type(stc)
+            assert_allclose(stc_batch.data, stc.data, rtol=1e-10)
+        data = apply_inverse_epochs(epochs, inv, batch_size=batch_size,
+                                    return_array=True, **kwargs)
+        assert isinstance(data, np.ndarray)
+        assert_allclose(data, want, rtol=1e-10)
+    gen = apply_inverse_epochs(epochs, inv, batch_size=2, return_array=True,
+                               return_generator=True, **kwargs)
+    assert_allclose(np.array(list(gen)), want, rtol=1e-10)
+    with pytest.raises(ValueError, match='positive integer'):
+        apply_inverse_epochs(epochs, inv, batch_size=0, **kwargs)
+
+
 def test_make_inverse_operator_bads(evoked, noise_cov):
     """Test MNE inverse computation given a mismatch of bad channels."""
     fwd_op = read_forward_solution_meg(fname_fwd, surf_ori=True)
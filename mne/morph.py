@@ -19,7 +19,7 @@ from .source_space import SourceSpaces, _ensure_src
 from .surface import read_morph_map, mesh_edges, read_surface, _compute_nearest
 from .utils import (logger, verbose, check_version, get_subjects_dir,
                     warn as warn_, fill_doc, _check_option, _validate_type,
-                    BunchConst, wrapped_stdout, _check_fname)
+                    BunchConst, wrapped_stdout, _check_fname, _pl)
 from .externals.h5io import read_hdf5, write_hdf5
 
 
@@ -28,7 +28,8 @@ def compute_source_morph(src, subject_from=None, subject_to='fsaverage',
                          subjects_dir=None, zooms='auto',
                          niter_affine=(100, 100, 10), niter_sdr=(5, 5, 3),
                          spacing=5, smooth=None, warn=True, xhemi=False,
-                         sparse=False, src_to=None, verbose=False):
+                         sparse=False, src_to=None, precompute=False,
+                         n_jobs=1, verbose=False):
     """Create a SourceMorph from one subject to another.
 
     Method is based on spherical morphing by FreeSurfer for surface
@@ -98,6 +99,21 @@ def compute_source_morph(src, subject_from=None, subject_to='fsaverage',
         from multiple subjects morphed to the same destination subject/source
         space have the vertices.
 
+        .. versionadded:: 0.20
+    precompute : bool
+        If True (default False), compute the sparse matrix that maps the
+        volume source space of ``subject_from`` onto the destination
+        vertices, see :meth:`SourceMorph.compute_vol_morph_mat`. This takes
+        about as long as morphing 128 time points but makes
+        :meth:`SourceMorph.apply` a single sparse matrix product, which pays
+        off when many volume source estimates are morphed. Only used for
+        volume source spaces.
+
+        .. versionadded:: 0.20
+    %(n_jobs)s
+        Used to compute surface vertices and morph maps, and the volumetric
+        morph matrix if ``precompute=True``.
+
         .. versionadded:: 0.20
     %(verbose)s
 
@@ -213,30 +229,33 @@ def compute_source_morph(src, subject_from=None, subject_to='fsaverage',
                 raise ValueError('xhemi=True can only be used with '
                                  'sparse=False')
             vertices_to, morph_mat = _compute_sparse_morph(
-                vertices_from, subject_from, subject_to, subjects_dir)
+                vertices_from, subject_from, subject_to, subjects_dir, n_jobs)
         else:
             vertices_to = grade_to_vertices(
-                subject_to, spacing, subjects_dir, 1)
+                subject_to, spacing, subjects_dir, n_jobs)
             morph_mat = _compute_morph_matrix(
                 subject_from=subject_from, subject_to=subject_to,
                 vertices_from=vertices_from, vertices_to=vertices_to,
                 subjects_dir=subjects_dir, smooth=smooth, warn=warn,
-                xhemi=xhemi)
+                xhemi=xhemi, n_jobs=n_jobs)
             n_verts = sum(len(v) for v in vertices_to)
             assert morph_mat.shape[0] == n_verts
 
     morph = SourceMorph(subject_from, subject_to, kind, zooms,
                         niter_affine, niter_sdr, spacing, smooth, xhemi,
                         morph_mat, vertices_to, shape, affine,
-                        pre_affine, sdr_morph, src_data)
+                        pre_affine, sdr_morph, src_data, None)
+    if precompute:
+        morph.compute_vol_morph_mat(n_jobs=n_jobs)
     logger.info('[done]')
     return morph
 
 
 def _compute_sparse_morph(vertices_from, subject_from, subject_to,
-                          subjects_dir=None):
+                          subjects_dir=None, n_jobs=1):
     """Get nearest vertices from one subject to another."""
-    maps = read_morph_map(subject_to, subject_from, subjects_dir)
+    maps = read_morph_map(subject_to, subject_from, subjects_dir,
+                          n_jobs=n_jobs)
     cnt = 0
     vertices = list()
     cols = list()
@@ -257,7 +276,8 @@ def _compute_sparse_morph(vertices_from, subject_from, subject_to,
 _SOURCE_MORPH_ATTRIBUTES = [  # used in writing
     'subject_from', 'subject_to', 'kind', 'zooms', 'niter_affine', 'niter_sdr',
     'spacing', 'smooth', 'xhemi', 'morph_mat', 'vertices_to',
-    'shape', 'affine', 'pre_affine', 'sdr_morph', 'src_data', 'verbose']
+    'shape', 'affine', 'pre_affine', 'sdr_morph', 'src_data', 'vol_morph_mat',
+    'verbose']
 
 
 @fill_doc
@@ -316,6 +336,11 @@ class SourceMorph(object):
         the symmetric diffeomorphic registration (SDR) morph.
     src_data : dict
         Additional source data necessary to perform morphing.
+    vol_morph_mat : scipy.sparse.csr_matrix | None
+        The precomputed sparse volumetric morphing matrix, see
+        :meth:`compute_vol_morph_mat`.
+
+        .. versionadded:: 0.20
     %(verbose)s
 
     References
@@ -333,7 +358,8 @@ class SourceMorph(object):
     def __init__(self, subject_from, subject_to, kind, zooms,
                  niter_affine, niter_sdr, spacing, smooth, xhemi,
                  morph_mat, vertices_to, shape,
-                 affine, pre_affine, sdr_morph, src_data, verbose=None):
+                 affine, pre_affine, sdr_morph, src_data, vol_morph_mat=None,
+                 verbose=None):
         # universal
         self.subject_from = subject_from
         self.subject_to = subject_to
@@ -353,6 +379,7 @@ class SourceMorph(object):
         self.affine = affine
         self.sdr_morph = sdr_morph
         self.pre_affine = pre_affine
+        self.vol_morph_mat = vol_morph_mat
         # used by both
         self.src_data = src_data
         self.verbose = verbose
@@ -369,6 +396,68 @@ class SourceMorph(object):
                                      vertices_from, tmin=0., tstep=1.)
         return np.where(self._morph_one_vol(stc_ones))[0]
 
+    @verbose
+    def compute_vol_morph_mat(self, n_jobs=1, verbose=None):
+        """Compute the sparse matrix for volumetric morphing.
+
+        The volume pipeline (interpolation to the MRI, reslicing, affine and
+        SDR warps, and selection of the destination grid) is linear, so it
+        can be baked into a single sparse matrix by morphing unit impulses
+        at the source vertices. Afterward, :meth:`apply` reduces to a sparse
+        matrix product. The matrix is stored as ``vol_morph_mat`` and is
+        saved along with the morph by :meth:`save`.
+
+        Parameters
+        ----------
+        %(n_jobs)s
+        %(verbose_meth)s
+
+        Returns
+        -------
+        morph : instance of SourceMorph
+            The instance (modified in-place).
+
+        Notes
+        -----
+        Impulses at vertices that are far apart on the source grid (every
+        fourth grid point along each axis) do not overlap once morphed, so
+        they are morphed together in two volume morphs and told apart by
+        the connected components of the result. This takes about 128
+        volume morphs, spread over ``n_jobs``, instead of one per source
+        vertex. Batches whose morphed impulses do overlap are split until
+        they do not.
+
+        .. versionadded:: 0.20
+        """
+        if self.kind != 'volume':
+            raise ValueError('A volumetric morph matrix can only be computed '
+                             'for volume morphs, got kind=%r' % (self.kind,))
+        if self.vol_morph_mat is not None:
+            return self
+        vertices_from = np.where(self.src_data['inuse'])[0]
+        n_from, n_to = len(vertices_from), len(self.vertices_to)
+        # batches of vertices that are _VOL_MORPH_STRIDE grid points apart
+        ijk = np.array(np.unravel_index(
+            vertices_from, self.src_data['src_shape'][::-1], order='F'))
+        keys = np.ravel_multi_index(tuple(ijk % _VOL_MORPH_STRIDE),
+                                    (_VOL_MORPH_STRIDE,) * 3)
+        batches = [np.where(keys == key)[0] for key in np.unique(keys)]
+        logger.info('Computing sparse volumetric morph matrix (%d -> %d '
+                    'vertices) in %d batches ...'
+                    % (n_from, n_to, len(batches)))
+        parallel, p_fun, n_jobs = parallel_func(_vol_morph_mat_entries,
+                                                n_jobs)
+        out = parallel(p_fun(self, vertices_from, batches[ii::n_jobs])
+                       for ii in range(max(min(n_jobs, len(batches)), 1)))
+        rows, cols, vals = [np.concatenate([o[ii] for o in out])
+                            for ii in range(3)]
+        self.vol_morph_mat = sparse.csr_matrix(
+            (vals, (rows, cols)), shape=(n_to, n_from))
+        logger.info('    %d nonzero entries (%0.2f%% dense)'
+                    % (self.vol_morph_mat.nnz,
+                       100. * self.vol_morph_mat.nnz / max(n_to * n_from, 1)))
+        return self
+
     @verbose
     def apply(self, stc_from, output='stc', mri_resolution=False,
               mri_space=None, verbose=None):
@@ -398,7 +487,7 @@ class SourceMorph(object):
         """  # noqa: E501
         _validate_type(stc_from, _BaseSourceEstimate, 'stc_from',
                        'SourceEstimate or VolSourceEstimate')
-        stc = copy.deepcopy(stc_from)
+        stc = stc_from.copy()
 
         mri_space = mri_resolution if mri_space is None else mri_space
         if stc.subject is None:
@@ -419,7 +508,119 @@ class SourceMorph(object):
                 output=output)
         return out
 
-    def _morph_one_vol(self, stc_one):
+    @verbose
+    def apply_batch(self, stcs, batch_size=50, verbose=None):
+        """Morph many source estimates at once.
+
+        The data of up to ``batch_size`` source estimates are concatenated
+        in time and morphed with a single sparse matrix product, which avoids
+        the per-estimate overhead of :meth:`apply`.
+
+        Parameters
+        ----------
+        stcs : list | generator | ndarray, shape (n_stcs, n_vertices, n_times)
+            The source estimates to morph, e.g. as returned by
+            :func:`mne.minimum_norm.apply_inverse_epochs`. Can also be an
+            array of data defined on the vertices the morph expects.
+        batch_size : int
+            The number of source estimates to morph in one matrix product.
+        %(verbose_meth)s
+
+        Returns
+        -------
+        stcs_to : list | generator | ndarray, shape (n_stcs, n_vertices_to, n_times)
+            The morphed source estimates. A list is returned for a list input,
+            a generator for a generator input, and an array for an array
+            input.
+
+        Notes
+        -----
+        Volume source estimates are only morphed in batches when the sparse
+        volumetric morph matrix has been computed (see
+        :meth:`compute_vol_morph_mat`). Otherwise, and for source estimates
+        stored as kernel and sensor data, the estimates are morphed one by
+        one as in :meth:`apply`.
+
+        .. versionadded:: 0.20
+        """  # noqa: E501
+        if not isinstance(batch_size, (int, np.integer)) or batch_size < 1:
+            raise ValueError('batch_size must be a positive integer, got %r'
+                             % (batch_size,))
+        if isinstance(stcs, np.ndarray):
+            if stcs.ndim != 3:
+                raise ValueError('stcs must be 3D when an array, got shape %s'
+                                 % (stcs.shape,))
+            if self.kind == 'volume':
+                vertices = np.where(self.src_data['inuse'])[0]
+                klass = VolSourceEstimate
+            else:
+                vertices = self.src_data['vertices_from']
+                klass = SourceEstimate
+            n_vertices = sum(len(v) for v in vertices) \
+                if self.kind == 'surface' else len(vertices)
+            if stcs.shape[1] != n_vertices:
+                raise ValueError('stcs.shape[1] (%d) must match the number of '
+                                 'vertices of the morph (%d)'
+                                 % (stcs.shape[1], n_vertices))
+            gen = (klass(data, vertices, 0., 1., self.subject_from)
+                   for data in stcs)
+            return np.array([stc.data for stc in
+                             self._apply_batch_gen(gen, batch_size)])
+        out = self._apply_batch_gen(stcs, batch_size)
+        if isinstance(stcs, (list, tuple)):
+            out = list(out)
+        return out
+
+    def _apply_batch_gen(self, stcs, batch_size):
+        morph_mat = (self.vol_morph_mat if self.kind == 'volume'
+                     else self.morph_mat)
+        block = list()
+        n_stcs = 0
+        for stc in stcs:
+            _validate_type(stc, _BaseSourceEstimate, 'stc',
+                           'SourceEstimate or VolSourceEstimate')
+            n_stcs += 1
+            # only full-data estimates benefit from concatenation
+            if morph_mat is None or stc._kernel is not None:
+                for stc_to in self._morph_block(block, morph_mat):
+                    yield stc_to
+                block = list()
+                yield self.apply(stc)
+                continue
+            block.append(stc)
+            if len(block) == batch_size:
+                for stc_to in self._morph_block(block, morph_mat):
+                    yield stc_to
+                block = list()
+        for stc_to in self._morph_block(block, morph_mat):
+            yield stc_to
+        logger.info('Morphed %d source estimate%s' % (n_stcs, _pl(n_stcs)))
+
+    def _morph_block(self, block, morph_mat):
+        """Morph a list of source estimates with one matrix product."""
+        if len(block) == 0:
+            return list()
+        klasses = [_check_morph_input(self, stc) for stc in block]
+        # flatten any vector dimension and concatenate in time
+        data = [stc.data.reshape(stc.data.shape[0], -1) for stc in block]
+        bounds = np.cumsum([0] + [d.shape[1] for d in data])
+        data = np.concatenate(data, axis=1)
+        if isinstance(morph_mat, sparse.csr_matrix) and \
+                data.dtype == morph_mat.dtype:
+            data_to = _csr_dot(morph_mat, data, np.zeros(
+                (morph_mat.shape[0], data.shape[1]), data.dtype))
+        else:
+            data_to = morph_mat * data
+        out = list()
+        for klass, stc, start, stop in zip(klasses, block, bounds[:-1],
+                                           bounds[1:]):
+            this_data = data_to[:, start:stop].reshape(
+                (morph_mat.shape[0],) + stc.data.shape[1:])
+            out.append(klass(this_data, self.vertices_to, stc.tmin,
+                             stc.tstep, self.subject_to))
+        return out
+
+    def _morph_one_vol(self, stc_one, flatten=True):
         # prepare data to be morphed
         # here we use mri_resolution=True, mri_space=True because
         # we will slice afterward
@@ -446,6 +647,8 @@ class SourceMorph(object):
             img_to = _get_img_fdata(resample_from_to(
                 SpatialImage(img_to, self.affine),
                 self.src_data['to_vox_map'], order=0))
+        if not flatten:
+            return img_to
 
         # reshape to nvoxel x nvol:
         # in the MNE definition of volume source spaces,
@@ -574,6 +777,61 @@ def _check_dep(nibabel='2.1.0', dipy='0.10.1'):
                                                                         ver))
 
 
+# Spacing (in source grid points) of the vertices whose unit impulses are
+# morphed together by SourceMorph.compute_vol_morph_mat
+_VOL_MORPH_STRIDE = 4
+
+
+def _vol_morph_mat_entries(morph, vertices_from, batches):
+    """Compute the entries of the volumetric morph matrix for some batches.
+
+    The impulses of a batch are morphed once with unit amplitudes and once
+    with amplitudes 1, 2, ..., so the ratio of the two morphed volumes
+    tells which impulse each voxel comes from. Every connected component
+    of the morphed volume must come from a single impulse, otherwise the
+    batch is split in two.
+    """
+    from scipy import ndimage
+    rows, cols, vals = [np.zeros(0, int)], [np.zeros(0, int)], [np.zeros(0)]
+    batches = list(batches)
+    while len(batches) > 0:
+        idx = batches.pop()
+        data = np.zeros((len(vertices_from), 1))
+        data[idx] = 1.
+        img = morph._morph_one_vol(VolSourceEstimate(
+            data, vertices_from, tmin=0., tstep=1.), flatten=False)
+        w_one = img.reshape(-1, order='F')[morph.vertices_to]
+        nz = np.nonzero(w_one)[0]
+        w_one = w_one[nz]
+        if len(idx) == 1:
+            which = np.zeros(len(nz), int)
+        else:
+            data[idx, 0] = np.arange(1, len(idx) + 1)
+            w_idx = morph._morph_one_vol(VolSourceEstimate(
+                data, vertices_from, tmin=0., tstep=1.))
+            ratio = w_idx[morph.vertices_to][nz] / w_one
+            which = np.round(ratio).astype(int) - 1
+            labels = ndimage.label(img != 0, np.ones((3, 3, 3)))[0]
+            labels = labels.reshape(-1, order='F')[morph.vertices_to][nz]
+            order = np.argsort(labels, kind='mergesort')
+            starts = np.concatenate(
+                [[0], np.nonzero(np.diff(labels[order]))[0] + 1])
+            which_sorted = which[order]
+            if len(nz) > 0 and not (
+                    np.all(np.abs(ratio - which - 1) < 0.25) and
+                    which.min() >= 0 and which.max() < len(idx) and
+                    np.array_equal(
+                        np.minimum.reduceat(which_sorted, starts),
+                        np.maximum.reduceat(which_sorted, starts))):
+                # the morphed impulses overlap
+                batches.extend([idx[::2], idx[1::2]])
+                continue
+        rows.append(nz)
+        cols.append(idx[which])
+        vals.append(w_one)
+    return [np.concatenate(x) for x in (rows, cols, vals)]
+
+
 def _morphed_stc_as_volume(morph, stc, mri_resolution, mri_space, output):
     """Return volume source space as Nifti1Image and/or save to disk."""
     if isinstance(stc, VolVectorSourceEstimate):
@@ -868,13 +1126,14 @@ def _compute_morph_sdr(mri_from, mri_to, niter_affine, niter_sdr, zooms):
 
 def _compute_morph_matrix(subject_from, subject_to, vertices_from, vertices_to,
                           smooth=None, subjects_dir=None, warn=True,
-                          xhemi=False):
+                          xhemi=False, n_jobs=1):
     """Compute morph matrix."""
     logger.info('Computing morph matrix...')
     subjects_dir = get_subjects_dir(subjects_dir, raise_error=True)
 
     tris = _get_subject_sphere_tris(subject_from, subjects_dir)
-    maps = read_morph_map(subject_from, subject_to, subjects_dir, xhemi)
+    maps = read_morph_map(subject_from, subject_to, subjects_dir, xhemi,
+                          n_jobs)
 
     # morph the data
 
@@ -1160,8 +1419,8 @@ def _check_vertices_match(v1, v2, name):
                          % (len(v1), len(v2), name, v1, v2))
 
 
-def _apply_morph_data(morph, stc_from):
-    """Morph a source estimate from one subject to another."""
+def _check_morph_input(morph, stc_from):
+    """Check the source estimate to morph and get the output class."""
     if stc_from.subject is not None and stc_from.subject != morph.subject_from:
         raise ValueError('stc.subject (%s) != morph.subject_from (%s)'
                          % (stc_from.subject, morph.subject_from))
@@ -1175,41 +1434,67 @@ def _apply_morph_data(morph, stc_from):
                              'source estimate' % (type(stc_from),))
         vertices_from = np.where(morph.src_data['inuse'])[0]
         _check_vertices_match(stc_from.vertices, vertices_from, 'volume')
-        n_times = np.prod(stc_from.data.shape[1:])
-        data = np.empty((len(morph.vertices_to), n_times))
-        data_from = np.reshape(stc_from.data, (stc_from.data.shape[0], -1))
-        # Loop over time points to save memory
-        for k in range(n_times):
-            this_stc = VolSourceEstimate(
-                data_from[:, k:k + 1], stc_from.vertices, tmin=0., tstep=1.)
-            this_img_to = morph._morph_one_vol(this_stc)
-            data[:, k] = this_img_to[morph.vertices_to]
-        data.shape = (len(morph.vertices_to),) + stc_from.data.shape[1:]
     else:
         assert morph.kind == 'surface'
-        if not isinstance(stc_from, (SourceEstimate, VectorSourceEstimate)):
+        if isinstance(stc_from, VectorSourceEstimate):
+            klass = VectorSourceEstimate
+        elif isinstance(stc_from, SourceEstimate):
+            klass = SourceEstimate
+        else:
             raise ValueError('stc_from was type %s but must be a surface '
                              'source estimate' % (type(stc_from),))
-        morph_mat = morph.morph_mat
         for hemi, v1, v2 in zip(('left', 'right'),
                                 morph.src_data['vertices_from'],
                                 stc_from.vertices):
             _check_vertices_match(v1, v2, '%s hemisphere' % (hemi,))
+    return klass
+
 
+def _apply_morph_data(morph, stc_from):
+    """Morph a source estimate from one subject to another."""
+    klass = _check_morph_input(morph, stc_from)
+    if morph.kind == 'volume':
+        # the morph is linear, so if there are fewer kernel columns than time
+        # points it is cheaper to morph the kernel
+        kernel = stc_from._kernel
+        if kernel is not None and kernel.shape[1] < stc_from.shape[1]:
+            data_from = kernel
+        else:
+            kernel = None
+            data_from = np.reshape(stc_from.data,
+                                   (stc_from.data.shape[0], -1))
+        n_times = data_from.shape[1]
+        if morph.vol_morph_mat is not None:
+            data = morph.vol_morph_mat * data_from
+        else:
+            data = np.empty((len(morph.vertices_to), n_times))
+            # Loop over time points to save memory
+            for k in range(n_times):
+                this_stc = VolSourceEstimate(
+                    data_from[:, k:k + 1], stc_from.vertices, tmin=0.,
+                    tstep=1.)
+                this_img_to = morph._morph_one_vol(this_stc)
+                data[:, k] = this_img_to[morph.vertices_to]
+        if kernel is not None:
+            data = (data, stc_from._sens_data)
+        else:
+            data.shape = (len(morph.vertices_to),) + stc_from.data.shape[1:]
+    else:
+        morph_mat = morph.morph_mat
         # select correct data - since vertices_to can have empty hemispheres,
         # the correct data needs to be selected in order to apply the morph_mat
         # correctly
-        data = stc_from.data
         # apply morph and return new morphed instance of (Vector)SourceEstimate
-        if isinstance(stc_from, VectorSourceEstimate):
+        if klass is VectorSourceEstimate:
             # Morph the locations of the dipoles, but not their orientation
             n_verts, _, n_samples = stc_from.data.shape
-            data = morph_mat * data.reshape(n_verts, 3 * n_samples)
+            data = morph_mat * stc_from.data.reshape(n_verts, 3 * n_samples)
             data = data.reshape(morph_mat.shape[0], 3, n_samples)
-            klass = VectorSourceEstimate
+        elif stc_from._kernel is not None:
+            # morph the kernel and keep the sensor data
+            data = (morph_mat * stc_from._kernel, stc_from._sens_data)
         else:
-            data = morph_mat * data
-            klass = SourceEstimate
+            data = morph_mat * stc_from.data
     stc_to = klass(data, morph.vertices_to, stc_from.tmin, stc_from.tstep,
                    morph.subject_to)
     return stc_to
@@ -6,12 +6,14 @@
 
 # License: BSD (3-clause)
 
+from collections import OrderedDict
 from functools import partial
 from math import factorial
 from os import path as op
+from threading import Lock
 
 import numpy as np
-from scipy import linalg
+from scipy import linalg, sparse
 
 from .. import __version__
 from ..annotations import _annotations_starts_stops
@@ -28,7 +30,9 @@ from ..io.meas_info import _simplify_info
 from ..io.proc_history import _read_ctc
 from ..io.write import _generate_meas_id, DATE_NONE
 from ..io import _loc_to_coil_trans, _coil_trans_to_loc, BaseRaw
+from ..io.base import _allocate_data
 from ..io.pick import pick_types, pick_info
+from ..parallel import parallel_func
 from ..utils import (verbose, logger, _clean_names, warn, _time_mask, _pl,
                      _check_option)
 from ..fixes import _get_args, _safe_svd, einsum
@@ -46,7 +50,8 @@ def maxwell_filter(raw, origin='auto', int_order=8, ext_order=3,
                    st_correlation=0.98, coord_frame='head', destination=None,
                    regularize='in', ignore_ref=False, bad_condition='error',
                    head_pos=None, st_fixed=True, st_only=False, mag_scale=100.,
-                   skip_by_annotation=('edge', 'bad_acq_skip'), verbose=None):
+                   skip_by_annotation=('edge', 'bad_acq_skip'), n_jobs=1,
+                   memmap=None, head_pos_tol=None, verbose=None):
     """Maxwell filter data using multipole moments.
 
     Parameters
@@ -159,6 +164,28 @@ def maxwell_filter(raw, origin='auto', int_order=8, ext_order=3,
         To disable, provide an empty list.
 
         .. versionadded:: 0.17
+    %(n_jobs)s
+        Windows of data (of duration ``st_duration``, or 10 seconds when not
+        using tSSS) are processed in parallel threads.
+
+        .. versionadded:: 0.20
+    memmap : str | None
+        If a filename, the output data are stored in a memory-mapped file
+        on disk, and non-preloaded input data are read directly into this
+        file rather than into memory. This allows processing long
+        recordings with little RAM. The file must remain available for as
+        long as the returned instance is used.
+
+        .. versionadded:: 0.20
+    head_pos_tol : tuple of float | None
+        Tolerance used to reuse SSS decompositions across head positions
+        during movement compensation, given as ``(translation, rotation)``
+        in meters and degrees. Head positions are quantized on a grid with
+        this resolution and the decomposition is computed at the grid
+        point, so nearby positions share one decomposition. The default
+        (None) only reuses decompositions for identical positions.
+
+        .. versionadded:: 0.20
     %(verbose)s
 
     Returns
@@ -314,6 +341,7 @@ def maxwell_filter(raw, origin='auto', int_order=8, ext_order=3,
         raise ValueError('st_duration must not be None if st_only is True')
     head_pos = _check_pos(head_pos, head_frame, raw, st_fixed,
                           raw.info['sfreq'])
+    head_pos_tol = _check_head_pos_tol(head_pos_tol)
     _check_info(raw.info, sss=not st_only, tsss=st_duration is not None,
                 calibration=not st_only and calibration is not None,
                 ctc=not st_only and cross_talk is not None)
@@ -323,7 +351,7 @@ def maxwell_filter(raw, origin='auto', int_order=8, ext_order=3,
     logger.info('Maxwell filtering raw data')
     add_channels = (head_pos[0] is not None) and not st_only
     raw_sss, pos_picks = _copy_preload_add_channels(
-        raw, add_channels=add_channels)
+        raw, add_channels=add_channels, memmap=memmap)
     del raw
     if not st_only:
         # remove MEG projectors, they won't apply now
@@ -466,111 +494,67 @@ def maxwell_filter(raw, origin='auto', int_order=8, ext_order=3,
             np.zeros(3)])
     else:
         this_pos_quat = None
-    _get_this_decomp_trans = partial(
+    _get_this_decomp_trans = _MCDecompCache(partial(
         _get_decomp, all_coils=all_coils,
         cal=calibration, regularize=regularize,
         exp=exp, ignore_ref=ignore_ref, coil_scale=coil_scale,
         grad_picks=grad_picks, mag_picks=mag_picks, good_picks=good_picks,
         mag_or_fine=mag_or_fine, bad_condition=bad_condition,
-        mag_scale=mag_scale)
-    S_decomp, pS_decomp, reg_moments, n_use_in = _get_this_decomp_trans(
-        info['dev_head_t'], t=0.)
-    reg_moments_0 = reg_moments.copy()
-    # Loop through buffer windows of data
-    n_sig = int(np.floor(np.log10(max(len(starts), 0)))) + 1
-    logger.info('    Processing %s data chunk%s' % (len(starts), _pl(starts)))
+        mag_scale=mag_scale), head_pos_tol)
+    decomp = _get_this_decomp_trans(info['dev_head_t'], t=0.)
+    reg_moments_0 = decomp[2].copy()
+    # Figure out the positions used in each window, and which decomposition
+    # is in effect when each window starts, so that windows can be processed
+    # independently
+    do_movecomp = not st_only or st_when == 'after'
+    windows = list()
+    init_trans = info['dev_head_t']
     for ii, (start, stop) in enumerate(zip(starts, stops)):
-        tsss_valid = (stop - start) >= st_duration
-        rel_times = raw_sss.times[start:stop]
-        t_str = '%8.3f - %8.3f sec' % tuple(rel_times[[0, -1]])
-        t_str += ('(#%d/%d)' % (ii + 1, len(starts))).rjust(2 * n_sig + 5)
-
-        # Get original data
-        orig_data = raw_sss._data[meg_picks[good_picks], start:stop]
-        # This could just be np.empty if not st_only, but shouldn't be slow
-        # this way so might as well just always take the original data
-        out_meg_data = raw_sss._data[meg_picks, start:stop]
-        # Apply cross-talk correction
-        if cross_talk is not None:
-            orig_data = ctc.dot(orig_data)
-        out_pos_data = np.empty((len(pos_picks), stop - start))
-
-        # Figure out which positions to use
         t_s_s_q_a = _trans_starts_stops_quats(head_pos, start, stop,
                                               this_pos_quat)
-        n_positions = len(t_s_s_q_a[0])
-
-        # Set up post-tSSS or do pre-tSSS
-        if st_correlation is not None:
-            # If doing tSSS before movecomp...
-            resid = orig_data.copy()  # to be safe let's operate on a copy
-            if st_when == 'after':
-                orig_in_data = np.empty((len(meg_picks), stop - start))
-            else:  # 'before'
-                avg_trans = t_s_s_q_a[-1]
-                if avg_trans is not None:
-                    # if doing movecomp
-                    S_decomp_st, pS_decomp_st, _, n_use_in_st = \
-                        _get_this_decomp_trans(avg_trans, t=rel_times[0])
-                else:
-                    S_decomp_st, pS_decomp_st = S_decomp, pS_decomp
-                    n_use_in_st = n_use_in
-                orig_in_data = np.dot(np.dot(S_decomp_st[:, :n_use_in_st],
-                                             pS_decomp_st[:n_use_in_st]),
-                                      resid)
-                resid -= np.dot(np.dot(S_decomp_st[:, n_use_in_st:],
-                                       pS_decomp_st[n_use_in_st:]), resid)
-                resid -= orig_in_data
-                # Here we operate on our actual data
-                proc = out_meg_data if st_only else orig_data
-                _do_tSSS(proc, orig_in_data, resid, st_correlation,
-                         n_positions, t_str, tsss_valid)
-
-        if not st_only or st_when == 'after':
-            # Do movement compensation on the data
-            for trans, rel_start, rel_stop, this_pos_quat in \
-                    zip(*t_s_s_q_a[:4]):
-                # Recalculate bases if necessary (trans will be None iff the
-                # first position in this interval is the same as last of the
-                # previous interval)
+        windows.append((start, stop, init_trans, t_s_s_q_a))
+        if do_movecomp:
+            for trans in t_s_s_q_a[0]:
                 if trans is not None:
-                    S_decomp, pS_decomp, reg_moments, n_use_in = \
-                        _get_this_decomp_trans(trans, t=rel_times[rel_start])
-
-                # Determine multipole moments for this interval
-                mm_in = np.dot(pS_decomp[:n_use_in],
-                               orig_data[:, rel_start:rel_stop])
-
-                # Our output data
-                if not st_only:
-                    out_meg_data[:, rel_start:rel_stop] = \
-                        np.dot(S_recon.take(reg_moments[:n_use_in], axis=1),
-                               mm_in)
-                if len(pos_picks) > 0:
-                    out_pos_data[:, rel_start:rel_stop] = \
-                        this_pos_quat[:, np.newaxis]
-
-                # Transform orig_data to store just the residual
-                if st_when == 'after':
-                    # Reconstruct data using original location from external
-                    # and internal spaces and compute residual
-                    rel_resid_data = resid[:, rel_start:rel_stop]
-                    orig_in_data[:, rel_start:rel_stop] = \
-                        np.dot(S_decomp[:, :n_use_in], mm_in)
-                    rel_resid_data -= np.dot(np.dot(S_decomp[:, n_use_in:],
-                                                    pS_decomp[n_use_in:]),
-                                             rel_resid_data)
-                    rel_resid_data -= orig_in_data[:, rel_start:rel_stop]
-
-        # If doing tSSS at the end
-        if st_when == 'after':
-            _do_tSSS(out_meg_data, orig_in_data, resid, st_correlation,
-                     n_positions, t_str, tsss_valid)
-        elif st_when == 'never' and head_pos[0] is not None:
-            logger.info('        Used % 2d head position%s for %s'
-                        % (n_positions, _pl(n_positions), t_str))
-        raw_sss._data[meg_picks, start:stop] = out_meg_data
-        raw_sss._data[pos_picks, start:stop] = out_pos_data
+                    init_trans = trans
+            this_pos_quat = t_s_s_q_a[3][-1]
+    # Loop through buffer windows of data
+    n_sig = int(np.floor(np.log10(max(len(starts), 0)))) + 1
+    logger.info('    Processing %s data chunk%s' % (len(starts), _pl(starts)))
+    process_window = partial(
+        _maxwell_window, n_pos=len(pos_picks), S_recon=S_recon,
+        ctc=ctc if cross_talk is not None else None,
+        get_decomp=_get_this_decomp_trans, st_correlation=st_correlation,
+        st_when=st_when, st_only=st_only)
+    parallel, p_fun, n_jobs = parallel_func(process_window, n_jobs,
+                                            prefer='threads')
+    for bi in range(0, len(windows), n_jobs):
+        args = list()
+        for ii in range(bi, min(bi + n_jobs, len(windows))):
+            start, stop, init_trans, t_s_s_q_a = windows[ii]
+            rel_times = raw_sss.times[start:stop]
+            t_str = '%8.3f - %8.3f sec' % tuple(rel_times[[0, -1]])
+            t_str += ('(#%d/%d)' % (ii + 1, len(starts))).rjust(2 * n_sig + 5)
+            if ii > bi and init_trans is not windows[ii - 1][2]:
+                # the decomposition of a window processed alongside this one
+                # would otherwise be carried over, so compute it
+                decomp = _get_this_decomp_trans(init_trans, t=rel_times[0])
+            # Get original data (the output data could just be np.empty if
+            # not st_only, but might as well just take the original data)
+            args.append((raw_sss._data[meg_picks[good_picks], start:stop],
+                         raw_sss._data[meg_picks, start:stop], decomp,
+                         t_s_s_q_a, rel_times, t_str,
+                         (stop - start) >= st_duration))
+        if len(args) == 1:
+            out = [process_window(*args[0])]
+        else:
+            out = parallel(p_fun(*a) for a in args)
+        for (start, stop, _, _), (out_meg_data, out_pos_data, decomp) in zip(
+                windows[bi:bi + n_jobs], out):
+            raw_sss._data[meg_picks, start:stop] = out_meg_data
+            raw_sss._data[pos_picks, start:stop] = out_pos_data
+    if head_pos[0] is not None:
+        _get_this_decomp_trans.log_stats()
 
     # Update info
     if not st_only:
@@ -582,6 +566,90 @@ def maxwell_filter(raw, origin='auto', int_order=8, ext_order=3,
     return raw_sss
 
 
+def _maxwell_window(orig_data, out_meg_data, decomp, t_s_s_q_a, rel_times,
+                    t_str, tsss_valid, n_pos, S_recon, ctc, get_decomp,
+                    st_correlation, st_when, st_only):
+    """Maxwell filter one window of data."""
+    S_decomp, pS_decomp, reg_moments, n_use_in = decomp
+    # Apply cross-talk correction
+    if ctc is not None:
+        orig_data = ctc.dot(orig_data)
+    out_pos_data = np.empty((n_pos, len(rel_times)))
+    n_positions = len(t_s_s_q_a[0])
+
+    # Set up post-tSSS or do pre-tSSS
+    if st_correlation is not None:
+        # If doing tSSS before movecomp...
+        resid = orig_data.copy()  # to be safe let's operate on a copy
+        if st_when == 'after':
+            orig_in_data = np.empty((len(out_meg_data), len(rel_times)))
+        else:  # 'before'
+            avg_trans = t_s_s_q_a[-1]
+            if avg_trans is not None:
+                # if doing movecomp
+                S_decomp_st, pS_decomp_st, _, n_use_in_st = \
+                    get_decomp(avg_trans, t=rel_times[0])
+            else:
+                S_decomp_st, pS_decomp_st = S_decomp, pS_decomp
+                n_use_in_st = n_use_in
+            orig_in_data = np.dot(np.dot(S_decomp_st[:, :n_use_in_st],
+                                         pS_decomp_st[:n_use_in_st]),
+                                  resid)
+            resid -= np.dot(np.dot(S_decomp_st[:, n_use_in_st:],
+                                   pS_decomp_st[n_use_in_st:]), resid)
+            resid -= orig_in_data
+            # Here we operate on our actual data
+            proc = out_meg_data if st_only else orig_data
+            _do_tSSS(proc, orig_in_data, resid, st_correlation,
+                     n_positions, t_str, tsss_valid)
+
+    if not st_only or st_when == 'after':
+        # Do movement compensation on the data
+        for trans, rel_start, rel_stop, this_pos_quat in \
+                zip(*t_s_s_q_a[:4]):
+            # Recalculate bases if necessary (trans will be None iff the
+            # first position in this interval is the same as last of the
+            # previous interval)
+            if trans is not None:
+                S_decomp, pS_decomp, reg_moments, n_use_in = \
+                    get_decomp(trans, t=rel_times[rel_start])
+
+            # Determine multipole moments for this interval
+            mm_in = np.dot(pS_decomp[:n_use_in],
+                           orig_data[:, rel_start:rel_stop])
+
+            # Our output data
+            if not st_only:
+                out_meg_data[:, rel_start:rel_stop] = \
+                    np.dot(S_recon.take(reg_moments[:n_use_in], axis=1),
+                           mm_in)
+            if n_pos > 0:
+                out_pos_data[:, rel_start:rel_stop] = \
+                    this_pos_quat[:, np.newaxis]
+
+            # Transform orig_data to store just the residual
+            if st_when == 'after':
+                # Reconstruct data using original location from external
+                # and internal spaces and compute residual
+                rel_resid_data = resid[:, rel_start:rel_stop]
+                orig_in_data[:, rel_start:rel_stop] = \
+                    np.dot(S_decomp[:, :n_use_in], mm_in)
+                rel_resid_data -= np.dot(np.dot(S_decomp[:, n_use_in:],
+                                                pS_decomp[n_use_in:]),
+                                         rel_resid_data)
+                rel_resid_data -= orig_in_data[:, rel_start:rel_stop]
+
+    # If doing tSSS at the end
+    if st_when == 'after':
+        _do_tSSS(out_meg_data, orig_in_data, resid, st_correlation,
+                 n_positions, t_str, tsss_valid)
+    elif st_when == 'never' and t_s_s_q_a[-1] is not None:
+        logger.info('        Used % 2d head position%s for %s'
+                    % (n_positions, _pl(n_positions), t_str))
+    return (out_meg_data, out_pos_data,
+            (S_decomp, pS_decomp, reg_moments, n_use_in))
+
+
 def _get_coil_scale(meg_picks, mag_picks, grad_picks, mag_scale, info):
     """Get the magnetometer scale factor."""
     if isinstance(mag_scale, str):
@@ -753,40 +821,44 @@ def _do_tSSS(clean_data, orig_in_data, resid, st_correlation,
     clean_data -= np.dot(np.dot(clean_data, t_proj), t_proj.T)
 
 
-def _copy_preload_add_channels(raw, add_channels):
+def _copy_preload_add_channels(raw, add_channels, memmap=None):
     """Load data for processing and (maybe) add cHPI pos channels."""
-    raw = raw.copy()
-    if add_channels:
-        kinds = [FIFF.FIFFV_QUAT_1, FIFF.FIFFV_QUAT_2, FIFF.FIFFV_QUAT_3,
-                 FIFF.FIFFV_QUAT_4, FIFF.FIFFV_QUAT_5, FIFF.FIFFV_QUAT_6,
-                 FIFF.FIFFV_HPI_G, FIFF.FIFFV_HPI_ERR, FIFF.FIFFV_HPI_MOV]
+    if raw.preload and memmap is not None:
+        # avoid making an in-memory copy of data that will go to disk
+        orig_data, raw._data = raw._data, None
+        try:
+            raw_copy = raw.copy()
+        finally:
+            raw._data = orig_data
+        raw = raw_copy
+    else:
+        orig_data = None
+        raw = raw.copy()
+    kinds = [FIFF.FIFFV_QUAT_1, FIFF.FIFFV_QUAT_2, FIFF.FIFFV_QUAT_3,
+             FIFF.FIFFV_QUAT_4, FIFF.FIFFV_QUAT_5, FIFF.FIFFV_QUAT_6,
+             FIFF.FIFFV_HPI_G, FIFF.FIFFV_HPI_ERR, FIFF.FIFFV_HPI_MOV]
+    if not add_channels:
+        kinds = list()
+    if add_channels or memmap is not None:
         out_shape = (len(raw.ch_names) + len(kinds), len(raw.times))
-        out_data = np.zeros(out_shape, np.float64)
-        msg = '    Appending head position result channels and '
+        out_data = _allocate_data(True if memmap is None else memmap,
+                                  out_shape, np.float64)
+        if add_channels:
+            msg = '    Appending head position result channels and '
+        else:
+            msg = '    '
+        where = ' to %s' % (memmap,) if memmap is not None else ''
         if raw.preload:
-            logger.info(msg + 'copying original raw data')
-            out_data[:len(raw.ch_names)] = raw._data
+            logger.info(msg + 'copying original raw data' + where)
+            out_data[:len(raw.ch_names)] = \
+                raw._data if orig_data is None else orig_data
             raw._data = out_data
         else:
-            logger.info(msg + 'loading raw data from disk')
+            logger.info(msg + 'loading raw data from disk' + where)
             raw._preload_data(out_data[:len(raw.ch_names)], verbose=False)
             raw._data = out_data
+        del orig_data
         assert raw.preload is True
-        off = len(raw.ch_names)
-        chpi_chs = [
-            dict(ch_name='CHPI%03d' % (ii + 1), logno=ii + 1,
-                 scanno=off + ii + 1, unit_mul=-1, range=1., unit=-1,
-                 kind=kinds[ii], coord_frame=FIFF.FIFFV_COORD_UNKNOWN,
-                 cal=1e-4, coil_type=FWD.COIL_UNKNOWN, loc=np.zeros(12))
-            for ii in range(len(kinds))]
-        raw.info['chs'].extend(chpi_chs)
-        raw.info._update_redundant()
-        raw.info._check_consistency()
-        assert raw._data.shape == (raw.info['nchan'], len(raw.times))
-        # Return the pos picks
-        pos_picks = np.arange(len(raw.ch_names) - len(chpi_chs),
-                              len(raw.ch_names))
-        return raw, pos_picks
     else:
         if not raw.preload:
             logger.info('    Loading raw data from disk')
@@ -794,6 +866,21 @@ def _copy_preload_add_channels(raw, add_channels):
         else:
             logger.info('    Using loaded raw data')
         return raw, np.array([], int)
+    off = len(raw.ch_names)
+    chpi_chs = [
+        dict(ch_name='CHPI%03d' % (ii + 1), logno=ii + 1,
+             scanno=off + ii + 1, unit_mul=-1, range=1., unit=-1,
+             kind=kinds[ii], coord_frame=FIFF.FIFFV_COORD_UNKNOWN,
+             cal=1e-4, coil_type=FWD.COIL_UNKNOWN, loc=np.zeros(12))
+        for ii in range(len(kinds))]
+    raw.info['chs'].extend(chpi_chs)
+    raw.info._update_redundant()
+    raw.info._check_consistency()
+    assert raw._data.shape == (raw.info['nchan'], len(raw.times))
+    # Return the pos picks
+    pos_picks = np.arange(len(raw.ch_names) - len(chpi_chs),
+                          len(raw.ch_names))
+    return raw, pos_picks
 
 
 def _check_pos(pos, head_frame, raw, st_fixed, sfreq):
@@ -831,6 +918,84 @@ def _check_pos(pos, head_frame, raw, st_fixed, sfreq):
     return pos
 
 
+def _check_head_pos_tol(head_pos_tol):
+    """Check the head position tolerance."""
+    if head_pos_tol is None:
+        return None
+    try:
+        tol = np.array(head_pos_tol, float)
+    except (TypeError, ValueError):
+        tol = np.array([np.nan])
+    if tol.shape != (2,) or not np.isfinite(tol).all() or (tol < 0).any():
+        raise ValueError('head_pos_tol must be None or a tuple of two '
+                         'non-negative floats (translation, rotation), '
+                         'got %r' % (head_pos_tol,))
+    return tol
+
+
+_MC_CACHE_SIZE = 100  # number of decompositions to keep for movecomp
+
+
+class _MCDecompCache(object):
+    """LRU cache of SSS decompositions keyed by (quantized) head position.
+
+    Windows can be processed in parallel threads, so access is locked.
+    """
+
+    def __init__(self, get_decomp, tol=None, size=_MC_CACHE_SIZE):
+        self.get_decomp = get_decomp
+        self.tol = tol
+        self.size = size
+        self._cache = OrderedDict()
+        self._lock = Lock()
+        self.n_hits = self.n_calls = 0
+
+    def _quantize(self, trans):
+        """Quantize a 4x4 transform and get its cache key."""
+        trans = np.array(trans, float)
+        if self.tol is not None:
+            tol_t, tol_r = self.tol
+            if tol_t > 0:
+                trans[:3, 3] = np.round(trans[:3, 3] / tol_t) * tol_t
+            if tol_r > 0:
+                # quaternion components change by about half the rotation
+                step = np.deg2rad(tol_r) / 2.
+                quat = np.round(rot_to_quat(trans[:3, :3]) / step) * step
+                # near 180 degrees the rounded vector part can exceed unit
+                # norm, which would not give a proper rotation matrix
+                norm = np.linalg.norm(quat)
+                if norm > 1:
+                    quat /= norm
+                trans[:3, :3] = quat_to_rot(quat)
+        return trans, trans.tobytes()
+
+    def __call__(self, trans, t):
+        """Get the decomposition for a given transform."""
+        if trans is None or isinstance(trans, Transform):
+            # the initial (or no) device-to-head transform is used as is
+            return self.get_decomp(trans, t=t)
+        trans, key = self._quantize(trans)
+        with self._lock:
+            self.n_calls += 1
+            decomp = self._cache.get(key)
+            if decomp is not None:
+                self.n_hits += 1
+                self._cache.move_to_end(key)
+                return decomp
+        decomp = self.get_decomp(trans, t=t)
+        with self._lock:
+            self._cache[key] = decomp
+            while len(self._cache) > self.size:
+                self._cache.popitem(last=False)
+        return decomp
+
+    def log_stats(self):
+        """Log the cache hit rate."""
+        logger.info('    Reused %d/%d SSS decomposition%s (%0.1f%%)'
+                    % (self.n_hits, self.n_calls, _pl(self.n_calls),
+                       100. * self.n_hits / max(self.n_calls, 1)))
+
+
 def _get_decomp(trans, all_coils, cal, regularize, exp, ignore_ref,
                 coil_scale, grad_picks, mag_picks, good_picks, mag_or_fine,
                 bad_condition, t, mag_scale):
@@ -1172,13 +1337,37 @@ def _sss_basis(exp, all_coils):
     rmags, cosmags, bins, n_coils = all_coils[:4]
     int_order, ext_order = exp['int_order'], exp['ext_order']
     n_in, n_out = _get_n_moments([int_order, ext_order])
-    S_tot = np.empty((n_coils, n_in + n_out), np.float64)
-
     rmags = rmags - exp['origin']
-    S_in = S_tot[:, :n_in]
-    S_out = S_tot[:, n_in:]
-
-    # do the heavy lifting
+    # Evaluate all (degree, order) terms for chunks of integration points at
+    # once (chunking keeps the temporaries small enough to be fast), then sum
+    # over the integration points of each coil with a sparse matrix product
+    degrees, orders = _get_degrees_orders(max(int_order, ext_order))
+    # mu_0*sqrt((2l+1)/4pi (l-m)!/(l+m)!)
+    mult = 2e-7 * np.sqrt((2 * degrees + 1) * np.pi)
+    for order in range(1, max(int_order, ext_order) + 1):
+        use = np.abs(orders) >= order
+        mult[use] /= np.sqrt((degrees[use] - order + 1) *
+                             (degrees[use] + order))
+    mult[orders != 0] *= np.sqrt(2)  # equivalence fix (MF uses 2.)
+    S_points = np.empty((len(rmags), n_in + n_out))
+    for start in range(0, len(rmags), _SSS_BASIS_CHUNK):
+        sl = slice(start, start + _SSS_BASIS_CHUNK)
+        S_points[sl] = _sss_basis_points(
+            rmags[sl], cosmags[sl], degrees, orders, mult, int_order,
+            ext_order)
+    integ = sparse.csr_matrix(
+        (np.ones(len(bins)), (bins, np.arange(len(bins)))),
+        shape=(n_coils, len(bins)))
+    return integ.dot(S_points)
+
+
+_SSS_BASIS_CHUNK = 1000  # integration points to process at once
+
+
+def _sss_basis_points(rmags, cosmags, degrees, orders, mult, int_order,
+                      ext_order):
+    """Compute the SSS basis terms for integration points."""
+    n_in, n_out = _get_n_moments([int_order, ext_order])
     max_order = max(int_order, ext_order)
     L = _tabular_legendre(rmags, max_order)
     phi = np.arctan2(rmags[:, 1], rmags[:, 0])
@@ -1193,111 +1382,72 @@ def _sss_basis(exp, all_coils):
     sin_az = rmags[:, 1] / r_xy  # sin(phi)
     sin_az[z_only] = 0.
     del rmags
+    # Project the integration point normals onto the spherical unit vectors
+    # once, so each basis term is just a weighted sum of three components
+    c_r, c_az, c_pol = _cart_to_sp(cos_az, sin_az, cos_pol, sin_pol, cosmags)
+    # the azimuthal term is zero along the z axis
+    c_az[z_only] = 0.
+    c_az[~z_only] /= sin_pol[~z_only]
+
     # Appropriate vector spherical harmonics terms
     #  JNE 2012-02-08: modified alm -> 2*alm, blm -> -2*blm
-    r_nn2 = r_n.copy()
-    r_nn1 = 1.0 / (r_n * r_n)
-    for degree in range(max_order + 1):
-        if degree <= ext_order:
-            r_nn1 *= r_n  # r^(l-1)
-        if degree <= int_order:
-            r_nn2 *= r_n  # r^(l+2)
-
-        # mu_0*sqrt((2l+1)/4pi (l-m)!/(l+m)!)
-        mult = 2e-7 * np.sqrt((2 * degree + 1) * np.pi)
-
-        if degree > 0:
-            idx = _deg_ord_idx(degree, 0)
-            # alpha
-            if degree <= int_order:
-                b_r = mult * (degree + 1) * L[degree][0] / r_nn2
-                b_pol = -mult * L[degree][1] / r_nn2
-                S_in[:, idx] = _integrate_points(
-                    cos_az, sin_az, cos_pol, sin_pol, b_r, 0., b_pol,
-                    cosmags, bins, n_coils)
-            # beta
-            if degree <= ext_order:
-                b_r = -mult * degree * L[degree][0] * r_nn1
-                b_pol = -mult * L[degree][1] * r_nn1
-                S_out[:, idx] = _integrate_points(
-                    cos_az, sin_az, cos_pol, sin_pol, b_r, 0., b_pol,
-                    cosmags, bins, n_coils)
-        for order in range(1, degree + 1):
-            ord_phi = order * phi
-            sin_order = np.sin(ord_phi)
-            cos_order = np.cos(ord_phi)
-            mult /= np.sqrt((degree - order + 1) * (degree + order))
-            factor = mult * np.sqrt(2)  # equivalence fix (MF uses 2.)
-
-            # Real
-            idx = _deg_ord_idx(degree, order)
-            r_fact = factor * L[degree][order] * cos_order
-            az_fact = factor * order * sin_order * L[degree][order]
-            pol_fact = -factor * (L[degree][order + 1] -
-                                  (degree + order) * (degree - order + 1) *
-                                  L[degree][order - 1]) * cos_order
-            # alpha
-            if degree <= int_order:
-                b_r = (degree + 1) * r_fact / r_nn2
-                b_az = az_fact / (sin_pol * r_nn2)
-                b_az[z_only] = 0.
-                b_pol = pol_fact / (2 * r_nn2)
-                S_in[:, idx] = _integrate_points(
-                    cos_az, sin_az, cos_pol, sin_pol, b_r, b_az, b_pol,
-                    cosmags, bins, n_coils)
-            # beta
-            if degree <= ext_order:
-                b_r = -degree * r_fact * r_nn1
-                b_az = az_fact * r_nn1 / sin_pol
-                b_az[z_only] = 0.
-                b_pol = pol_fact * r_nn1 / 2.
-                S_out[:, idx] = _integrate_points(
-                    cos_az, sin_az, cos_pol, sin_pol, b_r, b_az, b_pol,
-                    cosmags, bins, n_coils)
-
-            # Imaginary
-            idx = _deg_ord_idx(degree, -order)
-            r_fact = factor * L[degree][order] * sin_order
-            az_fact = factor * order * cos_order * L[degree][order]
-            pol_fact = factor * (L[degree][order + 1] -
-                                 (degree + order) * (degree - order + 1) *
-                                 L[degree][order - 1]) * sin_order
-            # alpha
-            if degree <= int_order:
-                b_r = -(degree + 1) * r_fact / r_nn2
-                b_az = az_fact / (sin_pol * r_nn2)
-                b_az[z_only] = 0.
-                b_pol = pol_fact / (2 * r_nn2)
-                S_in[:, idx] = _integrate_points(
-                    cos_az, sin_az, cos_pol, sin_pol, b_r, b_az, b_pol,
-                    cosmags, bins, n_coils)
-            # beta
-            if degree <= ext_order:
-                b_r = degree * r_fact * r_nn1
-                b_az = az_fact * r_nn1 / sin_pol
-                b_az[z_only] = 0.
-                b_pol = pol_fact * r_nn1 / 2.
-                S_out[:, idx] = _integrate_points(
-                    cos_az, sin_az, cos_pol, sin_pol, b_r, b_az, b_pol,
-                    cosmags, bins, n_coils)
-    return S_tot
-
-
-def _integrate_points(cos_az, sin_az, cos_pol, sin_pol, b_r, b_az, b_pol,
-                      cosmags, bins, n_coils):
-    """Integrate points in spherical coords."""
-    grads = _sp_to_cart(cos_az, sin_az, cos_pol, sin_pol, b_r, b_az, b_pol).T
-    grads = einsum('ij,ij->i', grads, cosmags)
-    return np.bincount(bins, grads, n_coils)
+    abs_orders = np.abs(orders)
+    # Angular parts for each (degree, |order|), and cos/sin for each |order|
+    ords = np.arange(max_order + 1)
+    L_r = L[:, :-1] * c_r
+    L_az = L[:, :-1] * c_az
+    L_pol = L[:, 1:].copy()
+    L_pol[:, 1:] -= L[:, :-2] * (
+        (ords[:, np.newaxis] + ords[1:]) *
+        (ords[:, np.newaxis] - ords[1:] + 1))[:, :, np.newaxis]
+    L_pol *= c_pol
+    del L
+    ord_phi = ords[:, np.newaxis] * phi
+    trig = np.concatenate([np.cos(ord_phi), np.sin(ord_phi)])
+    del ord_phi
+    # The real (m >= 0) terms use cos(m phi) and the imaginary (m < 0) ones
+    # sin(m phi), and vice versa for the azimuthal component
+    neg = orders < 0
+    this_trig = trig[abs_orders + neg * (max_order + 1)]
+    sign = np.where(neg, -1., 1.)[:, np.newaxis]
+    mult = mult[:, np.newaxis]
+    ang_r = this_trig * L_r[degrees, abs_orders]
+    ang_r *= sign * mult
+    ang_other = this_trig * L_pol[degrees, abs_orders]
+    ang_other *= -sign * mult * np.where(orders != 0, 0.5, 1.)[:, np.newaxis]
+    this_trig = trig[abs_orders + ~neg * (max_order + 1)]
+    this_trig *= L_az[degrees, abs_orders]
+    this_trig *= mult * abs_orders[:, np.newaxis]
+    ang_other += this_trig
+    del this_trig, L_r, L_pol, L_az, trig
+    # Radial parts for each degree
+    S_points = np.empty((len(r_n), n_in + n_out))
+    inv_r_n = 1. / r_n
+    rad = np.empty((max_order + 1, len(r_n)))
+    # alpha
+    rad[0] = inv_r_n * inv_r_n
+    for degree in range(1, int_order + 1):
+        rad[degree] = rad[degree - 1] * inv_r_n  # 1 / r^(l+2)
+    use = slice(0, n_in)
+    S_points[:, :n_in] = (
+        ((degrees[use, np.newaxis] + 1) * ang_r[use] + ang_other[use]) *
+        rad[degrees[use]]).T
+    # beta
+    rad[0] = inv_r_n
+    for degree in range(1, ext_order + 1):
+        rad[degree] = rad[degree - 1] * r_n  # r^(l-1)
+    use = slice(0, n_out)
+    S_points[:, n_in:] = (
+        (-degrees[use, np.newaxis] * ang_r[use] + ang_other[use]) *
+        rad[degrees[use]]).T
+    return S_points
 
 
 def _tabular_legendre(r, nind):
     """Compute associated Legendre polynomials."""
     r_n = np.sqrt(np.sum(r * r, axis=1))
     x = r[:, 2] / r_n  # cos(theta)
-    L = list()
-    for degree in range(nind + 1):
-        L.append(np.zeros((degree + 2, len(r))))
+    L = np.zeros((nind + 1, nind + 2, len(r)))
     L[0][0] = 1.
     pnn = 1.
     fact = 1.
@@ -1309,37 +1459,28 @@ def _tabular_legendre(r, nind):
         if degree < nind:
             L[degree + 1][degree] = x * (2 * degree + 1) * L[degree][degree]
         if degree >= 2:
-            for order in range(degree - 1):
-                L[degree][order] = (x * (2 * degree - 1) *
-                                    L[degree - 1][order] -
-                                    (degree + order - 1) *
-                                    L[degree - 2][order]) / (degree - order)
+            order = np.arange(degree - 1)[:, np.newaxis]
+            L[degree][:degree - 1] = (
+                x * (2 * degree - 1) * L[degree - 1][:degree - 1] -
+                (degree + order - 1) * L[degree - 2][:degree - 1]) / \
+                (degree - order)
     return L
 
 
-def _sp_to_cart(cos_az, sin_az, cos_pol, sin_pol, b_r, b_az, b_pol):
-    """Convert spherical coords to cartesian."""
-    return np.array([(sin_pol * cos_az * b_r +
-                      cos_pol * cos_az * b_pol - sin_az * b_az),
-                     (sin_pol * sin_az * b_r +
-                      cos_pol * sin_az * b_pol + cos_az * b_az),
-                     cos_pol * b_r - sin_pol * b_pol])
+def _cart_to_sp(cos_az, sin_az, cos_pol, sin_pol, vecs):
+    """Get the radial, azimuthal, and polar components of vectors."""
+    x, y, z = vecs.T
+    xy = cos_az * x + sin_az * y
+    return (sin_pol * xy + cos_pol * z, cos_az * y - sin_az * x,
+            cos_pol * xy - sin_pol * z)
 
 
 def _get_degrees_orders(order):
     """Get the set of degrees used in our basis functions."""
-    degrees = np.zeros(_get_n_moments(order), int)
-    orders = np.zeros_like(degrees)
-    for degree in range(1, order + 1):
-        # Only loop over positive orders, negative orders are handled
-        # for efficiency within
-        for order in range(degree + 1):
-            ii = _deg_ord_idx(degree, order)
-            degrees[ii] = degree
-            orders[ii] = order
-            ii = _deg_ord_idx(degree, -order)
-            degrees[ii] = degree
-            orders[ii] = -order
+    # invert _deg_ord_idx
+    idx = np.arange(_get_n_moments(order)) + 1
+    degrees = np.sqrt(idx).astype(int)
+    orders = idx - degrees * (degrees + 1)
     return degrees, orders
 
 
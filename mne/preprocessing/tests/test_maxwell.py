@@ -21,7 +21,7 @@ from mne.io import read_raw_fif, read_info, read_raw_bti, read_raw_kit, BaseRaw
 from mne.preprocessing.maxwell import (
     maxwell_filter, _get_n_moments, _sss_basis_basic, _sh_complex_to_real,
     _sh_real_to_complex, _sh_negate, _bases_complex_to_real, _trans_sss_basis,
-    _bases_real_to_complex, _prep_mf_coils)
+    _bases_real_to_complex, _prep_mf_coils, _MCDecompCache)
 from mne.rank import _get_rank_sss, _compute_rank_int
 from mne.utils import (assert_meg_snr, run_tests_if_main, catch_logging,
                        requires_version, object_diff, buggy_mkl_svd)
@@ -207,6 +207,76 @@ def test_movement_compensation(tmpdir):
                    chpi_med_tol=5)
 
 
+@pytest.mark.slowtest
+@testing.requires_testing_data
+def test_maxwell_filter_parallel_memmap(tmpdir):
+    """Test parallel window processing and memory-mapped output."""
+    raw = read_crop(raw_fname, (0, 4))
+    assert not raw.preload
+    head_pos = read_head_pos(pos_fname)
+    kwargs = dict(head_pos=head_pos, origin=mf_head_origin, st_duration=1.)
+    raw_sss = maxwell_filter(raw, **kwargs)
+    fname = str(tmpdir.join('sss.dat'))
+    raw_sss_mm = maxwell_filter(raw, n_jobs=2, memmap=fname, **kwargs)
+    assert isinstance(raw_sss_mm._data, np.memmap)
+    assert op.isfile(fname)
+    assert raw_sss_mm.ch_names == raw_sss.ch_names
+    assert_allclose(raw_sss_mm._data, raw_sss._data, rtol=1e-12, atol=1e-20)
+    assert object_diff(raw_sss_mm.info['proc_history'],
+                       raw_sss.info['proc_history']) == ''
+    # preloaded input is left untouched
+    raw.load_data()
+    orig_data = raw._data.copy()
+    raw_sss_mm = maxwell_filter(raw, memmap=str(tmpdir.join('sss_2.dat')),
+                                **kwargs)
+    assert_allclose(raw_sss_mm._data, raw_sss._data, rtol=1e-12, atol=1e-20)
+    assert_array_equal(raw._data, orig_data)
+
+
+@pytest.mark.slowtest
+@testing.requires_testing_data
+def test_maxwell_filter_head_pos_tol():
+    """Test reuse of decompositions for nearby head positions."""
+    raw = read_crop(raw_fname, (0, 4)).load_data()
+    head_pos = read_head_pos(pos_fname)
+    kwargs = dict(head_pos=head_pos, origin=mf_head_origin,
+                  regularize=None, bad_condition='ignore')
+    raw_sss = maxwell_filter(raw, **kwargs)
+    with catch_logging() as log:
+        raw_sss_tol = maxwell_filter(raw, head_pos_tol=(0.001, 0.5),
+                                     verbose=True, **kwargs)
+    log = log.getvalue()
+    assert 'Reused ' in log
+    n_hits = int(log.split('Reused ')[1].split('/')[0])
+    assert n_hits > 0
+    assert_meg_snr(raw_sss_tol, raw_sss, 2., 5., chpi_med_tol=None)
+    # zero tolerance only reuses identical positions
+    raw_sss_0 = maxwell_filter(raw, head_pos_tol=(0., 0.), **kwargs)
+    assert_allclose(raw_sss_0._data, raw_sss._data)
+    for bad in ((1.,), (-1., 1.), 'foo'):
+        with pytest.raises(ValueError, match='head_pos_tol'):
+            maxwell_filter(raw, head_pos_tol=bad, **kwargs)
+
+
+def test_mc_decomp_cache_quantize():
+    """Test quantizing head positions near a 180 degree rotation."""
+    cache = _MCDecompCache(None, tol=(0.001, 10.))
+    # 178 degrees about (1, 1, 1), whose rounded quaternion has norm > 1
+    x = np.ones(3) / np.sqrt(3)
+    ang = np.deg2rad(178.)
+    cross = np.array([[0, -x[2], x[1]], [x[2], 0, -x[0]], [-x[1], x[0], 0]])
+    trans = np.eye(4)
+    trans[:3, :3] = (np.cos(ang) * np.eye(3) + np.sin(ang) * cross +
+                     (1 - np.cos(ang)) * np.outer(x, x))
+    trans[:3, 3] = [0.0104, -0.0006, 0.04]
+    quantized, key = cache._quantize(trans)
+    assert np.isfinite(quantized).all()
+    assert_allclose(np.dot(quantized[:3, :3], quantized[:3, :3].T),
+                    np.eye(3), atol=1e-7)
+    assert_allclose(quantized[:3, 3], [0.01, -0.001, 0.04], atol=1e-12)
+    assert cache._quantize(quantized)[1] == key
+
+
 @pytest.mark.slowtest
 def test_other_systems():
     """Test Maxwell filtering on KIT, BTI, and CTF files."""
@@ -315,6 +385,25 @@ def test_spherical_conversions():
             assert_allclose(sph, sph_2, atol=1e-7)
 
 
+def test_sss_basis_chunks(monkeypatch):
+    """Test vectorized SSS basis computation over chunks of points."""
+    from mne.preprocessing import maxwell
+    info = read_info(op.join(io_dir, 'tests', 'data', 'test-ave.fif.gz'))
+    coils = _prep_meg_channels(info, accurate=True, do_es=True)[0]
+    all_coils = _prep_mf_coils(info)
+    exp = dict(int_order=int_order, ext_order=ext_order,
+               origin=(0.01, -0.02, 0.03))
+    S_tot = _sss_basis_basic(exp, coils)
+    S_tot_fast = _trans_sss_basis(exp, all_coils, trans=info['dev_head_t'])
+    # sign differences for some columns (see test_multipolar_bases)
+    flips = 1 - 2 * (np.sign(S_tot_fast[2]) != np.sign(S_tot[2]))
+    assert_allclose(S_tot, S_tot_fast * flips, atol=1e-16)
+    # chunking over integration points does not change the result
+    monkeypatch.setattr(maxwell, '_SSS_BASIS_CHUNK', 7)
+    assert_allclose(_trans_sss_basis(exp, all_coils, info['dev_head_t']),
+                    S_tot_fast, rtol=1e-12, atol=1e-20)
+
+
 @testing.requires_testing_data
 def test_multipolar_bases():
     """Test multipolar moment basis calculation using sensor information."""
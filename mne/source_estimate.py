@@ -588,6 +588,14 @@ class _BaseSourceEstimate(ToDataFrameMixin, TimeMixin):
             self._kernel = None
             self._sens_data = None
 
+    def _same_kernel(self, other):
+        """Check if another stc is kernel-factored with the same kernel."""
+        if self._kernel is None or getattr(other, '_kernel', None) is None:
+            return False
+        return (other._kernel is self._kernel or
+                (other._kernel.shape == self._kernel.shape and
+                 np.array_equal(other._kernel, self._kernel)))
+
     @fill_doc
     def crop(self, tmin=None, tmax=None, include_tmax=True):
         """Restrict SourceEstimate to a time interval.
@@ -605,6 +613,7 @@ class _BaseSourceEstimate(ToDataFrameMixin, TimeMixin):
         self.tmin = self.times[np.where(mask)[0][0]]
         if self._kernel is not None and self._sens_data is not None:
             self._sens_data = self._sens_data[..., mask]
+            self._update_times()
         else:
             self.data = self.data[..., mask]
 
@@ -634,16 +643,22 @@ class _BaseSourceEstimate(ToDataFrameMixin, TimeMixin):
         artifacts. This is dataset dependent -- check your data!
 
         Note that the sample rate of the original data is inferred from tstep.
+        If the data are stored as ``(kernel, sens_data)``, the (linear)
+        resampling is applied to the sensor data.
         """
-        # resampling in sensor instead of source space gives a somewhat
-        # different result, so we don't allow it
-        self._remove_kernel_sens_data_()
-
         o_sfreq = 1.0 / self.tstep
-        data = self.data
-        if data.dtype == np.float32:
-            data = data.astype(np.float64)
-        self.data = resample(data, sfreq, o_sfreq, npad, n_jobs=n_jobs)
+        if self._kernel is not None:
+            sens_data = self._sens_data
+            if sens_data.dtype == np.float32:
+                sens_data = sens_data.astype(np.float64)
+            self._sens_data = resample(sens_data, sfreq, o_sfreq, npad,
+                                       n_jobs=n_jobs)
+            self._update_times()
+        else:
+            data = self.data
+            if data.dtype == np.float32:
+                data = data.astype(np.float64)
+            self.data = resample(data, sfreq, o_sfreq, npad, n_jobs=n_jobs)
 
         # adjust indirectly affected variables
         self.tstep = 1.0 / sfreq
@@ -733,6 +748,10 @@ class _BaseSourceEstimate(ToDataFrameMixin, TimeMixin):
         return stc
 
     def __iadd__(self, a):  # noqa: D105
+        if self._same_kernel(a):
+            _verify_source_estimate_compat(self, a)
+            self._sens_data = self._sens_data + a._sens_data
+            return self
         self._remove_kernel_sens_data_()
         if isinstance(a, _BaseSourceEstimate):
             _verify_source_estimate_compat(self, a)
@@ -761,12 +780,15 @@ class _BaseSourceEstimate(ToDataFrameMixin, TimeMixin):
         stc : SourceEstimate | VectorSourceEstimate
             The modified stc.
         """
-        data = self.data
-        tmax = self.tmin + self.tstep * data.shape[-1]
+        tmax = self.tmin + self.tstep * self.shape[-1]
         tmin = (self.tmin + tmax) / 2.
         tstep = tmax - self.tmin
-        sum_stc = self.__class__(self.data.sum(axis=-1, keepdims=True),
-                                 vertices=self.vertices, tmin=tmin,
+        if self._kernel is not None:
+            data = (self._kernel,
+                    self._sens_data.sum(axis=-1, keepdims=True))
+        else:
+            data = self.data.sum(axis=-1, keepdims=True)
+        sum_stc = self.__class__(data, vertices=self.vertices, tmin=tmin,
                                  tstep=tstep, subject=self.subject)
         return sum_stc
 
@@ -777,6 +799,10 @@ class _BaseSourceEstimate(ToDataFrameMixin, TimeMixin):
         return stc
 
     def __isub__(self, a):  # noqa: D105
+        if self._same_kernel(a):
+            _verify_source_estimate_compat(self, a)
+            self._sens_data = self._sens_data - a._sens_data
+            return self
         self._remove_kernel_sens_data_()
         if isinstance(a, _BaseSourceEstimate):
             _verify_source_estimate_compat(self, a)
@@ -798,6 +824,9 @@ class _BaseSourceEstimate(ToDataFrameMixin, TimeMixin):
         return self.__idiv__(a)
 
     def __idiv__(self, a):  # noqa: D105
+        if self._kernel is not None and np.isscalar(a):
+            self._sens_data = self._sens_data / a
+            return self
         self._remove_kernel_sens_data_()
         if isinstance(a, _BaseSourceEstimate):
             _verify_source_estimate_compat(self, a)
@@ -813,6 +842,9 @@ class _BaseSourceEstimate(ToDataFrameMixin, TimeMixin):
         return stc
 
     def __imul__(self, a):  # noqa: D105
+        if self._kernel is not None and np.isscalar(a):
+            self._sens_data = self._sens_data * a
+            return self
         self._remove_kernel_sens_data_()
         if isinstance(a, _BaseSourceEstimate):
             _verify_source_estimate_compat(self, a)
@@ -846,8 +878,7 @@ class _BaseSourceEstimate(ToDataFrameMixin, TimeMixin):
     def __neg__(self):  # noqa: D105
         """Negate the source estimate."""
         stc = self.copy()
-        stc._remove_kernel_sens_data_()
-        stc.data *= -1
+        stc *= -1
         return stc
 
     def __pos__(self):  # noqa: D105
@@ -879,7 +910,14 @@ class _BaseSourceEstimate(ToDataFrameMixin, TimeMixin):
 
     def copy(self):
         """Return copy of source estimate instance."""
-        return copy.deepcopy(self)
+        # the kernel is never modified inplace, so copies can share it
+        kernel, self._kernel = self._kernel, None
+        try:
+            stc = copy.deepcopy(self)
+        finally:
+            self._kernel = kernel
+        stc._kernel = kernel
+        return stc
 
     def bin(self, width, tstart=None, tstop=None, func=np.mean):
         """Return a source estimate object with data summarized over time bins.
@@ -907,6 +945,12 @@ class _BaseSourceEstimate(ToDataFrameMixin, TimeMixin):
         -------
         stc : SourceEstimate | VectorSourceEstimate
             The binned source estimate.
+
+        Notes
+        -----
+        If the data are stored as ``(kernel, sens_data)`` and ``func`` is
+        :func:`numpy.mean` or :func:`numpy.sum`, the binning is done on the
+        sensor data and the result keeps this representation.
         """
         if tstart is None:
             tstart = self.tmin
@@ -915,14 +959,20 @@ class _BaseSourceEstimate(ToDataFrameMixin, TimeMixin):
 
         times = np.arange(tstart, tstop + self.tstep, width)
         nt = len(times) - 1
-        data = np.empty(self.shape[:-1] + (nt,), dtype=self.data.dtype)
+        # linear summaries can be computed in sensor space
+        in_sens = self._kernel is not None and func in (np.mean, np.sum)
+        data = self._sens_data if in_sens else self.data
+        binned = np.empty(data.shape[:-1] + (nt,), dtype=data.dtype)
         for i in range(nt):
             idx = (self.times >= times[i]) & (self.times < times[i + 1])
-            data[..., i] = func(self.data[..., idx], axis=-1)
+            binned[..., i] = func(data[..., idx], axis=-1)
 
         tmin = times[0] + width / 2.
         stc = self.copy()
-        stc._data = data
+        if in_sens:
+            stc._sens_data = binned
+        else:
+            stc._data = binned
         stc.tmin = tmin
         stc.tstep = width
         return stc
@@ -2602,7 +2652,7 @@ def _temporary_vertices(src, vertices):
             s['vertno'] = v
 
 
-def _prepare_label_extraction(stc, labels, src, mode, allow_empty):
+def _prepare_label_extraction(vertno, labels, src, mode, allow_empty):
     """Prepare indices and flips for extract_label_time_course."""
     # if src is a mixed src space, the first 2 src spaces are surf type and
     # the other ones are vol type. For mixed source space n_labels will be the
@@ -2610,14 +2660,13 @@ def _prepare_label_extraction(stc, labels, src, mode, allow_empty):
     # of vol src space
     from .label import label_sign_flip
 
-    # get vertices from source space, they have to be the same as in the stcs
-    vertno = stc.vertices
+    # the vertices have to be the same as in the source space
     nvert = [len(vn) for vn in vertno]
 
     # do the initialization
     label_vertidx = list()
     label_flip = list()
-    for s, v, hemi in zip(src, stc.vertices, ('left', 'right')):
+    for s, v, hemi in zip(src, vertno, ('left', 'right')):
         n_missing = (~np.in1d(v, s['vertno'])).sum()
         if n_missing:
             raise ValueError('%d/%d %s hemisphere stc vertices missing from '
@@ -2660,7 +2709,7 @@ def _prepare_label_extraction(stc, labels, src, mode, allow_empty):
             #
             # So if we override vertno with the stc vertices, it will pick
             # the correct normals.
-            with _temporary_vertices(src, stc.vertices):
+            with _temporary_vertices(src, vertno):
                 this_flip = label_sign_flip(label, src[:2])[:, None]
 
         label_vertidx.append(this_vertidx)
@@ -2669,6 +2718,29 @@ def _prepare_label_extraction(stc, labels, src, mode, allow_empty):
     return label_vertidx, label_flip
 
 
+def _extract_label_rows(data, func, label_vertidx, src_flip, n_labels, nvert,
+                        mixed):
+    """Combine the rows of the data (or kernel) within each label."""
+    label_tc = np.zeros((n_labels, data.shape[1]), dtype=data.dtype)
+    for i, (vertidx, flip) in enumerate(zip(label_vertidx, src_flip)):
+        if vertidx is not None:
+            label_tc[i] = func(flip, data[vertidx, :])
+
+    # extract label time series for the vol src space
+    if mixed:
+        n_aparc = len(label_vertidx)
+        v1 = nvert[0] + nvert[1]
+        for i, nv in enumerate(nvert[2:]):
+
+            v2 = v1 + nv
+            v = range(v1, v2)
+            if nv != 0:
+                label_tc[n_aparc + i] = np.mean(data[v, :], axis=0)
+
+            v1 = v2
+    return label_tc
+
+
 def _gen_extract_label_time_course(stcs, labels, src, mode='mean',
                                    allow_empty=False, verbose=None):
     # loop through source estimates and extract time series
@@ -2685,13 +2757,13 @@ def _gen_extract_label_time_course(stcs, labels, src, mode='mean',
         n_labels = n_aparc + n_aseg
     else:
         n_labels = len(labels)
-    vertno = None
+    vertno = kernel = label_kernel = None
     for stc in stcs:
         if vertno is None:
             vertno = copy.deepcopy(stc.vertices)
             nvert = [len(v) for v in vertno]
             label_vertidx, src_flip = _prepare_label_extraction(
-                stc, labels, src, mode, allow_empty)
+                stc.vertices, labels, src, mode, allow_empty)
         # make sure the stc is compatible with the source space
         for i in range(len(vertno)):
             if len(stc.vertices[i]) != nvert[i]:
@@ -2711,24 +2783,19 @@ def _gen_extract_label_time_course(stcs, labels, src, mode='mean',
         logger.info('Extracting time courses for %d labels (mode: %s)'
                     % (n_labels, mode))
 
-        # do the extraction
-        label_tc = np.zeros((n_labels, stc.data.shape[1]),
-                            dtype=stc.data.dtype)
-        for i, (vertidx, flip) in enumerate(zip(label_vertidx, src_flip)):
-            if vertidx is not None:
-                label_tc[i] = func(flip, stc.data[vertidx, :])
-
-        # extract label time series for the vol src space
-        if len(src) > 2:
-            v1 = nvert[0] + nvert[1]
-            for i, nv in enumerate(nvert[2:]):
-
-                v2 = v1 + nv
-                v = range(v1, v2)
-                if nv != 0:
-                    label_tc[n_aparc + i] = np.mean(stc.data[v, :], axis=0)
-
-                v1 = v2
+        if stc._kernel is not None and mode in ('mean', 'mean_flip'):
+            # these modes are linear, so the label kernels can be combined
+            # once and applied to the sensor data
+            if stc._kernel is not kernel:
+                kernel = stc._kernel
+                label_kernel = _extract_label_rows(
+                    kernel, func, label_vertidx, src_flip, n_labels, nvert,
+                    len(src) > 2)
+            label_tc = np.dot(label_kernel, stc._sens_data)
+        else:
+            label_tc = _extract_label_rows(
+                stc.data, func, label_vertidx, src_flip, n_labels, nvert,
+                len(src) > 2)
 
         # this is a generator!
         yield label_tc
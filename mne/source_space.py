@@ -2369,6 +2369,11 @@ def add_source_space_distances(src, dist_limit=np.inf, n_jobs=1, verbose=None):
     takes about 10 minutes to compute all distances (`dist_limit = np.inf`).
     With `dist_limit = 0.007`, computing distances takes about 1 minute.
 
+    Distances are computed for chunks of source points and only those within
+    ``dist_limit`` are kept (in sparse form), so memory usage scales with the
+    number of stored distances. Using a finite ``dist_limit`` thus also
+    greatly reduces the memory needed.
+
     We recommend computing distances once per source space and then saving
     the source space to disk, as the computed distances will automatically be
     stored along with the source space data for future use.
@@ -2401,23 +2406,21 @@ def add_source_space_distances(src, dist_limit=np.inf, n_jobs=1, verbose=None):
                      for r in np.array_split(np.arange(len(s['vertno'])),
                                              n_jobs))
         # deal with indexing so we can add patch info
-        min_idx = np.array([dd[1] for dd in d])
-        min_dist = np.array([dd[2] for dd in d])
+        min_idx = np.array([dd[3] for dd in d])
+        min_dist = np.array([dd[4] for dd in d])
         midx = np.argmin(min_dist, axis=0)
         range_idx = np.arange(len(s['rr']))
         min_dist = min_dist[midx, range_idx]
         min_idx = min_idx[midx, range_idx]
         min_dists.append(min_dist)
         min_idxs.append(min_idx)
-        # now actually deal with distances, convert to sparse representation
-        d = np.concatenate([dd[0] for dd in d]).ravel()  # already float32
-        idx = d > 0
-        d = d[idx]
-        i, j = np.meshgrid(s['vertno'], s['vertno'])
-        i = i.ravel()[idx]
-        j = j.ravel()[idx]
+        # now actually deal with distances, already in sparse form
+        i, j, d = [np.concatenate([dd[k] for dd in d]) for k in range(3)]
         d = sparse.csr_matrix((d, (i, j)),
                               shape=(s['np'], s['np']), dtype=np.float32)
+        logger.info('    %d non-zero distances stored (%0.1f MB)'
+                    % (d.nnz, (d.data.nbytes + d.indices.nbytes +
+                               d.indptr.nbytes) / 1024. ** 2))
         s['dist'] = d
         s['dist_limit'] = np.array([dist_limit], np.float32)
 
@@ -2433,33 +2436,43 @@ def add_source_space_distances(src, dist_limit=np.inf, n_jobs=1, verbose=None):
     return src
 
 
-def _do_src_distances(con, vertno, run_inds, limit):
-    """Compute source space distances in chunks."""
+def _do_src_distances(con, vertno, run_inds, limit, chunk_size=20):
+    """Compute source space distances in chunks.
+
+    Only the distances that are non-zero and within ``limit`` are kept, so
+    the memory used scales with the number of stored distances rather than
+    with ``len(run_inds) * len(vertno)``.
+    """
     from scipy.sparse.csgraph import dijkstra
     if limit < np.inf:
         func = partial(dijkstra, limit=limit)
     else:
         func = dijkstra
-    chunk_size = 20  # save memory by chunking (only a little slower)
-    lims = np.r_[np.arange(0, len(run_inds), chunk_size), len(run_inds)]
-    n_chunks = len(lims) - 1
-    # eventually we want this in float32, so save memory by only storing 32-bit
-    d = np.empty((len(run_inds), len(vertno)), np.float32)
-    min_dist = np.empty((n_chunks, con.shape[0]))
-    min_idx = np.empty((n_chunks, con.shape[0]), np.int32)
+    rows, cols, data = list(), list(), list()
+    min_dist = np.full(con.shape[0], np.inf)
+    min_idx = np.zeros(con.shape[0], np.int32)
     range_idx = np.arange(con.shape[0])
-    for li, (l1, l2) in enumerate(zip(lims[:-1], lims[1:])):
-        idx = vertno[run_inds[l1:l2]]
+    for l1 in range(0, len(run_inds), chunk_size):
+        idx = vertno[run_inds[l1:l1 + chunk_size]]
         out = func(con, indices=idx)
         midx = np.argmin(out, axis=0)
-        min_idx[li] = idx[midx]
-        min_dist[li] = out[midx, range_idx]
-        d[l1:l2] = out[:, vertno]
-    midx = np.argmin(min_dist, axis=0)
-    min_dist = min_dist[midx, range_idx]
-    min_idx = min_idx[midx, range_idx]
-    d[d == np.inf] = 0  # scipy will give us np.inf for uncalc. distances
-    return d, min_idx, min_dist
+        this_dist = out[midx, range_idx]
+        # keep the first source on ties, like an argmin over all sources
+        better = this_dist < min_dist
+        min_idx[better] = idx[midx[better]]
+        min_dist[better] = this_dist[better]
+        # eventually we want this in float32, so only store 32-bit
+        out = out[:, vertno].astype(np.float32)
+        # scipy gives np.inf for distances beyond the limit
+        ii, jj = np.nonzero((out > 0) & np.isfinite(out))
+        rows.append(vertno[jj].astype(np.int32))
+        cols.append(idx[ii].astype(np.int32))
+        data.append(out[ii, jj])
+    rows, cols, data = [np.concatenate(x) if len(x) else
+                        np.zeros(0, dtype) for x, dtype in
+                        ((rows, np.int32), (cols, np.int32),
+                         (data, np.float32))]
+    return rows, cols, data, min_idx, min_dist
 
 
 def get_volume_labels_from_aseg(mgz_fname, return_colors=False):
@@ -1011,7 +1011,7 @@ def decimate_surface(points, triangles, n_triangles):
 
 @verbose
 def read_morph_map(subject_from, subject_to, subjects_dir=None, xhemi=False,
-                   verbose=None):
+                   n_jobs=1, verbose=None):
     """Read morph map.
 
     Morph maps can be generated with mne_make_morph_maps. If one isn't
@@ -1030,6 +1030,10 @@ def read_morph_map(subject_from, subject_to, subjects_dir=None, xhemi=False,
         Morph across hemisphere. Currently only implemented for
         ``subject_to == subject_from``. See notes of
         :func:`mne.compute_source_morph`.
+    %(n_jobs)s
+        Only used when the morph maps need to be created.
+
+        .. versionadded:: 0.20
     %(verbose)s
 
     Returns
@@ -1071,13 +1075,14 @@ def read_morph_map(subject_from, subject_to, subjects_dir=None, xhemi=False,
     logger.info('Morph map "%s" does not exist, creating it and saving it to '
                 'disk' % fname)
     logger.info(log_msg % (subject_from, subject_to))
-    mmap_1 = _make_morph_map(subject_from, subject_to, subjects_dir, xhemi)
+    mmap_1 = _make_morph_map(subject_from, subject_to, subjects_dir, xhemi,
+                             n_jobs)
     if subject_to == subject_from:
         mmap_2 = None
     else:
         logger.info(log_msg % (subject_to, subject_from))
         mmap_2 = _make_morph_map(subject_to, subject_from, subjects_dir,
-                                 xhemi)
+                                 xhemi, n_jobs)
     _write_morph_map(fname, subject_from, subject_to, mmap_1, mmap_2)
     return mmap_1
 
@@ -1178,16 +1183,12 @@ def _get_tri_supp_geom(surf):
                 a=a, b=b, c=c, mat=mat, nn=nn)
 
 
-def _make_morph_map(subject_from, subject_to, subjects_dir, xhemi):
+def _make_morph_map(subject_from, subject_to, subjects_dir, xhemi, n_jobs=1):
     """Construct morph map from one subject to another.
 
     Note that this is close, but not exactly like the C version.
     For example, parts are more accurate due to double precision,
     so expect some small morph-map differences!
-
-    Note: This seems easily parallelizable, but the overhead
-    of pickling all the data structures makes it less efficient
-    than just running on a single core :(
     """
     subjects_dir = get_subjects_dir(subjects_dir)
     if xhemi:
@@ -1198,12 +1199,12 @@ def _make_morph_map(subject_from, subject_to, subjects_dir, xhemi):
         hemis = (('lh', 'lh'), ('rh', 'rh'))
 
     return [_make_morph_map_hemi(subject_from, subject_to, subjects_dir,
-                                 reg % hemi_from, reg % hemi_to)
+                                 reg % hemi_from, reg % hemi_to, n_jobs)
             for hemi_from, hemi_to in hemis]
 
 
 def _make_morph_map_hemi(subject_from, subject_to, subjects_dir, reg_from,
-                         reg_to):
+                         reg_to, n_jobs=1):
     """Construct morph map for one hemisphere."""
     # add speedy short-circuit for self-maps
     if subject_from == subject_to and reg_from == reg_to:
@@ -1228,23 +1229,67 @@ def _make_morph_map_hemi(subject_from, subject_to, subjects_dir, reg_from,
     assert from_pt_tris.ndim == 1
     assert from_pt_lens[-1] == len(from_pt_tris)
 
-    # find triangle in which point lies and assoc. weights
-    tri_inds = []
-    weights = []
+    # find triangle in which point lies and assoc. weights, processing
+    # chunks of points in parallel
     tri_geom = _get_tri_supp_geom(dict(rr=from_rr, tris=from_tri))
-    weights, tri_inds = _find_nearest_tri_pts(
-        to_rr, from_pt_tris, from_pt_lens, run_all=False, reproject=False,
-        **tri_geom)
+    parallel, p_fun, n_jobs = parallel_func(_find_morph_tri_pts, n_jobs)
+    bounds = np.linspace(0, len(to_rr), n_jobs + 1).astype(int)
+    out = parallel(
+        p_fun(to_rr[start:stop],
+              from_pt_tris[from_pt_lens[start]:from_pt_lens[stop]],
+              from_pt_lens[start:stop + 1] - from_pt_lens[start], tri_geom)
+        for start, stop in zip(bounds[:-1], bounds[1:]))
+    weights = np.concatenate([o[0] for o in out])
+    tri_inds = np.concatenate([o[1] for o in out])
 
     nn_idx = from_tri[tri_inds]
-    weights = np.array(weights)
-
     row_ind = np.repeat(np.arange(len(to_rr)), 3)
     this_map = csr_matrix((weights.ravel(), (row_ind, nn_idx.ravel())),
                           shape=(len(to_rr), len(from_rr)))
     return this_map
 
 
+def _find_morph_tri_pts(rrs, pt_triss, pt_lens, tri_geom, chunk_size=10000):
+    """Find the triangles containing points among their candidates.
+
+    This is equivalent to ``_find_nearest_tri_pts(..., run_all=False)``, but
+    the (usual) case of a point lying within one of its candidate triangles
+    is evaluated for all points at once. Only the remaining points go
+    through the per-point search.
+    """
+    assert pt_lens[0] == 0 and np.all(np.diff(pt_lens) > 0)
+    weights = np.empty((len(rrs), 3))
+    tri_idx = np.empty(len(rrs), np.int64)
+    found = np.zeros(len(rrs), bool)
+    for start in range(0, len(rrs), chunk_size):
+        stop = min(start + chunk_size, len(rrs))
+        pt_tris = pt_triss[pt_lens[start]:pt_lens[stop]]
+        lens = pt_lens[start:stop + 1] - pt_lens[start]
+        pt_idx = np.repeat(np.arange(stop - start), np.diff(lens))
+        drs = rrs[start:stop][pt_idx] - tri_geom['r1'][pt_tris]
+        pqs = einsum('ijk,ik->ij', tri_geom['r1213'][pt_tris], drs)
+        pqs = einsum('ijk,ik->ij', tri_geom['mat'][pt_tris], pqs)
+        dists = np.abs(einsum('ij,ij->i', drs, tri_geom['nn'][pt_tris]))
+        inside = ((pqs >= 0).all(-1) & (pqs <= 1).all(-1) &
+                  (pqs.sum(-1) < 1))
+        dists[~inside] = np.inf
+        # closest containing triangle for each point (first one on ties)
+        best = np.lexsort((dists, pt_idx))[lens[:-1]]
+        this_found = np.isfinite(dists[best])
+        p, q = pqs[best].T
+        weights[start:stop] = np.array([1 - p - q, p, q]).T
+        tri_idx[start:stop] = pt_tris[best]
+        found[start:stop] = this_found
+    missing = np.where(~found)[0]
+    if len(missing) > 0:
+        pt_tris = [pt_triss[pt_lens[ii]:pt_lens[ii + 1]] for ii in missing]
+        lens = np.cumsum([0] + [len(x) for x in pt_tris])
+        weights[missing], tri_idx[missing] = _find_nearest_tri_pts(
+            rrs[missing], np.concatenate(pt_tris), lens, run_all=False,
+            reproject=False, **tri_geom)
+    return weights, tri_idx
+
+
 @jit(parallel=True)
 def _find_nearest_tri_pts(rrs, pt_triss, pt_lens,
                           a, b, c, nn, r1, r12, r13, r1213, mat,
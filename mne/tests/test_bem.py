@@ -6,6 +6,7 @@ from copy import deepcopy
 from os import remove, makedirs
 import os.path as op
 from shutil import copy
+import warnings
 
 import numpy as np
 import pytest
@@ -23,8 +24,10 @@ from mne.utils import (run_tests_if_main, _TempDir, catch_logging,
                        requires_freesurfer, requires_nibabel)
 from mne.bem import (_ico_downsample, _get_ico_map, _order_surfaces,
                      _assert_complete_surface, _assert_inside,
-                     _check_surface_size, _bem_find_surface, make_flash_bem)
-from mne.surface import read_surface
+                     _check_surface_size, _bem_find_surface, make_flash_bem,
+                     _lin_pot_coeff)
+from mne.surface import (read_surface, _get_ico_surface, complete_surface_info,
+                         _fast_cross_nd_sum)
 from mne.io import read_info
 
 fname_raw = op.join(op.dirname(__file__), '..', 'io', 'tests', 'data',
@@ -207,6 +210,93 @@ def test_bem_solution():
         solution_read = read_bem_solution(fname_temp)
         _compare_bem_solutions(solution, solution_c)
         _compare_bem_solutions(solution_read, solution_c)
+        # single precision storage and parallel coefficient assembly
+        solution_32 = make_bem_solution(model, dtype='float32', n_jobs=2)
+        assert solution_32['solution'].dtype == np.float32
+        _compare_bem_solutions(solution_32, solution_c)
+    with pytest.raises(ValueError, match="Invalid value for the 'dtype'"):
+        make_bem_solution(model, dtype='float16')
+
+
+def _lin_pot_coeff_loop(fros, tri_rr, tri_nn, tri_area):
+    """Compute the linear potential coefficients for one triangle."""
+    v1, v2, v3 = [rr[np.newaxis] - fros for rr in tri_rr]
+    triples = _fast_cross_nd_sum(v1, v2, v3)
+    l1, l2, l3 = [np.linalg.norm(v, axis=1) for v in (v1, v2, v3)]
+    ss = (l1 * l2 * l3 + np.sum(v1 * v2, axis=1) * l3 +
+          np.sum(v1 * v3, axis=1) * l2 + np.sum(v2 * v3, axis=1) * l1)
+    solids = np.arctan2(triples, ss)
+    bad_mask = np.abs(solids) < np.pi / 1e6
+    for ll in (l1, l2, l3):
+        ll[bad_mask] = 1.
+
+    def beta(rk, rk_norm, rk1, rk1_norm):
+        rkk1 = (rk1[0] - rk[0]) / np.linalg.norm(rk1[0] - rk[0])
+        return np.log((rk_norm + np.dot(rk, rkk1)) /
+                      (rk1_norm + np.dot(rk1, rkk1))) / \
+            np.linalg.norm(rk1[0] - rk[0])
+
+    b = [beta(v1, l1, v2, l2), beta(v2, l2, v3, l3), beta(v3, l3, v1, l1)]
+    vec_omega = ((b[2] - b[0])[:, np.newaxis] * v1 +
+                 (b[0] - b[1])[:, np.newaxis] * v2 +
+                 (b[1] - b[2])[:, np.newaxis] * v3)
+    area2 = 2.0 * tri_area
+    yys, idx = [v1, v2, v3], [0, 1, 2, 0, 2]
+    omega = np.zeros((len(fros), 3))
+    for k in range(3):
+        diff = yys[idx[k - 1]] - yys[idx[k + 1]]
+        zdots = _fast_cross_nd_sum(yys[idx[k + 1]], yys[idx[k - 1]], tri_nn)
+        omega[:, k] = -(area2 * zdots * 2. * solids -
+                        triples * (diff * vec_omega).sum(-1)) / area2 ** 2
+    omega[bad_mask] = 0.
+    return omega
+
+
+def test_lin_pot_coeff():
+    """Test the vectorized linear potential coefficients."""
+    surf = _get_ico_surface(2)
+    surf['rr'] *= 0.09
+    surf = complete_surface_info(surf, verbose=False)
+    tri_rr = surf['rr'][surf['tris']]
+    fros = np.array([[0., 0., 0.], [0.01, 0.02, -0.03], [0., 0., 0.2]])
+    omega = _lin_pot_coeff(fros, tri_rr, surf['tri_nn'], surf['tri_area'])
+    assert omega.shape == (3, len(surf['tris']), 3)
+    # the corner weights add up to the solid angle of each triangle
+    assert_allclose(omega.sum(axis=(1, 2)), [-4 * np.pi, -4 * np.pi, 0.],
+                    atol=1e-12)
+    # blocks of field points give the same coefficients
+    omega_single = np.concatenate([
+        _lin_pot_coeff(fro[np.newaxis], tri_rr, surf['tri_nn'],
+                       surf['tri_area']) for fro in fros])
+    assert_allclose(omega_single, omega, atol=1e-13)
+    # field points on the mesh vertices (as for the self-surface blocks)
+    with warnings.catch_warnings(record=True):
+        warnings.simplefilter('error')
+        omega = _lin_pot_coeff(surf['rr'], tri_rr, surf['tri_nn'],
+                               surf['tri_area'])
+        omega_loop = np.array([
+            _lin_pot_coeff_loop(surf['rr'], this_rr, this_nn, this_area)
+            for this_rr, this_nn, this_area in zip(
+                tri_rr, surf['tri_nn'], surf['tri_area'])]).transpose(1, 0, 2)
+    assert np.isfinite(omega).all()
+    on_tri = (np.arange(len(surf['rr']))[:, np.newaxis, np.newaxis] ==
+              surf['tris'][np.newaxis]).any(-1)
+    assert (omega[on_tri] == 0).all()
+    assert_allclose(omega, omega_loop, rtol=1e-8, atol=1e-12)
+
+
+def test_bem_solution_memory_warning(monkeypatch):
+    """Test the warning about the memory needed for a BEM solution."""
+    from mne import bem
+    surf = _get_ico_surface(2)
+    surf.update(rr=surf['rr'] * 0.09, np=len(surf['rr']),
+                ntri=len(surf['tris']), id=FIFF.FIFFV_BEM_SURF_ID_BRAIN,
+                coord_frame=FIFF.FIFFV_COORD_MRI, sigma=0.3)
+    solution = make_bem_solution([surf], dtype='float32')
+    assert solution['solution'].dtype == np.float32
+    monkeypatch.setattr(bem, '_get_available_memory', lambda: 1)
+    with pytest.warns(RuntimeWarning, match='requires about .* but only'):
+        make_bem_solution([surf], dtype='float32')
 
 
 def test_fit_sphere_to_headshape():
@@ -5,7 +5,7 @@
 import os.path as op
 
 import numpy as np
-from numpy.testing import assert_allclose
+from numpy.testing import assert_allclose, assert_array_equal
 from scipy.interpolate import interp1d
 import pytest
 
@@ -323,6 +323,52 @@ def test_simulate_calculate_chpi_positions():
         raw, t_step_min=raw.info['sfreq'] * head_pos_sfreq_quotient,
         t_step_max=raw.info['sfreq'] * head_pos_sfreq_quotient, t_window=1.0)
     _assert_quats(quats, dev_head_pos, dist_tol=0.001, angle_tol=1.)
+    # fitting all coils jointly using gradients
+    quats_lbfgs = _calculate_chpi_positions(
+        raw, t_step_min=raw.info['sfreq'] * head_pos_sfreq_quotient,
+        t_step_max=raw.info['sfreq'] * head_pos_sfreq_quotient, t_window=1.0,
+        optimizer='lbfgs')
+    _assert_quats(quats_lbfgs, dev_head_pos, dist_tol=0.001, angle_tol=1.)
+    assert_allclose(quats_lbfgs[:, 4:7], quats[:, 4:7], atol=5e-5)
+    with pytest.raises(ValueError, match='Invalid value for the .optimizer'):
+        _calculate_chpi_positions(raw, optimizer='foo')
+
+
+def test_split_chpi_blocks():
+    """Test bounding the blocks of cHPI windows read at once."""
+    from mne.chpi import _split_chpi_blocks
+    starts = np.arange(0, 1000, 10)
+    for n_block, max_span in ((7, 1000), (1000, 95), (7, 95), (1, 50)):
+        blocks = _split_chpi_blocks(starts, 50, n_block, max_span)
+        assert_array_equal(np.concatenate(blocks), np.arange(len(starts)))
+        for block in blocks:
+            assert 1 <= len(block) <= n_block
+            assert starts[block[-1]] + 50 - starts[block[0]] <= max_span
+    # the span of consecutive windows (not their count) limits the block
+    blocks = _split_chpi_blocks(np.arange(100), 10, 1000, 20)
+    assert all(len(block) == 11 for block in blocks[:-1])
+
+
+@testing.requires_testing_data
+def test_fit_chpi_amplitudes_batch(monkeypatch):
+    """Test batched cHPI amplitude fitting against single windows."""
+    from mne import chpi
+    raw = read_raw_fif(chpi_fif_fname, allow_maxshield='yes')
+    raw = raw.crop(0., 2.).load_data()
+    hpi = chpi._setup_hpi_struct(raw.info, int(round(0.2 * raw.info['sfreq'])))
+    starts = np.arange(-100, len(raw.times) - 100, 37)
+    time_sls = [slice(max(start, 0),
+                      min(start + hpi['n_window'], len(raw.times)))
+                for start in starts]
+    fit_times = np.arange(len(time_sls), dtype=float)
+    sin_fits = chpi._fit_chpi_amplitudes_batch(raw, time_sls, hpi, fit_times)
+    assert len(sin_fits) == len(time_sls)
+    # one window at a time, with its own model for short windows
+    monkeypatch.setattr(chpi, '_CHPI_AMP_BLOCK_SIZE', 1)
+    for sl, fit_time, sin_fit in zip(time_sls, fit_times, sin_fits):
+        want = chpi._fit_cHPI_amplitudes(raw, sl, hpi, fit_time)
+        assert sin_fit.shape == (hpi['n_freqs'], len(hpi['meg_picks']))
+        assert_allclose(sin_fit, want, rtol=1e-7, atol=1e-10)
 
 
 @testing.requires_testing_data
@@ -12,7 +12,7 @@ from mne import (read_dipole, read_forward_solution,
                  pick_info, EvokedArray, read_source_spaces, make_ad_hoc_cov,
                  make_forward_solution, Dipole, DipoleFixed, Epochs,
                  make_fixed_length_events, Evoked)
-from mne.dipole import get_phantom_dipoles
+from mne.dipole import get_phantom_dipoles, _get_dipole_chunks
 from mne.simulation import simulate_evoked
 from mne.datasets import testing
 from mne.utils import run_tests_if_main, requires_mne, run_subprocess
@@ -179,6 +179,42 @@ def test_dipole_fitting(tmpdir):
     assert gofs[0] * factor <= gofs[1] * 2, 'gof: %s' % gofs
 
 
+@testing.requires_testing_data
+def test_dipole_fitting_warm_start(monkeypatch):
+    """Test dipole fitting with warm starts and blocks of time points."""
+    tpeak = 0.073
+    sphere = make_sphere_model(head_radius=0.1)
+    evoked = read_evokeds(fname_evo, baseline=(None, 0))[0]
+    evoked.pick_types(meg=True)
+    evoked.crop(tpeak - 0.005, tpeak + 0.005)
+    assert len(evoked.times) > 3
+    cov = read_cov(fname_cov)
+    # several warm-start blocks, split differently across jobs
+    monkeypatch.setattr('mne.dipole._WARM_START_BLOCK', 2)
+    dip_cold = fit_dipole(evoked, cov, sphere)[0]
+    dip_par = fit_dipole(evoked, cov, sphere, n_jobs=2)[0]
+    assert_allclose(dip_par.pos, dip_cold.pos)
+    dip_warm = fit_dipole(evoked, cov, sphere, warm_start=True)[0]
+    assert_allclose(dip_warm.pos, dip_cold.pos, atol=1e-3)
+    assert_allclose(dip_warm.gof, dip_cold.gof, atol=0.1)
+    for n_jobs in (2, 3):
+        dip_warm_par = fit_dipole(evoked, cov, sphere, n_jobs=n_jobs,
+                                  warm_start=True)[0]
+        assert_array_equal(dip_warm_par.pos, dip_warm.pos)
+        assert_array_equal(dip_warm_par.gof, dip_warm.gof)
+
+
+def test_dipole_chunks():
+    """Test splitting time points across jobs for dipole fitting."""
+    for n_times, n_jobs, block_size in ((30, 8, 1), (30, 8, 20), (5, 8, 1),
+                                        (45, 2, 20)):
+        chunks = _get_dipole_chunks(n_times, n_jobs, block_size)
+        assert len(chunks) == min(n_jobs, -(-n_times // block_size))
+        idx = np.concatenate([np.arange(n_times)[sl] for sl in chunks])
+        assert_array_equal(idx, np.arange(n_times))
+        assert all(sl.start % block_size == 0 for sl in chunks)
+
+
 @testing.requires_testing_data
 def test_dipole_fitting_fixed(tmpdir):
     """Test dipole fitting with a fixed position."""
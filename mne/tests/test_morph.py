@@ -394,6 +394,99 @@ def test_volume_source_morph(tmpdir):
     with pytest.raises(ValueError, match='vertices do not match between morp'):
         source_morph_vol.apply(stc_vol_bad)
 
+    # precomputed sparse matrix (on a coarse source space to keep it fast)
+    src_small = setup_volume_source_space(
+        'sample', pos=15., sphere=(0., 0., 0., 60.), mri=fname_brain,
+        subjects_dir=subjects_dir)
+    source_morph_vol = compute_source_morph(
+        src_small, 'sample', 'sample', subjects_dir=subjects_dir, **kwargs)
+    vertices = src_small[0]['vertno']
+    stc_vol_small = VolSourceEstimate(
+        np.random.RandomState(0).randn(len(vertices), 3), vertices, 0., 1.)
+    stc_vol_small_morphed = source_morph_vol.apply(stc_vol_small)
+    assert source_morph_vol.vol_morph_mat is None
+    source_morph_vol.compute_vol_morph_mat(n_jobs=2)
+    vol_morph_mat = source_morph_vol.vol_morph_mat
+    assert vol_morph_mat.shape == (
+        len(source_morph_vol.vertices_to), len(vertices))
+    assert_allclose(source_morph_vol.apply(stc_vol_small).data,
+                    stc_vol_small_morphed.data, atol=1e-6 *
+                    np.abs(stc_vol_small_morphed.data).max())
+    # columns are the morphed unit impulses
+    for k in (0, len(vertices) // 2, len(vertices) - 1):
+        data = np.zeros((len(vertices), 1))
+        data[k] = 1.
+        col = source_morph_vol._morph_one_vol(VolSourceEstimate(
+            data, vertices, 0., 1.))[source_morph_vol.vertices_to]
+        assert_allclose(vol_morph_mat[:, k].toarray()[:, 0], col)
+    source_morph_vol.save(tmpdir.join('vol_mat'))
+    source_morph_vol_r = read_source_morph(tmpdir.join('vol_mat-morph.h5'))
+    assert_allclose(source_morph_vol_r.vol_morph_mat.toarray(),
+                    vol_morph_mat.toarray())
+    assert_allclose(source_morph_vol_r.apply(stc_vol_small).data,
+                    source_morph_vol.apply(stc_vol_small).data)
+    with pytest.raises(ValueError, match='only be computed for volume'):
+        SourceMorph(None, 'sample', 'surface', None, None, None, None, None,
+                    False, None, [], None, None, None, None,
+                    dict()).compute_vol_morph_mat()
+
+
+def test_morph_apply_batch():
+    """Test morphing many source estimates at once."""
+    from scipy import sparse
+    rng = np.random.RandomState(0)
+    vertices = [np.arange(10), np.arange(5)]
+    vertices_to = [np.arange(7), np.arange(6)]
+    morph_mat = sparse.random(13, 15, density=0.3, format='csr',
+                              random_state=0)
+    morph = SourceMorph('sample', 'fsaverage', 'surface', None, None, None,
+                        None, None, False, morph_mat, vertices_to, None, None,
+                        None, None, dict(vertices_from=vertices))
+    stcs = [SourceEstimate(rng.randn(15, 4 + ii), vertices, ii, 0.1, 'sample')
+            for ii in range(5)]
+    want = [morph.apply(stc) for stc in stcs]
+    for batch_size in (1, 2, 10):
+        got = morph.apply_batch(stcs, batch_size=batch_size)
+        assert isinstance(got, list)
+        assert len(got) == len(want)
+        for g, w in zip(got, want):
+            assert g.subject == 'fsaverage'
+            assert g.tmin == w.tmin
+            assert_array_equal(g.vertices[1], w.vertices[1])
+            assert_allclose(g.data, w.data)
+    # generators give generators
+    got = morph.apply_batch((stc for stc in stcs), batch_size=3)
+    assert not isinstance(got, list)
+    for g, w in zip(got, want):
+        assert_allclose(g.data, w.data)
+    # vector and kernel-factored estimates
+    stc_vec = VectorSourceEstimate(rng.randn(15, 3, 4), vertices, 0, 0.1)
+    kernel, sens_data = rng.randn(15, 2), rng.randn(2, 6)
+    stc_k = SourceEstimate((kernel, sens_data), vertices, 0, 0.1)
+    got = morph.apply_batch([stc_vec, stc_k, stcs[0]])
+    assert isinstance(got[0], VectorSourceEstimate)
+    assert_allclose(got[0].data, morph.apply(stc_vec).data)
+    assert got[1]._kernel is not None
+    assert_allclose(got[1].data, morph_mat * (kernel @ sens_data))
+    assert_allclose(got[2].data, want[0].data)
+    # the subject is checked for estimates morphed one by one as well
+    stc_k.subject = 'fsaverage'
+    with pytest.raises(ValueError, match='subject.*must match'):
+        morph.apply_batch([stcs[0], stc_k])
+    # arrays
+    data = rng.randn(3, 15, 4)
+    got = morph.apply_batch(data, batch_size=2)
+    assert got.shape == (3, 13, 4)
+    for d, g in zip(data, got):
+        assert_allclose(g, morph_mat * d)
+    with pytest.raises(ValueError, match='must match the number of vertices'):
+        morph.apply_batch(data[:, :10])
+    with pytest.raises(ValueError, match='batch_size must be a positive'):
+        morph.apply_batch(stcs, batch_size=0)
+    with pytest.raises(ValueError, match='vertices do not match'):
+        morph.apply_batch([SourceEstimate(
+            rng.randn(15, 2), [np.arange(1, 11), np.arange(5)], 0, 1)])
+
 
 @pytest.mark.slowtest
 @testing.requires_testing_data
@@ -15,7 +15,7 @@ from mne import (stats, SourceEstimate, VectorSourceEstimate,
                  spatio_temporal_src_connectivity, read_cov,
                  spatial_inter_hemi_connectivity, read_forward_solution,
                  spatial_src_connectivity, spatial_tris_connectivity,
-                 SourceSpaces, VolVectorSourceEstimate)
+                 SourceSpaces, VolVectorSourceEstimate, SourceMorph)
 from mne.datasets import testing
 from mne.fixes import fft, _get_img_fdata
 from mne.source_estimate import grade_to_tris, _get_vol_mask
@@ -657,6 +657,71 @@ def test_transform_data():
         VolSourceEstimate((kernel, sens_data), vertices)
 
 
+def test_kernel_stc_ops():
+    """Test that linear operations keep the (kernel, sens_data) storage."""
+    n_sensors, n_times = 10, 40
+    vertices = [np.arange(15), np.arange(12)]
+    n_vertices = 27
+    kernel = rng.randn(n_vertices, n_sensors)
+    sens_data = rng.randn(n_sensors, n_times)
+    sens_data_2 = rng.randn(n_sensors, n_times)
+
+    def _stcs(sens_data):
+        return (SourceEstimate(np.dot(kernel, sens_data), vertices, 0., 0.01),
+                SourceEstimate((kernel, sens_data), vertices, 0., 0.01))
+
+    def _check(stc_dense, stc_kernel):
+        assert stc_kernel._kernel is not None
+        assert stc_kernel._data is None
+        assert_allclose(stc_kernel.times, stc_dense.times)
+        assert_allclose(stc_kernel.data, stc_dense.data, atol=1e-12)
+
+    stc, stc_k = _stcs(sens_data)
+    stc_2, stc_k_2 = _stcs(sens_data_2)
+    _check(stc + stc_2, stc_k + stc_k_2)
+    _check(stc - stc_2, stc_k - stc_k_2)
+    _check((stc + stc_2) / 2., (stc_k + stc_k_2) / 2.)
+    _check(3 * stc, 3 * stc_k)
+    _check(-stc, -stc_k)
+    _check(stc.mean(), stc_k.mean())
+    _check(stc.copy().crop(0.1, 0.2), stc_k.copy().crop(0.1, 0.2))
+    _check(stc.bin(0.05), stc_k.bin(0.05))
+    _check(stc.copy().resample(50., npad=0), stc_k.copy().resample(50.,
+                                                                   npad=0))
+    assert stc_k.copy()._kernel is stc_k._kernel
+    # non-linear operations compute the data
+    stc_max = stc_k.bin(0.05, func=np.max)
+    assert stc_max._kernel is None
+    assert_allclose(stc_max.data, stc.bin(0.05, func=np.max).data)
+    stc_abs = abs(stc_k)
+    assert stc_abs._kernel is None
+    assert_allclose(stc_abs.data, abs(stc).data)
+
+    # label extraction
+    src = [dict(vertno=v, nn=rng.randn(len(v), 3), type='surf')
+           for v in vertices]
+    labels = [Label(vertices=np.arange(2, 9), hemi='lh'),
+              Label(vertices=np.arange(4, 11), hemi='rh')]
+    for mode in ('mean', 'mean_flip', 'pca_flip'):
+        want = extract_label_time_course([stc, stc_2], labels, src,
+                                         mode=mode)
+        got = extract_label_time_course([stc_k, stc_k_2], labels, src,
+                                        mode=mode)
+        assert_allclose(got, want, atol=1e-12)
+        # only the non-linear mode needs to compute the data
+        assert (stc_k_2._kernel is None) == (mode == 'pca_flip')
+
+    # morphing
+    vertices_to = [np.arange(10), np.arange(8)]
+    morph_mat = sparse.random(18, n_vertices, density=0.2, format='csr',
+                              random_state=0)
+    morph = SourceMorph(None, 'fsaverage', 'surface', None, None, None, None,
+                        None, False, morph_mat, vertices_to, None, None,
+                        None, None, dict(vertices_from=vertices))
+    stc, stc_k = _stcs(sens_data)
+    _check(morph.apply(stc), morph.apply(stc_k))
+
+
 def test_transform():
     """Test applying linear (time) transform to data."""
     # make up some data
@@ -20,13 +20,14 @@ from mne import (read_source_spaces, vertex_to_mni, write_source_spaces,
                  read_bem_solution)
 from mne.utils import (requires_nibabel, requires_freesurfer, run_subprocess,
                        modified_env, requires_mne, run_tests_if_main)
-from mne.surface import _accumulate_normals, _triangle_neighbors
+from mne.surface import (_accumulate_normals, _triangle_neighbors,
+                         _get_ico_surface, mesh_dist)
 from mne.source_space import _get_mgz_header, _read_talxfm
 from mne.source_estimate import _get_src_type
 from mne.transforms import apply_trans, invert_transform
 from mne.source_space import (get_volume_labels_from_aseg, SourceSpaces,
                               get_volume_labels_from_src,
-                              _compare_source_spaces)
+                              _compare_source_spaces, _do_src_distances)
 from mne.io.constants import FIFF
 
 data_path = testing.data_path(download=False)
@@ -170,6 +171,33 @@ def test_add_source_space_distances(tmpdir):
         assert_allclose(np.zeros_like(d.data), d.data, rtol=0, atol=1e-9)
 
 
+@pytest.mark.parametrize('limit', (np.inf, 0.2))
+def test_do_src_distances(limit):
+    """Test chunked and truncated source space distance computation."""
+    from scipy.sparse.csgraph import dijkstra
+    surf = _get_ico_surface(2)
+    con = mesh_dist(surf['tris'], surf['rr'])
+    vertno = np.arange(0, len(surf['rr']), 3)
+    want = dijkstra(con, indices=vertno).astype(np.float32)
+    want[want > limit] = 0.
+    run_inds = np.arange(5, len(vertno))
+    for chunk_size in (1, 7, len(vertno)):
+        rows, cols, data, min_idx, min_dist = _do_src_distances(
+            con, vertno, run_inds, limit, chunk_size=chunk_size)
+        assert data.dtype == np.float32
+        assert np.all((data > 0) & (data <= limit))
+        got = np.zeros((len(surf['rr']),) * 2, np.float32)
+        got[rows, cols] = data
+        assert_array_equal(got[vertno][:, vertno[run_inds]],
+                           want[run_inds][:, vertno].T)
+        assert_array_equal(got[:, vertno[:5]], 0.)
+        if limit == np.inf:
+            dists = dijkstra(con, indices=vertno[run_inds])
+            assert_allclose(min_dist, dists.min(axis=0))
+            assert_array_equal(min_idx, vertno[run_inds][
+                np.argmin(dists, axis=0)])
+
+
 @testing.requires_testing_data
 @requires_mne
 def test_discrete_source_space(tmpdir):
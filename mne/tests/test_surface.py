@@ -13,7 +13,10 @@ from mne import (read_surface, write_surface, decimate_surface, pick_types,
                  dig_mri_distances)
 from mne.surface import (read_morph_map, _compute_nearest,
                          fast_cross_3d, get_head_surf, read_curvature,
-                         get_meg_helmet_surf)
+                         get_meg_helmet_surf, _get_ico_surface,
+                         _get_tri_supp_geom, _find_nearest_tri_pts,
+                         _find_morph_tri_pts, _triangle_neighbors,
+                         _normalize_vectors)
 from mne.utils import (_TempDir, requires_mayavi, requires_tvtk, catch_logging,
                        run_tests_if_main, object_diff, traits_test)
 from mne.io import read_info
@@ -153,6 +156,46 @@ def test_make_morph_maps():
         assert (mm - sparse.eye(mm.shape[0], mm.shape[0])).sum() == 0
 
 
+def test_make_morph_maps_synthetic(tmpdir):
+    """Test morph map creation between synthetic spheres."""
+    rots = dict(a=np.eye(3),
+                b=np.array([[0.8, -0.6, 0], [0.6, 0.8, 0], [0, 0, 1]]))
+    for subject, grade in (('a', 2), ('b', 3)):
+        os.makedirs(op.join(str(tmpdir), subject, 'surf'))
+        surf = _get_ico_surface(grade)
+        for hemi in ('lh', 'rh'):
+            write_surface(op.join(str(tmpdir), subject, 'surf',
+                                  '%s.sphere.reg' % hemi),
+                          100 * np.dot(surf['rr'], rots[subject].T),
+                          surf['tris'])
+    maps = read_morph_map('a', 'b', str(tmpdir), n_jobs=2)
+    from_surf = _get_ico_surface(2)
+    to_rr = np.dot(_get_ico_surface(3)['rr'], rots['b'].T)
+    _normalize_vectors(to_rr)
+    for mm in maps:
+        assert mm.shape == (len(to_rr), len(from_surf['rr']))
+        assert_allclose(mm.sum(axis=1), 1.)
+        # the interpolated points lie close to the original ones
+        assert_allclose(mm * from_surf['rr'], to_rr, atol=0.05)
+    # the vectorized search matches the per-point one (up to ties between
+    # triangles sharing the vertex or edge a point lies on)
+    geom = _get_tri_supp_geom(from_surf)
+    nearest = _compute_nearest(from_surf['rr'], to_rr)
+    pt_tris = _triangle_neighbors(from_surf['tris'], len(from_surf['rr']))
+    pt_tris = [pt_tris[idx].astype(int) for idx in nearest]
+    pt_lens = np.cumsum([0] + [len(x) for x in pt_tris])
+    pt_tris = np.concatenate(pt_tris)
+    want = _find_nearest_tri_pts(to_rr, pt_tris, pt_lens, run_all=False,
+                                 **geom)
+    got = _find_morph_tri_pts(to_rr, pt_tris, pt_lens, geom, chunk_size=100)
+    assert np.mean(got[1] == want[1]) > 0.99
+    rows = np.repeat(np.arange(len(to_rr)), 3)
+    want, got = [sparse.csr_matrix(
+        (w.ravel(), (rows, from_surf['tris'][t].ravel())),
+        shape=maps[0].shape).toarray() for w, t in (want, got)]
+    assert_allclose(got, want, atol=1e-12)
+
+
 @testing.requires_testing_data
 def test_io_surface():
     """Test reading and writing of Freesurfer surface mesh files."""
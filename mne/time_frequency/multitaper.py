@@ -166,62 +166,71 @@ def _psd_from_mt_adaptive(x_mt, eigvals, freq_mask, max_iter=150,
     x_var = np.trapz(psd_est, dx=np.pi / n_freqs) / (2 * np.pi)
     del psd_est
 
-    # allocate space for output
-    psd = np.empty((n_signals, np.sum(freq_mask)))
-
-    # only keep the frequencies of interest
+    # only keep the frequencies of interest; the weights are real, so only
+    # the power of the tapered spectra is needed during the iterations
     x_mt = x_mt[:, :, freq_mask]
-
-    if return_weights:
-        weights = np.empty((n_signals, n_tapers, psd.shape[1]))
-
-    for i, (xk, var) in enumerate(zip(x_mt, x_var)):
-        # combine the SDFs in the traditional way in order to estimate
-        # the variance of the timeseries
-
-        # The process is to iteratively switch solving for the following
-        # two expressions:
-        # (1) Adaptive Multitaper SDF:
-        # S^{mt}(f) = [ sum |d_k(f)|^2 S_k(f) ]/ sum |d_k(f)|^2
-        #
-        # (2) Weights
-        # d_k(f) = [sqrt(lam_k) S^{mt}(f)] / [lam_k S^{mt}(f) + E{B_k(f)}]
-        #
-        # Where lam_k are the eigenvalues corresponding to the DPSS tapers,
-        # and the expected value of the broadband bias function
-        # E{B_k(f)} is replaced by its full-band integration
-        # (1/2pi) int_{-pi}^{pi} E{B_k(f)} = sig^2(1-lam_k)
-
-        # start with an estimate from incomplete data--the first 2 tapers
-        psd_iter = _psd_from_mt(xk[:2, :], rt_eig[:2, np.newaxis])
-
-        err = np.zeros_like(xk)
-        for n in range(max_iter):
-            d_k = (psd_iter / (eigvals[:, np.newaxis] * psd_iter +
-                               (1 - eigvals[:, np.newaxis]) * var))
-            d_k *= rt_eig[:, np.newaxis]
-            # Test for convergence -- this is overly conservative, since
-            # iteration only stops when all frequencies have converged.
-            # A better approach is to iterate separately for each freq, but
-            # that is a nonvectorized algorithm.
-            # Take the RMS difference in weights from the previous iterate
-            # across frequencies. If the maximum RMS error across freqs is
-            # less than 1e-10, then we're converged
-            err -= d_k
-            if np.max(np.mean(err ** 2, axis=0)) < 1e-10:
+    x_pow = (x_mt * x_mt.conj()).real
+    del x_mt
+
+    # combine the SDFs in the traditional way in order to estimate
+    # the variance of the timeseries
+
+    # The process is to iteratively switch solving for the following
+    # two expressions:
+    # (1) Adaptive Multitaper SDF:
+    # S^{mt}(f) = [ sum |d_k(f)|^2 S_k(f) ]/ sum |d_k(f)|^2
+    #
+    # (2) Weights
+    # d_k(f) = [sqrt(lam_k) S^{mt}(f)] / [lam_k S^{mt}(f) + E{B_k(f)}]
+    #
+    # Where lam_k are the eigenvalues corresponding to the DPSS tapers,
+    # and the expected value of the broadband bias function
+    # E{B_k(f)} is replaced by its full-band integration
+    # (1/2pi) int_{-pi}^{pi} E{B_k(f)} = sig^2(1-lam_k)
+    #
+    # All signals are iterated simultaneously; signals that have converged
+    # are dropped from the working arrays so that each signal stops at the
+    # same iteration it would if it were processed on its own.
+
+    # start with an estimate from incomplete data--the first 2 tapers
+    psd = 2 * np.dot(eigvals[:2], x_pow[:, :2]) / eigvals[:2].sum()
+    weights = np.empty((n_signals, n_tapers, psd.shape[1]))
+
+    eig = eigvals[np.newaxis, :, np.newaxis]
+    rt_eig = rt_eig[np.newaxis, :, np.newaxis]
+    active = np.arange(n_signals)
+    psd_iter = psd[:, np.newaxis]
+    var = x_var[:, np.newaxis, np.newaxis]
+    err = np.zeros(weights.shape)
+    for _ in range(max_iter):
+        d_k = psd_iter / (eig * psd_iter + (1 - eig) * var)
+        d_k *= rt_eig
+        # Test for convergence -- this is overly conservative, since
+        # iteration only stops when all frequencies have converged.
+        # A better approach is to iterate separately for each freq, but
+        # that is a nonvectorized algorithm.
+        # Take the RMS difference in weights from the previous iterate
+        # across frequencies. If the maximum RMS error across freqs is
+        # less than 1e-10, then we're converged
+        err -= d_k
+        converged = np.max(np.mean(err ** 2, axis=1), axis=-1) < 1e-10
+        weights[active] = d_k
+        if converged.any():
+            keep = ~converged
+            psd[active[converged]] = psd_iter[converged, 0]
+            active, x_pow, var = active[keep], x_pow[keep], var[keep]
+            d_k = d_k[keep]
+            if len(active) == 0:
                 break
 
-            # update the iterative estimate with this d_k
-            psd_iter = _psd_from_mt(xk, d_k)
-            err = d_k
-
-        if n == max_iter - 1:
-            warn('Iterative multi-taper PSD computation did not converge.')
-
-        psd[i, :] = psd_iter
-
-        if return_weights:
-            weights[i, :, :] = d_k
+        # update the iterative estimate with this d_k
+        err = d_k
+        d_k_sq = d_k * d_k
+        psd_iter = 2 * np.einsum('ijk,ijk->ik', d_k_sq, x_pow)[:, np.newaxis]
+        psd_iter /= d_k_sq.sum(axis=1, keepdims=True)
+    else:
+        psd[active] = psd_iter[:, 0]
+        warn('Iterative multi-taper PSD computation did not converge.')
 
     if return_weights:
         return psd, weights
@@ -30,6 +30,14 @@ def _welch_func(epoch, n_overlap, n_per_seg, nfft, fs, freq_mask, average,
     return psd[..., freq_mask]
 
 
+def _spect_sum_func(data, n_overlap, n_per_seg, nfft, fs, freq_mask, good):
+    """Aux function."""
+    from scipy.signal import spectrogram
+    spect = _spect_func(data, n_overlap, n_per_seg, nfft, fs, freq_mask,
+                        spectrogram)
+    return spect[..., good].sum(axis=-1)
+
+
 def _check_nfft(n, n_fft, n_per_seg, n_overlap):
     """Ensure n_fft, n_per_seg and n_overlap make sense."""
     if n_per_seg is None and n_fft > n:
@@ -46,8 +54,8 @@ def _check_nfft(n, n_fft, n_per_seg, n_overlap):
     return n_fft, n_per_seg, n_overlap
 
 
-def _check_psd_data(inst, tmin, tmax, picks, proj, reject_by_annotation=False):
-    """Check PSD data / pull arrays from inst."""
+def _check_psd_inst(inst, tmin, tmax, picks, proj):
+    """Check PSD parameters without reading the data."""
     from ..io.base import BaseRaw
     from ..epochs import BaseEpochs
     from ..evoked import Evoked
@@ -60,6 +68,14 @@ def _check_psd_data(inst, tmin, tmax, picks, proj, reject_by_annotation=False):
     if proj:
         # Copy first so it's not modified
         inst = inst.copy().apply_proj()
+    return inst, time_mask, picks
+
+
+def _check_psd_data(inst, tmin, tmax, picks, proj, reject_by_annotation=False):
+    """Check PSD data / pull arrays from inst."""
+    from ..io.base import BaseRaw
+    from ..epochs import BaseEpochs
+    inst, time_mask, picks = _check_psd_inst(inst, tmin, tmax, picks, proj)
 
     sfreq = inst.info['sfreq']
     if isinstance(inst, BaseRaw):
@@ -74,6 +90,77 @@ def _check_psd_data(inst, tmin, tmax, picks, proj, reject_by_annotation=False):
     return data, sfreq
 
 
+def _check_n_used(n_used, n_segments):
+    """Check and report the number of Welch segments left after rejection."""
+    if n_used == 0:
+        raise ValueError('All %d Welch segments overlap with bad annotations'
+                         % (n_segments,))
+    if n_used < n_segments:
+        logger.info('Omitting %d of %d Welch segments overlapping with bad '
+                    'annotations' % (n_segments - n_used, n_segments))
+
+
+# Maximum size (in bytes) of the data and spectra of one block of Welch
+# segments in _psd_welch_raw
+_PSD_BLOCK_MEMORY = 50e6
+
+
+def _psd_welch_raw(raw, start, stop, picks, fmin, fmax, n_fft, n_overlap,
+                   n_per_seg, n_jobs, reject_by_annotation):
+    """Compute the Welch PSD of Raw data by streaming through it.
+
+    Only ``n_step * n_block + n_overlap`` samples are held in memory at any
+    time, so this works for non-preloaded Raw instances of any length.
+    Welch segments overlapping a bad annotation are omitted.
+    """
+    from ..annotations import _annotations_starts_stops
+    sfreq = raw.info['sfreq']
+    n_fft, n_per_seg, n_overlap = _check_nfft(stop - start, n_fft, n_per_seg,
+                                              n_overlap)
+    win_size = n_fft / float(sfreq)
+    logger.info("Effective window size : %0.3f (s)" % win_size)
+    freqs = np.arange(n_fft // 2 + 1, dtype=float) * (sfreq / n_fft)
+    freq_mask = (freqs >= fmin) & (freqs <= fmax)
+    freqs = freqs[freq_mask]
+
+    # The segments are the same as those used by scipy.signal.welch
+    n_step = n_per_seg - n_overlap
+    n_segments = (stop - start - n_overlap) // n_step
+    seg_starts = start + n_step * np.arange(n_segments)
+    if reject_by_annotation:
+        onsets, ends = _annotations_starts_stops(raw, ['BAD'])
+        keep = ends > onsets
+        onsets, ends = onsets[keep, np.newaxis], ends[keep, np.newaxis]
+    else:
+        onsets = ends = np.empty((0, 1), int)
+    # each segment needs n_step new samples and its spectrum
+    n_block = max(int(_PSD_BLOCK_MEMORY // (
+        8 * len(picks) * (n_step + n_fft // 2 + 1))), 1)
+
+    parallel, my_spect_sum_func, n_jobs = parallel_func(_spect_sum_func,
+                                                        n_jobs)
+    psds = np.zeros((len(picks), freq_mask.sum()))
+    n_used = 0
+    for ii in range(0, n_segments, n_block):
+        these_starts = seg_starts[ii:ii + n_block]
+        good = ~np.any((onsets < these_starts + n_per_seg) &
+                       (ends > these_starts), axis=0)
+        if not good.any():
+            continue
+        first, last = np.where(good)[0][[0, -1]]
+        these_starts, good = these_starts[first:last + 1], good[first:last + 1]
+        data = raw[picks, these_starts[0]:these_starts[-1] + n_per_seg][0]
+        psds += np.concatenate(parallel(
+            my_spect_sum_func(d, n_overlap=n_overlap, n_per_seg=n_per_seg,
+                              nfft=n_fft, fs=sfreq, freq_mask=freq_mask,
+                              good=good)
+            for d in np.array_split(data, n_jobs)))
+        n_used += good.sum()
+    _check_n_used(n_used, n_segments)
+    psds /= n_used
+    return psds, freqs
+
+
 @verbose
 def psd_array_welch(x, sfreq, fmin=0, fmax=np.inf, n_fft=256, n_overlap=0,
                     n_per_seg=None, n_jobs=1, average='mean', verbose=None):
@@ -244,11 +331,38 @@ def psd_welch(inst, fmin=0, fmax=np.inf, tmin=None, tmax=None, n_fft=256,
 
     Notes
     -----
+    For Raw instances that are not preloaded and ``average='mean'``, the data
+    are read and processed in blocks of Welch segments so that memory use
+    does not grow with the length of the recording.
+
+    For Raw instances and ``average='mean'``, Welch segments that overlap
+    with bad annotations are omitted when ``reject_by_annotation=True``,
+    whether or not the data are preloaded.
+
     .. versionadded:: 0.12.0
     """
+    from ..io.base import BaseRaw
+    if isinstance(inst, BaseRaw) and not inst.preload and average == 'mean':
+        inst, time_mask, picks = _check_psd_inst(inst, tmin, tmax, picks,
+                                                 proj)
+        start, stop = np.where(time_mask)[0][[0, -1]]
+        return _psd_welch_raw(inst, start, stop + 1, picks, fmin, fmax, n_fft,
+                              n_overlap, n_per_seg, n_jobs,
+                              reject_by_annotation)
     # Prep data
     data, sfreq = _check_psd_data(inst, tmin, tmax, picks, proj,
                                   reject_by_annotation=reject_by_annotation)
+    if isinstance(inst, BaseRaw) and average == 'mean' and \
+            np.isnan(data).any():
+        # bad annotations are NaN, omit the Welch segments overlapping them
+        # like for data that are not preloaded
+        psds, freqs = psd_array_welch(
+            data, sfreq, fmin=fmin, fmax=fmax, n_fft=n_fft,
+            n_overlap=n_overlap, n_per_seg=n_per_seg, average=None,
+            n_jobs=n_jobs, verbose=verbose)
+        good = ~np.isnan(psds).any(axis=(0, 1))
+        _check_n_used(good.sum(), len(good))
+        return psds[..., good].mean(axis=-1), freqs
     return psd_array_welch(data, sfreq, fmin=fmin, fmax=fmax, n_fft=n_fft,
                            n_overlap=n_overlap, n_per_seg=n_per_seg,
                            average=average, n_jobs=n_jobs, verbose=verbose)
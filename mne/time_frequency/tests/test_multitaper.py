@@ -2,10 +2,12 @@ from distutils.version import LooseVersion
 
 import numpy as np
 import pytest
-from numpy.testing import assert_array_almost_equal
+from numpy.testing import assert_array_almost_equal, assert_allclose
 
 from mne.time_frequency import psd_multitaper
-from mne.time_frequency.multitaper import dpss_windows
+from mne.time_frequency.multitaper import (dpss_windows, _mt_spectra,
+                                           _psd_from_mt,
+                                           _psd_from_mt_adaptive)
 from mne.utils import requires_nitime
 from mne.io import RawArray
 from mne import create_info
@@ -64,3 +66,31 @@ def test_multitaper_psd():
                 assert_array_almost_equal(freqs, freqs_ni)
         with pytest.raises(ValueError, match='use a value of at least'):
             psd_multitaper(raw, bandwidth=4.9)
+
+
+def test_psd_from_mt_adaptive():
+    """Test vectorized adaptive weighting across signals."""
+    rng = np.random.RandomState(0)
+    n_times = 500
+    data = rng.randn(20, n_times) * rng.rand(20, 1)
+    data[::3] += 10 * np.sin(0.3 * np.arange(n_times))
+    dpss, eigvals = dpss_windows(n_times, 4, 7)
+    x_mt, freqs = _mt_spectra(data, dpss, 1000.)
+    freq_mask = freqs < 200
+    psd, weights = _psd_from_mt_adaptive(x_mt, eigvals, freq_mask,
+                                         return_weights=True)
+    assert psd.shape == (20, freq_mask.sum())
+    assert weights.shape == (20, 7, freq_mask.sum())
+    # signals are iterated independently of each other
+    for ii in range(len(data)):
+        psd_1, weights_1 = _psd_from_mt_adaptive(
+            x_mt[ii:ii + 1], eigvals, freq_mask, return_weights=True)
+        assert_allclose(psd[ii:ii + 1], psd_1, rtol=1e-10)
+        assert_allclose(weights[ii:ii + 1], weights_1, rtol=1e-10)
+    # the weights reproduce the PSD
+    assert_allclose(_psd_from_mt(x_mt[:, :, freq_mask], weights), psd,
+                    rtol=1e-3)
+    with pytest.warns(RuntimeWarning, match='did not converge'):
+        _psd_from_mt_adaptive(x_mt, eigvals, freq_mask, max_iter=1)
+    with pytest.raises(ValueError, match='one eigenvalue'):
+        _psd_from_mt_adaptive(x_mt, eigvals[:-1], freq_mask)
@@ -4,7 +4,8 @@ from numpy.testing import assert_array_almost_equal, assert_allclose
 from scipy.signal import welch
 import pytest
 
-from mne import pick_types, Epochs, read_events
+from mne import (pick_types, Epochs, read_events, create_info,
+                 Annotations)
 from mne.io import RawArray, read_raw_fif
 from mne.utils import run_tests_if_main, requires_version
 from mne.time_frequency import psd_welch, psd_multitaper, psd_array_welch
@@ -223,6 +224,57 @@ def test_psd_welch_average_kwarg(kind):
     assert_allclose(psds_median, np.median(psds_unagg, axis=-1) / median_bias)
 
 
+def test_psd_welch_raw_streaming(tmpdir, monkeypatch):
+    """Test streaming Welch PSD on non-preloaded raw."""
+    rng = np.random.RandomState(0)
+    sfreq = 256.
+    data = rng.randn(4, 10000) * 1e-6
+    data[0] += 1e-6 * np.sin(2 * np.pi * 10. * np.arange(10000) / sfreq)
+    raw = RawArray(data, create_info(4, sfreq, 'eeg'))
+    fname = str(tmpdir.join('test_raw.fif'))
+    raw.save(fname, buffer_size_sec=1.)
+    raw_stream = read_raw_fif(fname, preload=False)
+    # several blocks of a few Welch segments
+    monkeypatch.setattr('mne.time_frequency.psd._PSD_BLOCK_MEMORY', 3e4)
+    raw = read_raw_fif(fname, preload=True)
+    for kws in (dict(), dict(n_overlap=128), dict(n_per_seg=200, n_fft=256),
+                dict(tmin=1., tmax=30., fmin=5., fmax=40.)):
+        tmin, tmax = kws.pop('tmin', 0.), kws.pop('tmax', None)
+        psds, freqs = psd_array_welch(
+            raw.copy().crop(tmin, tmax).get_data(), sfreq, **kws)
+        psds_stream, freqs_stream = psd_welch(raw_stream, tmin=tmin,
+                                              tmax=tmax, n_jobs=2, **kws)
+        assert_allclose(freqs_stream, freqs)
+        assert_allclose(psds_stream, psds, rtol=1e-7)
+        psds_preload, _ = psd_welch(raw, tmin=tmin, tmax=tmax, **kws)
+        assert_allclose(psds_preload, psds, rtol=1e-7)
+
+    # bad segments are omitted
+    n_fft = 256
+    annot = Annotations([n_fft / sfreq], [2 * n_fft / sfreq - 0.01], ['BAD'])
+    raw_stream.set_annotations(annot)
+    psds, freqs = psd_welch(raw_stream, n_fft=n_fft)
+    good = np.ones(len(raw.times) // n_fft, bool)
+    good[1:3] = False
+    data_good = data[:, :len(good) * n_fft].reshape(4, -1, n_fft)[:, good]
+    psds_good, freqs_good = psd_array_welch(data_good.reshape(4, -1), sfreq,
+                                            n_fft=n_fft)
+    assert_allclose(freqs, freqs_good)
+    assert_allclose(psds, psds_good, rtol=1e-7)
+    # preloaded data give the same result
+    raw.set_annotations(annot)
+    psds_preload, _ = psd_welch(raw, n_fft=n_fft)
+    assert np.isfinite(psds_preload).all()
+    assert_allclose(psds_preload, psds, rtol=1e-7)
+    psds_all, _ = psd_welch(raw_stream, n_fft=n_fft,
+                            reject_by_annotation=False)
+    assert not np.allclose(psds, psds_all, atol=0)
+    for inst in (raw_stream, raw):
+        inst.set_annotations(Annotations([0], [raw.times[-1]], ['BAD']))
+        with pytest.raises(ValueError, match='overlap with bad annotations'):
+            psd_welch(inst)
+
+
 @pytest.mark.slowtest
 def test_compares_psd():
     """Test PSD estimation on raw for plt.psd and scipy.signal.welch."""
@@ -267,6 +267,16 @@ n_jobs : int
     The number of jobs to run in parallel (default 1).
     Requires the joblib package.
 """
+docdict['use_cache_inv'] = """
+use_cache : bool
+    If True (default), the prepared operator (if ``prepared=False``) and the
+    kernel are cached in ``inverse_operator`` and reused by later calls with
+    the same parameters. Each cached setting keeps a prepared copy of the
+    operator and a kernel of shape ``(n_sources, n_channels)`` in memory,
+    for up to two settings per operator; use False to avoid this.
+
+    .. versionadded:: 0.20
+"""
 
 # Random state
 docdict['random_state'] = """